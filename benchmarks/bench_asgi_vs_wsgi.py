@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Side-by-side load test of the WSGI app (gunicorn + gunicorn.conf.py) and the
+ASGI entry point (uvicorn + oriyan_portfolio_asgi) at high concurrency.
+
+Both servers run with the same number of worker processes and the same
+environment (point MONGO_URI at a real database to include its latency).
+The load generator keeps `concurrency` HTTP/1.1 keep-alive connections busy
+for `seconds` and reports requests per second and p50/p99 latency.
+
+Usage: python benchmarks/bench_asgi_vs_wsgi.py [concurrency] [seconds] [path] [workers]
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = '127.0.0.1'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, workers):
+    env = dict(os.environ, EVENT_LOG_DIR=tempfile.mkdtemp(prefix='bench-asgi-'),
+               GUNICORN_WORKERS=str(workers))
+    if kind == 'wsgi':
+        command = ['gunicorn', '-c', 'gunicorn.conf.py', '-b', f'{HOST}:{port}', 'oriyan_portfolio:app']
+    else:
+        command = ['uvicorn', 'oriyan_portfolio_asgi:app', '--host', HOST, '--port', str(port),
+                   '--workers', str(workers), '--no-access-log', '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://{HOST}:{port}/health', timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'{kind} server did not start')
+
+
+async def connection(port, path, deadline, latencies, errors):
+    request = f'GET {path} HTTP/1.1\r\nHost: {HOST}\r\nAccept-Encoding: gzip\r\n\r\n'.encode()
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+            length = int({name.lower(): value for name, value in headers.items()}.get('content-length', 0))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not lines[0].split(' ')[1].startswith(('2', '3')):
+                errors.append(lines[0])
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            errors.append(repr(e))
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, path, concurrency, seconds):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(connection(port, path, deadline, latencies, errors) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    path = sys.argv[3] if len(sys.argv) > 3 else '/api/stats'
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 2
+
+    print(f"GET {path}: {concurrency} connections for {seconds:g}s, {workers} workers each")
+    for kind in ('wsgi', 'asgi'):
+        port = free_port()
+        server = start_server(kind, port, workers)
+        try:
+            asyncio.run(load(port, path, min(concurrency, 10), 1))  # warm up
+            latencies, errors = asyncio.run(load(port, path, concurrency, seconds))
+        finally:
+            server.terminate()
+            server.wait()
+        latencies.sort()
+        print(f"  {kind}: {len(latencies) / seconds:8.0f} req/s   "
+              f"p50 {percentile(latencies, 0.50) * 1000:7.1f} ms   "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms   errors {len(errors)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compare the orjson-backed PortfolioJSONProvider with Flask's stdlib provider.
+
+The stdlib run mirrors the old handlers: convert _id and timestamp of every
+document in Python, then jsonify(). The portfolio provider encodes the raw
+MongoDB documents directly.
+
+Usage: python benchmarks/bench_json_provider.py [documents] [rounds]
+"""
+
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+import oriyan_portfolio
+from oriyan_portfolio import PortfolioJSONProvider, app
+
+
+def make_documents(count):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            '_id': ObjectId(),
+            'ip': f'10.0.{i // 256 % 256}.{i % 256}',
+            'user_agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
+            'timestamp': start + timedelta(seconds=i),
+            'page': '/',
+        }
+        for i in range(count)
+    ]
+
+
+def stdlib_encode(provider, documents):
+    converted = []
+    for doc in documents:
+        doc = dict(doc)
+        doc['_id'] = str(doc['_id'])
+        doc['timestamp'] = doc['timestamp'].isoformat()
+        converted.append(doc)
+    return provider.response({'total': len(converted), 'recent_visitors': converted}).get_data()
+
+
+def provider_encode(provider, documents):
+    return provider.response({'total': len(documents), 'recent_visitors': documents}).get_data()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    documents = make_documents(count)
+    stdlib = DefaultJSONProvider(app)
+    portfolio = PortfolioJSONProvider(app)
+
+    print(f"Encoding {count} visitor documents, best of {rounds} rounds "
+          f"(orjson {'available' if oriyan_portfolio.orjson else 'NOT installed'})")
+    with app.app_context():
+        results = {
+            'stdlib + per-document conversion': min(timeit.repeat(
+                lambda: stdlib_encode(stdlib, documents), number=1, repeat=rounds)),
+            'PortfolioJSONProvider': min(timeit.repeat(
+                lambda: provider_encode(portfolio, documents), number=1, repeat=rounds)),
+        }
+    baseline = results['stdlib + per-document conversion']
+    for name, seconds in results.items():
+        print(f"  {name:<36} {seconds * 1000:8.2f} ms  ({baseline / seconds:4.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Measure worker cold start: importing oriyan_portfolio and serving the first page.
+
+Each run is a fresh interpreter pointed at an unreachable MongoDB, which is
+the worst case for startup: before the lazy connection every import waited
+for the full server selection timeout.
+
+Usage: python benchmarks/bench_startup.py [runs] [mongo_uri]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import oriyan_portfolio
+imported = time.perf_counter()
+response = oriyan_portfolio.app.test_client().get('/')
+served = time.perf_counter()
+assert response.status_code == 200
+print(json.dumps({'import': imported - start, 'first_request': served - start}))
+"""
+
+
+def run_once(mongo_uri):
+    env = dict(os.environ, MONGO_URI=mongo_uri, EVENT_LOG_DIR=tempfile.mkdtemp(prefix='bench-startup-'))
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    # 10.255.255.1 is not routable, so server selection runs into its timeout
+    mongo_uri = sys.argv[2] if len(sys.argv) > 2 else 'mongodb://10.255.255.1:27017/oriyan_portfolio'
+    results = [run_once(mongo_uri) for _ in range(runs)]
+
+    print(f"cold start over {runs} runs, MONGO_URI={mongo_uri}")
+    for key in ('import', 'first_request'):
+        samples = sorted(result[key] * 1000 for result in results)
+        print(f"  {key:>14}: median {statistics.median(samples):8.1f} ms   max {samples[-1]:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Gunicorn configuration for the portfolio container.
+
+Workers and threads are sized from the cgroup CPU quota and memory limit of
+the container (k8s/deployment.yaml), not from the host's CPU count, so a pod
+with a 200m CPU limit does not start one worker per node core. Every value
+can be overridden with a GUNICORN_* environment variable.
+
+Worker classes:
+  gthread (default)  threads share one process; a slow MongoDB call blocks a
+                     thread, not the worker
+  gevent             cooperative greenlets, needs `pip install gevent`
+  sync               one request per worker
+
+GUNICORN_PRELOAD=true imports the app once in the master and forks the
+workers from it (see the preload hooks at the end of this file).
+
+PROMETHEUS_MULTIPROC_DIR (set in the Dockerfile) makes /metrics aggregate
+the samples of all workers; the master empties it on start and marks exited
+workers dead so their live gauges drop out.
+"""
+
+import gc
+import glob
+import math
+import os
+
+from prometheus_client import multiprocess
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(root=CGROUP_ROOT):
+    """CPUs granted by the cgroup quota (v2 cpu.max or v1 cfs_quota), None if unlimited"""
+    cpu_max = _read(os.path.join(root, 'cpu.max'))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+    quota = _read(os.path.join(root, 'cpu', 'cpu.cfs_quota_us'))
+    period = _read(os.path.join(root, 'cpu', 'cpu.cfs_period_us'))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cgroup_memory_limit(root=CGROUP_ROOT):
+    """Memory limit in bytes (v2 memory.max or v1 limit_in_bytes), None if unlimited"""
+    limit = _read(os.path.join(root, 'memory.max'))
+    if limit is None:
+        limit = _read(os.path.join(root, 'memory', 'memory.limit_in_bytes'))
+    if not limit or limit == 'max':
+        return None
+    # cgroup v1 reports "unlimited" as a page-aligned huge number
+    if int(limit) >= 2 ** 60:
+        return None
+    return int(limit)
+
+
+def available_cpus():
+    """CPUs this container may use: the cgroup quota, capped by the affinity mask"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    quota = cgroup_cpu_limit()
+    return min(cpus, quota) if quota else cpus
+
+
+def worker_count(cpus, memory_limit, worker_memory):
+    """(2 x CPUs) + 1 workers, rounded up, as many as fit in the memory limit"""
+    workers = math.ceil(2 * cpus + 1)
+    if memory_limit:
+        workers = min(workers, memory_limit // worker_memory)
+    return max(1, workers)
+
+
+CPUS = available_cpus()
+MEMORY_LIMIT = cgroup_memory_limit()
+# Resident size of one worker (Flask, pymongo, page caches and sketches)
+WORKER_MEMORY = int(os.getenv('GUNICORN_WORKER_MEMORY_MB', '80')) * 1024 * 1024
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS') or worker_count(CPUS, MEMORY_LIMIT, WORKER_MEMORY))
+# Requests mostly wait on MongoDB, so a few threads per worker keep the CPU busy
+threads = int(os.getenv('GUNICORN_THREADS', '4')) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# Longer than the ingress's upstream keepalive (60s), so nginx always closes
+# idle connections first and never reuses one gunicorn is closing
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '75'))
+backlog = int(os.getenv('GUNICORN_BACKLOG', '1024'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+# Finish in-flight requests (and flush visitor batches) inside the pod's
+# default 30s terminationGracePeriodSeconds
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '25'))
+
+# Heartbeat files on tmpfs; a slow overlay filesystem can stall workers
+worker_tmp_dir = os.getenv('GUNICORN_WORKER_TMP_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+# Copy-on-write friendly preloading. The master imports the app (templates,
+# prebuilt responses, Flask, pymongo) once; workers share those pages. The
+# cyclic GC would dirty them again by writing to every object header it
+# scans, so it is off while the app is imported and everything allocated up
+# to the fork is moved to the permanent generation with gc.freeze(). Workers
+# then report their private (USS) and proportional (PSS) memory on /metrics
+# as portfolio_process_memory_bytes.
+#
+# The master does not connect to MongoDB: a thread running at fork time
+# could hold a lock the worker then waits on forever. Each worker connects
+# from the app's after-fork hook.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+if preload_app:
+    os.environ['MONGO_CONNECT_ON_IMPORT'] = 'false'
+    gc.disable()
+
+
+def on_starting(server):
+    memory = f"{MEMORY_LIMIT // (1024 * 1024)}Mi" if MEMORY_LIMIT else 'unlimited'
+    print(f"🦄 gunicorn: {workers} {worker_class} workers x {threads} threads "
+          f"(cpus={CPUS:g}, memory={memory}, preload={preload_app})")
+    clear_metrics_dir(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def clear_metrics_dir(path):
+    """Drop samples left by a previous server; they would be added to the new totals"""
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for db in glob.glob(os.path.join(path, '*.db')):
+        os.remove(db)
+
+
+def when_ready(server):
+    if preload_app:
+        # Compile the URL map in the master instead of on each worker's first request
+        app = server.app.wsgi()
+        app.url_map.bind('localhost').match('/')
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        gc.freeze()
+        # Frozen objects are never scanned, so collecting again is safe; the
+        # master keeps running for as long as the server does
+        gc.enable()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        # Counters and histograms of the exited worker keep counting towards
+        # the totals; its live* gauge files are removed
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,770 +1,2335 @@
-from flask import Flask, jsonify, request
-from pymongo import MongoClient
-from datetime import datetime, timezone
+from flask import Flask, Response, g, jsonify, render_template, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.http import http_date, parse_accept_header, parse_date, parse_etags
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient, UpdateOne
+from pymongo.command_cursor import CommandCursor
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError
+from pymongo.monitoring import ConnectionPoolListener
+from bson import ObjectId, json_util
+from datetime import datetime, timedelta, timezone
+from collections import deque
+import atexit
+import base64
+import click
+import csv
+import fcntl
+import glob
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import math
 import os
+import queue
+import random
+import signal
+import socket
+import threading
+import time
+import zlib
 
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST, CollectorRegistry
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST, CollectorRegistry
+from prometheus_client.multiprocess import MultiProcessCollector
+
+try:
+    import orjson
+except ImportError:  # optional speedup, the stdlib encoder is used without it
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, responses fall back to gzip
+    brotli = None
+
+class PortfolioJSONProvider(DefaultJSONProvider):
+    """JSON provider that understands ObjectId and ISO datetimes natively.
+
+    Responses are encoded in one pass by orjson when it is installed, so
+    MongoDB documents can be handed to jsonify() as they come back from the
+    driver. Without orjson the stdlib encoder is used with the same rules.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def _orjson_options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if orjson is None or pretty:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = PortfolioJSONProvider(app)
 
 # Metrics
+# With PROMETHEUS_MULTIPROC_DIR set (it must be set before prometheus_client
+# is imported), every gunicorn worker writes its samples to mmap'd files in
+# that directory and /metrics aggregates all of them, so a scrape no longer
+# reports only the worker that happened to answer it. Gauges declare how
+# their per-worker values are combined.
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+class WorkerMetricsCollector(MultiProcessCollector):
+    """MultiProcessCollector that skips metric files still being created.
+
+    A worker creates its file before sizing it, so a scrape racing a
+    worker's first sample would otherwise fail on an empty file. The file
+    is picked up by the next scrape.
+    """
+
+    def collect(self):
+        files = []
+        for path in glob.glob(os.path.join(self._path, '*.db')):
+            try:
+                if os.path.getsize(path):
+                    files.append(path)
+            except OSError:
+                pass  # a live* gauge file of a worker that just exited
+        return self.merge(files, accumulate=True)
+
 metrics_registry = CollectorRegistry()
+# Request metrics are labelled with the route template (/api/visitors, not
+# the raw path), so the number of series is bounded by the routes the app has
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
 REQUEST_COUNT = Counter('portfolio_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'http_status'], registry=metrics_registry)
-REQUEST_LATENCY = Histogram('portfolio_request_latency_seconds', 'Request latency', ['endpoint'], registry=metrics_registry)
+REQUEST_LATENCY = Histogram('portfolio_request_latency_seconds', 'Request latency', ['endpoint'], buckets=LATENCY_BUCKETS, registry=metrics_registry)
+REQUEST_SIZE = Histogram('portfolio_request_size_bytes', 'Request body size', ['endpoint'], buckets=SIZE_BUCKETS, registry=metrics_registry)
+RESPONSE_SIZE = Histogram('portfolio_response_size_bytes', 'Response body size as sent (after compression)', ['endpoint'], buckets=SIZE_BUCKETS, registry=metrics_registry)
+VISITOR_QUEUE_DEPTH = Gauge('portfolio_visitor_queue_depth', 'Visitor events waiting to be written', multiprocess_mode='livesum', registry=metrics_registry)
+VISITOR_FLUSH_LATENCY = Histogram('portfolio_visitor_flush_seconds', 'Time spent writing one batch of visitor events', registry=metrics_registry)
+VISITOR_FLUSH_SIZE = Histogram('portfolio_visitor_flush_size', 'Visitor events written per batch', buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000), registry=metrics_registry)
+VISITOR_EVENTS_DROPPED = Counter('portfolio_visitor_events_dropped_total', 'Visitor events dropped before reaching MongoDB', ['reason'], registry=metrics_registry)
+CACHE_REQUESTS = Counter('portfolio_cache_requests_total', 'Cache lookups by outcome (hit, miss, stale)', ['cache', 'result'], registry=metrics_registry)
+CACHE_REFRESH_ERRORS = Counter('portfolio_cache_refresh_errors_total', 'Background cache refreshes that failed', ['cache'], registry=metrics_registry)
+EVENT_LOG_APPENDS = Counter('portfolio_event_log_appends_total', 'Events spooled to the local event log', ['kind'], registry=metrics_registry)
+EVENT_LOG_REPLAYED = Counter('portfolio_event_log_replayed_total', 'Spooled events written to MongoDB by the replayer', ['kind'], registry=metrics_registry)
+EVENT_LOG_PENDING_BYTES = Gauge('portfolio_event_log_pending_bytes', 'Bytes in the local event log not yet replayed', multiprocess_mode='livemax', registry=metrics_registry)
+POST_RESPONSE_TASKS = Counter('portfolio_post_response_tasks_total', 'Work deferred until after the response was sent, by outcome', ['task', 'outcome'], registry=metrics_registry)
+POST_RESPONSE_LATENCY = Histogram('portfolio_post_response_task_seconds', 'Time spent on deferred post-response work', ['task'], registry=metrics_registry)
+MONGO_CIRCUIT_STATE = Gauge('portfolio_mongo_circuit_state', 'MongoDB circuit breaker state: 0 closed, 1 half-open, 2 open', ['breaker'], multiprocess_mode='livemax', registry=metrics_registry)
+MONGO_CIRCUIT_REJECTED = Counter('portfolio_mongo_circuit_rejected_total', 'MongoDB calls short-circuited by an open breaker', ['breaker'], registry=metrics_registry)
+PROCESS_MEMORY = Gauge('portfolio_process_memory_bytes', 'Worker memory by kind: rss, pss, uss (private) and shared', ['kind'], multiprocess_mode='liveall', registry=metrics_registry)
+VISITOR_COUNTER_COMPACTIONS = Counter('portfolio_visitor_counter_compactions_total', 'Visitor counter shards folded into the base document', registry=metrics_registry)
 
 # MongoDB Configuration
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/oriyan_portfolio')
-try:
-    mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
-    db = mongo_client.get_default_database()
-    visitors_collection = db.visitors
-    stats_collection = db.stats
-    print("✅ MongoDB connected successfully")
-    
-    # Initialize stats if not exists
-    if stats_collection.count_documents({}) == 0:
-        stats_collection.insert_one({
+
+# Visitor counter shards: every worker increments its own striped documents
+# in the stats collection instead of all workers fighting over one document
+VISITOR_COUNTER = 'visitors'
+VISITOR_COUNTER_BASE_ID = 'visitors:base'
+VISITOR_COUNTER_STRIPES = int(os.getenv('VISITOR_COUNTER_STRIPES', '4'))
+VISITOR_COUNTER_COMPACT_INTERVAL = float(os.getenv('VISITOR_COUNTER_COMPACT_INTERVAL', '3600'))
+# Fold ids a shard remembers, so a fold finished late by a stalled worker
+# is still recognised as applied after newer folds
+VISITOR_COUNTER_APPLIED_FOLDS = int(os.getenv('VISITOR_COUNTER_APPLIED_FOLDS', '32'))
+POD_NAME = os.getenv('POD_NAME') or socket.gethostname()
+
+# How long the per-worker snapshots (heavy hitters, recent visits, unique
+# visitor sketches) stay readable; their TTL indexes below follow these
+TOP_RETENTION_DAYS = int(os.getenv('TOP_RETENTION_DAYS', '7'))
+RECENT_VISITORS_STALE_AFTER = float(os.getenv('RECENT_VISITORS_STALE_AFTER', '300'))
+HLL_RETENTION_DAYS = int(os.getenv('HLL_RETENTION_DAYS', '2'))
+
+# Indexes every collection needs, keyed by collection name. Applied at
+# startup (ENSURE_INDEXES_ON_STARTUP) and by `flask indexes ensure`;
+# `flask indexes check` reports drift against this list.
+REQUIRED_INDEXES = {
+    'visitors': [
+        IndexModel([('timestamp', DESCENDING)], name='timestamp_desc', background=True),
+    ],
+    'contacts': [
+        # Matches the (timestamp, _id) keyset used to page through the inbox
+        IndexModel([('timestamp', DESCENDING), ('_id', DESCENDING)], name='timestamp_id_desc', background=True),
+    ],
+    'stats': [
+        # Lets get_visitor_count() sum the shards from the index alone
+        IndexModel([('counter', ASCENDING), ('total_visitors', ASCENDING)], name='counter_total', background=True),
+    ],
+    'visitor_rollups': [
+        IndexModel([('granularity', ASCENDING), ('page', ASCENDING), ('bucket', ASCENDING)],
+                   name='granularity_page_bucket', background=True),
+    ],
+    # Snapshots are keyed per worker pid, so every restart leaves documents
+    # behind; TTL indexes drop them once no reader would use them anymore
+    'visitor_sketches': [
+        IndexModel([('key', ASCENDING)], name='key', background=True),
+        # A day's sketch is last written during that day, hence the extra day
+        IndexModel([('updated', ASCENDING)], name='updated_ttl', background=True,
+                   expireAfterSeconds=(HLL_RETENTION_DAYS + 1) * 86400),
+    ],
+    'visitor_top': [
+        IndexModel([('field', ASCENDING), ('updated', ASCENDING)], name='field_updated', background=True),
+        IndexModel([('updated', ASCENDING)], name='updated_ttl', background=True,
+                   expireAfterSeconds=TOP_RETENTION_DAYS * 86400),
+    ],
+    'visitor_recent': [
+        IndexModel([('updated', ASCENDING)], name='updated', background=True,
+                   expireAfterSeconds=int(RECENT_VISITORS_STALE_AFTER)),
+    ],
+}
+ENSURE_INDEXES_ON_STARTUP = os.getenv('ENSURE_INDEXES_ON_STARTUP', 'True').lower() in ('1', 'true', 'yes')
+
+def _drop_changed_ttl_indexes(collection, models):
+    """Drop declared TTL indexes whose live expiry differs, so they get rebuilt.
+
+    Creating an index over an existing key with other options fails, e.g.
+    after a retention setting changed or a plain index became a TTL index.
+    Only the small snapshot collections carry TTL indexes.
+    """
+    live = collection.index_information()
+    for model in models:
+        spec = model.document
+        if 'expireAfterSeconds' not in spec or spec['name'] not in live:
+            continue
+        if live[spec['name']].get('expireAfterSeconds') != spec['expireAfterSeconds']:
+            collection.drop_index(spec['name'])
+
+def ensure_indexes(database):
+    """Create any missing required index; returns {collection: [index names]}"""
+    created = {}
+    for name, models in REQUIRED_INDEXES.items():
+        if any('expireAfterSeconds' in model.document for model in models):
+            _drop_changed_ttl_indexes(database[name], models)
+        # create_indexes is a no-op for indexes that already exist with the same spec
+        created[name] = database[name].create_indexes(models)
+    return created
+
+def check_indexes(database):
+    """Compare live indexes with REQUIRED_INDEXES.
+
+    Returns {collection: {'missing': [...], 'unused': [...], 'undeclared': [...]}}
+    where unused lists indexes with no recorded accesses in $indexStats
+    since the server started.
+    """
+    report = {}
+    for name, models in REQUIRED_INDEXES.items():
+        collection = database[name]
+        required = {model.document['name'] for model in models}
+        existing = set(collection.index_information())
+        unused = []
+        for stat in collection.aggregate([{'$indexStats': {}}]):
+            if stat['name'] != '_id_' and stat.get('accesses', {}).get('ops', 0) == 0:
+                unused.append(stat['name'])
+        report[name] = {
+            'missing': sorted(required - existing),
+            'unused': sorted(unused),
+            'undeclared': sorted(existing - required - {'_id_'}),
+        }
+    return report
+
+@app.cli.group('indexes')
+def indexes_cli():
+    """Manage the MongoDB indexes declared in REQUIRED_INDEXES."""
+
+@indexes_cli.command('ensure')
+def indexes_ensure_command():
+    """Create missing indexes (idempotent, background builds)."""
+    for name, indexes in ensure_indexes(cli_database()).items():
+        click.echo(f"{name}: {', '.join(indexes)}")
+
+@indexes_cli.command('check')
+def indexes_check_command():
+    """Report missing, unused and undeclared indexes; exits 1 if any are missing."""
+    missing = False
+    for name, result in check_indexes(cli_database()).items():
+        missing = missing or bool(result['missing'])
+        click.echo(f"{name}: missing={result['missing']} unused={result['unused']} undeclared={result['undeclared']}")
+    if missing:
+        raise SystemExit(1)
+
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '2000'))
+MONGO_CONNECT_RETRY_INTERVAL = float(os.getenv('MONGO_CONNECT_RETRY_INTERVAL', '5'))
+# Off in a preloading gunicorn master (set by gunicorn.conf.py): the master
+# must not run MongoDB threads it would fork, each worker connects instead
+MONGO_CONNECT_ON_IMPORT = os.getenv('MONGO_CONNECT_ON_IMPORT', 'True').lower() in ('1', 'true', 'yes')
+
+# Connection pool, one per worker process. A worker serves a handful of
+# threads plus the background writers, so the pool stays small; waiting for
+# a free connection fails fast instead of queueing a request indefinitely.
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '20'))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '2'))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', '300000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '1000'))
+# Wire compression, e.g. "zstd,snappy,zlib"; empty disables it
+MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', '')
+# Connections opened as soon as a worker connects, so the first requests
+# do not pay for the TCP/TLS handshake and authentication
+MONGO_WARM_CONNECTIONS = int(os.getenv('MONGO_WARM_CONNECTIONS', str(MONGO_MIN_POOL_SIZE)))
+
+class PoolMonitor(ConnectionPoolListener):
+    """Tracks connection pool state for /readyz from pymongo's pool events.
+
+    A pool is cleared when its server was marked unknown (network error,
+    failover) and becomes ready again once the server is rediscovered.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Also called in a forked child, where the parent's lock may be held
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.checkout_failures = 0
+        self.cleared = set()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checked_out': self.checked_out,
+                'max_size': MONGO_MAX_POOL_SIZE,
+                'checkout_failures': self.checkout_failures,
+                'cleared': sorted(f'{host}:{port}' for host, port in self.cleared),
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        with self._lock:
+            self.cleared.discard(event.address)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.cleared.add(event.address)
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.cleared.discard(event.address)
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+pool_monitor = PoolMonitor()
+
+def mongo_client_options():
+    """Keyword arguments for MongoClient built from the environment"""
+    options = {
+        'serverSelectionTimeoutMS': MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        'event_listeners': [pool_monitor],
+        'maxPoolSize': MONGO_MAX_POOL_SIZE,
+        'minPoolSize': MONGO_MIN_POOL_SIZE,
+        'maxIdleTimeMS': MONGO_MAX_IDLE_TIME_MS,
+        'waitQueueTimeoutMS': MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    }
+    compressors = [name.strip() for name in MONGO_COMPRESSORS.split(',') if name.strip()]
+    if compressors:
+        options['compressors'] = compressors
+    return options
+
+def warm_pool(database, connections):
+    """Open up to `connections` pooled connections with concurrent pings"""
+    def ping():
+        try:
+            database.command('ping')
+        except Exception:
+            pass
+    threads = [threading.Thread(target=ping, daemon=True) for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(MONGO_SERVER_SELECTION_TIMEOUT_MS / 1000)
+
+# Circuit breaker shared by every collection: once half of the calls in the
+# window failed to reach the server, calls fail immediately for a cooldown
+MONGO_BREAKER_FAILURE_RATE = float(os.getenv('MONGO_BREAKER_FAILURE_RATE', '0.5'))
+MONGO_BREAKER_MIN_CALLS = int(os.getenv('MONGO_BREAKER_MIN_CALLS', '5'))
+MONGO_BREAKER_WINDOW = float(os.getenv('MONGO_BREAKER_WINDOW', '30'))
+MONGO_BREAKER_COOLDOWN = float(os.getenv('MONGO_BREAKER_COOLDOWN', '10'))
+
+class CircuitOpenError(ConnectionFailure):
+    """Raised instead of calling MongoDB while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over a sliding window of call outcomes.
+
+    Closed: calls go through. Once at least min_calls finished in the last
+    `window` seconds and failure_rate of them could not reach the server
+    (ConnectionFailure, which includes selection and pool timeouts), the
+    breaker opens. Open: calls raise CircuitOpenError at once, so callers
+    fall back to cached values, the event log or degraded responses instead
+    of each waiting out the timeout. After `cooldown` seconds a single trial
+    call is let through (half-open); success closes the breaker, failure
+    opens it again. Errors the server answered with count as successes.
+    """
+
+    CLOSED = 'closed'
+    HALF_OPEN = 'half_open'
+    OPEN = 'open'
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name, failure_rate=MONGO_BREAKER_FAILURE_RATE, min_calls=MONGO_BREAKER_MIN_CALLS,
+                 window=MONGO_BREAKER_WINDOW, cooldown=MONGO_BREAKER_COOLDOWN, clock=time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """Start closed with an empty window; also used in a forked child"""
+        # A fresh lock, the parent's may have been held at the fork
+        self._lock = threading.Lock()
+        self._outcomes = deque()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state):
+        self.state = state
+        MONGO_CIRCUIT_STATE.labels(self.name).set(self.STATE_VALUES[state])
+
+    def _open(self, now):
+        self._set_state(self.OPEN)
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+        print(f"⚠️ MongoDB circuit '{self.name}' opened for {self.cooldown:g}s")
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go to the server now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self._opened_at < self.cooldown:
+                    MONGO_CIRCUIT_REJECTED.labels(self.name).inc()
+                    raise CircuitOpenError(f"MongoDB circuit '{self.name}' is open")
+                self._set_state(self.HALF_OPEN)
+                self._trial = False
+            if self.state == self.HALF_OPEN:
+                if self._trial:
+                    MONGO_CIRCUIT_REJECTED.labels(self.name).inc()
+                    raise CircuitOpenError(f"MongoDB circuit '{self.name}' is half-open")
+                self._trial = True
+
+    def record(self, ok):
+        """Record the outcome of a call that went to the server"""
+        with self._lock:
+            now = self.clock()
+            if self.state == self.HALF_OPEN:
+                self._trial = False
+                if ok:
+                    self._set_state(self.CLOSED)
+                    print(f"✅ MongoDB circuit '{self.name}' closed")
+                else:
+                    self._open(now)
+                return
+            if self.state == self.OPEN:
+                return  # a call that started before the breaker opened
+            self._outcomes.append((now, ok))
+            self._failures += not ok
+            while self._outcomes and now - self._outcomes[0][0] > self.window:
+                self._failures -= not self._outcomes.popleft()[1]
+            if not ok and len(self._outcomes) >= self.min_calls \
+                    and self._failures >= self.failure_rate * len(self._outcomes):
+                self._open(now)
+
+    def call(self, func, *args, **kwargs):
+        self.before_call()
+        ok = True
+        try:
+            return func(*args, **kwargs)
+        except ConnectionFailure:
+            ok = False
+            raise
+        finally:
+            self.record(ok)
+
+    async def acall(self, func, *args, **kwargs):
+        """call() for coroutine functions, e.g. Motor operations"""
+        self.before_call()
+        ok = True
+        try:
+            return await func(*args, **kwargs)
+        except ConnectionFailure:
+            ok = False
+            raise
+        finally:
+            self.record(ok)
+
+class GuardedCursor:
+    """Cursor proxy whose iteration goes through the circuit breaker.
+
+    Only the first fetch is recorded while the breaker is closed; later
+    next() calls are mostly served from the batch already in memory, so
+    they only report failures.
+    """
+
+    def __init__(self, cursor, breaker):
+        self._cursor = cursor
+        self._breaker = breaker
+        self._started = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._started and self._breaker.state == CircuitBreaker.CLOSED:
+            try:
+                return next(self._cursor)
+            except ConnectionFailure:
+                self._breaker.record(False)
+                raise
+        self._started = True
+        return self._breaker.call(next, self._cursor)
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            # sort(), limit() and friends return the cursor itself
+            result = attr(*args, **kwargs)
+            return self if result is self._cursor else result
+        return chained
+
+class GuardedCollection:
+    """Collection proxy that sends every operation through the circuit breaker"""
+
+    def __init__(self, collection, breaker):
+        self._collection = collection
+        self._breaker = breaker
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name == 'find':
+            # find() is lazy, the breaker applies when the cursor is iterated
+            return lambda *args, **kwargs: GuardedCursor(attr(*args, **kwargs), self._breaker)
+        if not callable(attr):
+            return attr
+
+        def guarded(*args, **kwargs):
+            result = self._breaker.call(attr, *args, **kwargs)
+            return GuardedCursor(result, self._breaker) if isinstance(result, CommandCursor) else result
+        return guarded
+
+mongo_breaker = CircuitBreaker('mongodb')
+
+# Published by MongoConnection once the server has answered; until then
+# visits and contacts are spooled to the event log
+mongo_client = None
+db = None
+visitors_collection = None
+stats_collection = None
+rollups_collection = None
+sketches_collection = None
+top_collection = None
+recent_collection = None
+contacts_collection = None
+
+def seed_visitor_counter(stats):
+    """Create the base counter document, or adopt the pre-sharding singleton"""
+    if stats.count_documents({}) == 0:
+        stats.insert_one({
+            '_id': VISITOR_COUNTER_BASE_ID,
+            'counter': VISITOR_COUNTER,
             'total_visitors': 0,
             'last_updated': datetime.now(timezone.utc)
         })
-        
-except Exception as e:
-    print(f"⚠️  MongoDB connection failed: {e}")
-    mongo_client = None
-    db = None
-    visitors_collection = None
-    stats_collection = None
-
-def track_visitor():
-    """Track visitor to database"""
+    else:
+        # Adopt the pre-sharding singleton document as one more shard
+        stats.update_many(
+            {'counter': {'$exists': False}, 'total_visitors': {'$exists': True}},
+            {'$set': {'counter': VISITOR_COUNTER}}
+        )
+
+def _publish_database(client, database):
+    """Point the collection globals at database, or back at None"""
+    global mongo_client, db, visitors_collection, stats_collection, rollups_collection
+    global sketches_collection, top_collection, recent_collection, contacts_collection
+
+    def collection(name):
+        return None if database is None else GuardedCollection(getattr(database, name), mongo_breaker)
+
+    visitors_collection = collection('visitors')
+    stats_collection = collection('stats')
+    rollups_collection = collection('visitor_rollups')
+    sketches_collection = collection('visitor_sketches')
+    top_collection = collection('visitor_top')
+    recent_collection = collection('visitor_recent')
+    contacts_collection = collection('contacts')
+    mongo_client = client
+    db = database
+
+class MongoConnection:
+    """Connects to MongoDB off the import path.
+
+    MongoClient() itself does no I/O; the first round trips (seeding the
+    visitor counter, ensuring indexes) run on a daemon thread that retries
+    every retry_interval seconds. Only when they succeed (and the pool has
+    been warmed) are db and the collection globals published and `ready`
+    set, so importing the app and serving pages never waits for the database.
+
+    A MongoClient must not cross a fork: its sockets and monitor threads
+    belong to the parent. reset_after_fork() runs in every forked child
+    (gunicorn workers, also with --preload) and builds a fresh client there.
+    """
+
+    def __init__(self, uri, retry_interval=MONGO_CONNECT_RETRY_INTERVAL):
+        self.uri = uri
+        self.retry_interval = retry_interval
+        self.client = None
+        self.ready = threading.Event()
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the background connect loop unless already connected"""
+        if self.ready.is_set() or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='mongo-connect', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self.connect():
+            time.sleep(self.retry_interval)
+
+    def connect(self):
+        """One connection attempt; returns True once the database is published"""
+        with self._lock:
+            if self.ready.is_set():
+                return True
+            try:
+                if self.client is None:
+                    self.client = MongoClient(self.uri, **mongo_client_options())
+                database = self.client.get_default_database()
+                seed_visitor_counter(database.stats)
+                if ENSURE_INDEXES_ON_STARTUP:
+                    ensure_indexes(database)
+                if MONGO_WARM_CONNECTIONS > 0:
+                    warm_pool(database, MONGO_WARM_CONNECTIONS)
+            except Exception as e:
+                self.last_error = e
+                print(f"⚠️  MongoDB connection failed: {e}")
+                return False
+            _publish_database(self.client, database)
+            self.last_error = None
+            self.ready.set()
+        print("✅ MongoDB connected successfully")
+        mongo_health.ensure_started()
+        try:
+            recent_visitors.warm()
+        except Exception as e:
+            print(f"⚠️ Could not warm recent visitors feed: {e}")
+        if event_log.directories():
+            event_replayer.ensure_started()
+        return True
+
+    def reset_after_fork(self):
+        """Drop the parent's client in a forked child and reconnect in the background"""
+        self.client = None
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        _publish_database(None, None)
+        pool_monitor.reset()
+        mongo_breaker.reset()
+        self.start()
+
+mongo_connection = MongoConnection(MONGO_URI)
+os.register_at_fork(after_in_child=lambda: mongo_connection.reset_after_fork())
+
+def cli_database():
+    """The database for CLI commands, connecting in the foreground if needed"""
+    if db is None:
+        mongo_connection.connect()
+    if db is None:
+        raise click.ClickException('MongoDB not available')
+    return db
+
+# Visitor write-behind settings
+VISITOR_QUEUE_MAXSIZE = int(os.getenv('VISITOR_QUEUE_MAXSIZE', '10000'))
+VISITOR_BATCH_SIZE = int(os.getenv('VISITOR_BATCH_SIZE', '500'))
+VISITOR_FLUSH_INTERVAL = float(os.getenv('VISITOR_FLUSH_INTERVAL', '1.0'))
+
+def _insert_new(collection, docs, kind):
+    """Unordered insert_many that treats duplicate _ids as already stored.
+
+    Returns the documents that were actually inserted by this call, which is
+    what makes replaying the event log after a crash idempotent.
+    """
     try:
-        if visitors_collection is not None:
-            visitor_data = {
-                'ip': request.environ.get('REMOTE_ADDR', 'unknown'),
-                'user_agent': request.environ.get('HTTP_USER_AGENT', 'unknown'),
-                'timestamp': datetime.now(timezone.utc),
-                'page': request.path
-            }
-            visitors_collection.insert_one(visitor_data)
-            
-            # Update stats
+        collection.insert_many(docs, ordered=False)
+        return docs
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        failed = {error.get('index') for error in errors}
+        rejected = sum(1 for error in errors if error.get('code') != 11000)
+        if rejected:
+            print(f"⚠️ {rejected} {kind} documents rejected by MongoDB")
+            if kind == 'visitor':
+                VISITOR_EVENTS_DROPPED.labels('write_error').inc(rejected)
+        return [doc for index, doc in enumerate(docs) if index not in failed]
+
+def _write_visitor_batch(events):
+    """Insert a batch of visitor events and fold them into one counter update"""
+    if visitors_collection is None or stats_collection is None:
+        raise RuntimeError('MongoDB not available')
+    stored = _insert_new(visitors_collection, events, 'visitor')
+    if stored:
+        unique_visitors.add_events(stored)
+        heavy_hitters.add_events(stored)
+        try:
+            increment_visitor_counter(len(stored))
+        except Exception as e:
+            # The visits are stored now, so replaying them would be skipped as
+            # duplicates. Park the counter and rollup updates on their own
+            print(f"Error counting stored visits, spooling their effects: {e}")
+            spool_events('visitor_effects', [{
+                '_id': ObjectId(),
+                'visits': [{'timestamp': event.get('timestamp'), 'page': event.get('page')} for event in stored],
+            }])
+            return len(stored)
+        _update_visitor_rollups(stored)
+    return len(stored)
+
+def _write_visitor_effects(records):
+    """Replay the counter and rollup updates of visits that are already stored.
+
+    Each record counts into a shard named after it, created once and never
+    incremented, so replaying a record twice does not count it twice.
+    """
+    if stats_collection is None:
+        raise RuntimeError('MongoDB not available')
+    for record in records:
+        visits = record.get('visits', [])
+        stats_collection.update_one(
+            {'_id': f"{VISITOR_COUNTER}:batch:{record['_id']}"},
+            {'$setOnInsert': {'counter': VISITOR_COUNTER, 'total_visitors': len(visits),
+                              'last_updated': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        _update_visitor_rollups(visits)
+    return len(records)
+
+# Pre-aggregated traffic: one document per granularity, page and time bucket.
+# Page '*' holds the total across all pages.
+ROLLUP_GRANULARITIES = {
+    'minute': {'step': timedelta(minutes=1), 'window': timedelta(hours=1), 'max_points': 1440},
+    'hour': {'step': timedelta(hours=1), 'window': timedelta(days=1), 'max_points': 744},
+    'day': {'step': timedelta(days=1), 'window': timedelta(days=30), 'max_points': 366},
+}
+ROLLUP_ALL_PAGES = '*'
+
+def _as_utc(moment):
+    # Documents read back from MongoDB or the event log carry naive UTC datetimes
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+def rollup_bucket(moment, granularity):
+    """Truncate a datetime to the start of its rollup bucket"""
+    moment = _as_utc(moment).replace(second=0, microsecond=0)
+    if granularity in ('hour', 'day'):
+        moment = moment.replace(minute=0)
+    if granularity == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+def _update_visitor_rollups(events):
+    """Fold a batch of visits into the rollup documents with one bulk write"""
+    counts = {}
+    for event in events:
+        timestamp = event.get('timestamp')
+        if not isinstance(timestamp, datetime):
+            continue
+        for granularity in ROLLUP_GRANULARITIES:
+            bucket = rollup_bucket(timestamp, granularity)
+            for page in (event.get('page', 'unknown'), ROLLUP_ALL_PAGES):
+                key = (granularity, page, bucket)
+                counts[key] = counts.get(key, 0) + 1
+    if not counts or rollups_collection is None:
+        return
+    try:
+        rollups_collection.bulk_write([
+            UpdateOne(
+                {'_id': f"{granularity}:{page}:{bucket:%Y-%m-%dT%H:%M}"},
+                {'$inc': {'count': count},
+                 '$setOnInsert': {'granularity': granularity, 'page': page, 'bucket': bucket}},
+                upsert=True
+            )
+            for (granularity, page, bucket), count in counts.items()
+        ], ordered=False)
+    except Exception as e:
+        # The visits themselves are stored, a lost rollup increment only dents a graph
+        print(f"Error updating visitor rollups: {e}")
+
+def _visitor_counter_shard_id():
+    # Resolved per call so forked workers never share their parent's shards
+    return f"{VISITOR_COUNTER}:{POD_NAME}:{os.getpid()}:{random.randrange(VISITOR_COUNTER_STRIPES)}"
+
+def increment_visitor_counter(amount=1):
+    """Add to this worker's counter shard"""
+    stats_collection.update_one(
+        {'_id': _visitor_counter_shard_id()},
+        {'$inc': {'total_visitors': amount},
+         '$set': {'counter': VISITOR_COUNTER, 'last_updated': datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+# Covered by the counter_total index, enough whenever no fold is running
+VISITOR_COUNTER_PROJECTION = {'_id': 0, 'total_visitors': 1}
+# The base document's fold records, read by _id around the covered scan
+VISITOR_COUNTER_BASE_PROJECTION = {'_id': 0, 'folds': 1, 'fold_seq': 1}
+# Fields needed to correct the total for folds in progress
+VISITOR_COUNTER_FOLD_PROJECTION = {'total_visitors': 1, 'folds': 1, 'applied': 1}
+
+def visitor_counter_settled(before, after):
+    """True when no fold ran between two reads of the base document"""
+    return before == after and not (before or {}).get('folds')
+
+def visitor_counter_total(docs):
+    """Sum counter documents read with VISITOR_COUNTER_FOLD_PROJECTION.
+
+    A fold in progress has already added its value to the base document; it
+    is subtracted again until the shard has been decremented, so a read
+    between the two writes is neither short nor over.
+    """
+    docs = list(docs)
+    applied = {doc.get('_id'): set(doc.get('applied', ())) for doc in docs}
+    total = sum(doc.get('total_visitors', 0) for doc in docs)
+    for doc in docs:
+        for fold in doc.get('folds', ()):
+            if fold['_id'] not in applied.get(fold['shard'], ()):
+                total -= fold['value']
+    return total
+
+def _finish_fold(fold):
+    """Move a recorded fold's value out of its shard, then drop the record.
+
+    Both writes are idempotent, so an interrupted fold is completed by the
+    next compaction from any worker. The shard keeps the ids of its recent
+    folds rather than only the last one, so a worker that stalled before
+    finishing a fold cannot apply it again after a newer fold.
+    """
+    try:
+        stats_collection.update_one(
+            {'_id': fold['shard'], 'applied': {'$ne': fold['_id']}},
+            {'$inc': {'total_visitors': -fold['value']},
+             '$push': {'applied': {'$each': [fold['_id']], '$slice': -VISITOR_COUNTER_APPLIED_FOLDS}},
+             '$set': {'counter': VISITOR_COUNTER, 'last_updated': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # the shard already carries this fold
+    stats_collection.update_one({'_id': VISITOR_COUNTER_BASE_ID}, {'$pull': {'folds': {'_id': fold['_id']}}})
+
+def compact_visitor_counter():
+    """Fold every counter shard into the base document; returns shards folded.
+
+    A fold first adds the shard's value to the base document together with a
+    record of the fold, then subtracts it from the shard. Increments racing
+    with compaction only ever land in the shard and stay there for the next
+    run, and a fold cut short by a failure or a dead worker is finished
+    later instead of losing the shard's count. Safe to run from several
+    workers at once.
+    """
+    folded = 0
+    if stats_collection is None:
+        return folded
+    base = stats_collection.find_one({'_id': VISITOR_COUNTER_BASE_ID}, {'folds': 1}) or {}
+    for fold in base.get('folds', ()):
+        _finish_fold(fold)
+    shards = stats_collection.find(
+        {'counter': VISITOR_COUNTER, '_id': {'$ne': VISITOR_COUNTER_BASE_ID}},
+        {'total_visitors': 1}
+    )
+    idle_since = datetime.now(timezone.utc) - timedelta(days=1)
+    for shard in list(shards):
+        value = shard.get('total_visitors', 0)
+        if not value:
+            # Emptied shards of exited workers. Only long-idle ones go, so no
+            # fold still being finished can refer to them
+            stats_collection.delete_one({'_id': shard['_id'], 'total_visitors': 0,
+                                         'last_updated': {'$lt': idle_since}})
+            continue
+        fold = {'_id': ObjectId(), 'shard': shard['_id'], 'value': value}
+        try:
             stats_collection.update_one(
-                {},
-                {'$inc': {'total_visitors': 1}, '$set': {'last_updated': datetime.now(timezone.utc)}},
+                {'_id': VISITOR_COUNTER_BASE_ID, 'folds.shard': {'$ne': shard['_id']}},
+                {'$inc': {'total_visitors': value, 'fold_seq': 1},
+                 '$push': {'folds': fold},
+                 '$set': {'counter': VISITOR_COUNTER, 'last_updated': datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            continue  # another worker is folding this shard
+        _finish_fold(fold)
+        folded += 1
+    VISITOR_COUNTER_COMPACTIONS.inc(folded)
+    return folded
+
+class PeriodicTask:
+    """Runs a function at most once per interval when polled from a loop"""
+
+    def __init__(self, name, interval, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._last_run = time.monotonic()
+
+    def poll(self):
+        if time.monotonic() - self._last_run < self.interval:
+            return
+        self._last_run = time.monotonic()
+        self.run()
+
+    def run(self):
+        try:
+            self.func()
+        except Exception as e:
+            print(f"Error running {self.name}: {e}")
+
+# Housekeeping polled by the visitor writer thread between flushes
+visitor_maintenance = [
+    PeriodicTask('visitor counter compaction', VISITOR_COUNTER_COMPACT_INTERVAL, compact_visitor_counter),
+]
+
+class VisitorWriter:
+    """Per-worker write-behind queue for visitor events.
+
+    track_visitor() only enqueues; a daemon thread flushes the queue with an
+    unordered insert_many plus a single $inc whenever batch_size events are
+    waiting or flush_interval seconds have passed.
+    """
+
+    def __init__(self, maxsize=VISITOR_QUEUE_MAXSIZE, batch_size=VISITOR_BATCH_SIZE,
+                 flush_interval=VISITOR_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._flush_lock = threading.RLock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, event):
+        """Queue an event without blocking; returns False if it was dropped"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # MongoDB is not keeping up, park the event on disk instead
+            return spool_events('visitor', [event])
+        depth = self._queue.qsize()
+        VISITOR_QUEUE_DEPTH.set(depth)
+        if depth >= self.batch_size:
+            self._wakeup.set()
+        self._ensure_started()
+        return True
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so a dead thread is simply restarted
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='visitor-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            for task in visitor_maintenance:
+                task.poll()
+        self.flush()
+
+    def _take_batch(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """Write out everything queued so far; returns the number of events stored"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                started = time.perf_counter()
+                try:
+                    written += _write_visitor_batch(batch)
+                    VISITOR_FLUSH_SIZE.observe(len(batch))
+                except Exception as e:
+                    print(f"Error flushing visitor batch: {e}")
+                    spool_events('visitor', batch)
+                finally:
+                    VISITOR_FLUSH_LATENCY.observe(time.perf_counter() - started)
+            VISITOR_QUEUE_DEPTH.set(self._queue.qsize())
+        return written
+
+    def stop(self, timeout=5.0):
+        """Stop the writer thread, letting it drain the queue first"""
+        self._stopping.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+
+visitor_writer = VisitorWriter()
+
+def _drain_visitor_writer():
+    visitor_writer.stop()
+    visitor_writer.flush()
+    unique_visitors.flush()
+    heavy_hitters.flush()
+
+atexit.register(_drain_visitor_writer)
+
+def _install_sigterm_drain():
+    """Chain a SIGTERM handler that drains the visitor queue before exiting.
+
+    Only the writer thread touches MongoDB here, so the handler never blocks
+    on a lock the interrupted main thread might be holding.
+    """
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle_sigterm(signum, frame):
+            visitor_writer.stop()
+            if callable(previous):
+                previous(signum, frame)
+            elif previous != signal.SIG_IGN:
+                signal.signal(signum, signal.SIG_DFL)
+                os.kill(os.getpid(), signum)
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+    except ValueError:
+        # signal handlers can only be installed from the main thread
+        pass
+
+_install_sigterm_drain()
+
+# ============================================
+# Heavy Hitters
+# ============================================
+
+TOP_FIELDS = ('page', 'user_agent')
+TOP_CAPACITY = int(os.getenv('TOP_CAPACITY', '100'))
+TOP_FLUSH_INTERVAL = float(os.getenv('TOP_FLUSH_INTERVAL', '30'))
+TOP_MAX_ITEM_LENGTH = 256
+
+class SpaceSaving:
+    """Space-Saving top-k sketch holding at most capacity counters.
+
+    When a new item arrives and every slot is taken, the smallest counter is
+    handed over to it and its old value recorded as the error bound, so
+    memory stays fixed however many distinct items show up.
+    """
+
+    def __init__(self, capacity=TOP_CAPACITY):
+        self.capacity = capacity
+        self.counters = {}
+
+    def add(self, item, count=1, error=0):
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+            counter[1] += error
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [count, error]
+        else:
+            smallest = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(smallest)[0]
+            self.counters[item] = [floor + count, floor + error]
+
+    def top(self, k):
+        ranked = sorted(self.counters.items(), key=lambda entry: entry[1][0], reverse=True)
+        return [{'item': item, 'count': count, 'error': error} for item, (count, error) in ranked[:k]]
+
+class HeavyHitterTracker:
+    """Per-worker Space-Saving sketches for the TOP_FIELDS of stored visits.
+
+    Each worker periodically overwrites its own snapshot document; readers
+    combine the recent snapshots of all workers with this worker's live
+    sketch, never touching the raw visitors collection.
+    """
+
+    def __init__(self, fields=TOP_FIELDS, capacity=TOP_CAPACITY):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._sketches = {field: SpaceSaving(capacity) for field in fields}
+        self._dirty = False
+
+    def add_events(self, events):
+        with self._lock:
+            for event in events:
+                for field, sketch in self._sketches.items():
+                    sketch.add(str(event.get(field, 'unknown'))[:TOP_MAX_ITEM_LENGTH])
+            self._dirty = True
+
+    def snapshot(self, field):
+        with self._lock:
+            return self._sketches[field].top(self.capacity)
+
+    def worker_id(self, field):
+        return f"{field}:{POD_NAME}:{os.getpid()}"
+
+    def flush(self):
+        if top_collection is None or not self._dirty:
+            return 0
+        with self._lock:
+            snapshots = {field: sketch.top(self.capacity) for field, sketch in self._sketches.items()}
+            self._dirty = False
+        try:
+            top_collection.bulk_write([
+                UpdateOne(
+                    {'_id': self.worker_id(field)},
+                    {'$set': {'field': field, 'counters': counters, 'updated': datetime.now(timezone.utc)}},
+                    upsert=True
+                )
+                for field, counters in snapshots.items()
+            ], ordered=False)
+        except Exception:
+            self._dirty = True
+            raise
+        return len(snapshots)
+
+heavy_hitters = HeavyHitterTracker()
+visitor_maintenance.append(PeriodicTask('heavy hitter flush', TOP_FLUSH_INTERVAL, heavy_hitters.flush))
+
+def top_visitors(field, k):
+    """Top k values of a visit field across all workers"""
+    combined = SpaceSaving(capacity=TOP_CAPACITY * 4)
+    for counter in heavy_hitters.snapshot(field):
+        combined.add(counter['item'], counter['count'], counter['error'])
+    if top_collection is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=TOP_RETENTION_DAYS)
+        for doc in top_collection.find({'field': field, 'updated': {'$gte': cutoff}}):
+            if doc.get('_id') == heavy_hitters.worker_id(field):
+                continue  # this worker's live sketch is already counted
+            for counter in doc.get('counters', []):
+                combined.add(counter['item'], counter['count'], counter.get('error', 0))
+    return combined.top(k)
+
+# ============================================
+# Durable Event Log
+# ============================================
+
+EVENT_LOG_DIR = os.getenv('EVENT_LOG_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'events'))
+EVENT_LOG_SEGMENT_BYTES = int(os.getenv('EVENT_LOG_SEGMENT_BYTES', str(4 * 1024 * 1024)))
+EVENT_LOG_FSYNC = os.getenv('EVENT_LOG_FSYNC', 'False').lower() in ('1', 'true', 'yes')
+EVENT_REPLAY_BATCH_SIZE = int(os.getenv('EVENT_REPLAY_BATCH_SIZE', '500'))
+EVENT_REPLAY_INTERVAL = float(os.getenv('EVENT_REPLAY_INTERVAL', '5'))
+
+def _try_lock(path):
+    """Take a non-blocking exclusive flock; returns the open file or None"""
+    handle = open(path, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return handle
+    except OSError:
+        handle.close()
+        return None
+
+def _lock_owner(directory):
+    """Create directory and block until this process holds its owner lock.
+
+    A replayer holds the lock for a moment to test whether the owner is
+    alive. If it found the directory abandoned it deletes the lock file, so
+    a lock taken on a file that has since been unlinked is retaken.
+    """
+    path = os.path.join(directory, 'owner.lock')
+    while True:
+        os.makedirs(directory, exist_ok=True)
+        handle = open(path, 'a')
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            if os.fstat(handle.fileno()).st_ino == os.stat(path).st_ino:
+                return handle
+        except OSError:
+            pass
+        handle.close()
+
+class EventLog:
+    """Append-only, segmented on-disk log of writes MongoDB could not take.
+
+    Every process appends to its own directory (<pod>-<pid>) of numbered
+    segment files holding one Extended JSON record per line, and holds an
+    owner lock on it while alive. Records carry their final _id, so the
+    replayer can stream them into MongoDB more than once without creating
+    duplicates.
+    """
+
+    def __init__(self, root, segment_bytes=EVENT_LOG_SEGMENT_BYTES, fsync=EVENT_LOG_FSYNC):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._owner_lock = None
+        self._segment = 0
+
+    def _open(self):
+        # Re-open after fork so a worker never appends to its parent's files
+        if self._file is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        directory = os.path.join(self.root, f"{POD_NAME}-{self._pid}")
+        # Never append without the owner lock, or a replayer would take the
+        # directory for abandoned and delete the segment being written
+        self._owner_lock = _lock_owner(directory)
+        segments = sorted(glob.glob(os.path.join(directory, '*.log')))
+        self._segment = int(os.path.basename(segments[-1])[:-4]) if segments else 0
+        self._file = open(os.path.join(directory, f"{self._segment:012d}.log"), 'ab')
+
+    def append(self, kind, docs):
+        """Append documents of one kind; returns once they reach the OS"""
+        lines = b''.join(
+            json_util.dumps({'kind': kind, 'doc': doc}).encode('utf-8') + b'\n' for doc in docs
+        )
+        with self._lock:
+            self._open()
+            if self._file.tell() >= self.segment_bytes:
+                self._file.close()
+                self._segment += 1
+                self._file = open(os.path.join(os.path.dirname(self._file.name), f"{self._segment:012d}.log"), 'ab')
+            self._file.write(lines)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        EVENT_LOG_APPENDS.labels(kind).inc(len(docs))
+
+    def directories(self):
+        return sorted(glob.glob(os.path.join(self.root, '*', '')))
+
+    def pending_bytes(self):
+        total = 0
+        for directory in self.directories():
+            offset, segment = self._read_checkpoint(directory)
+            for path in sorted(glob.glob(os.path.join(directory, '*.log'))):
+                name = os.path.basename(path)
+                if segment is not None and name < segment:
+                    continue
+                total += os.path.getsize(path) - (offset if name == segment else 0)
+        return total
+
+    @staticmethod
+    def _read_checkpoint(directory):
+        try:
+            with open(os.path.join(directory, 'checkpoint.json')) as f:
+                checkpoint = json.load(f)
+            return checkpoint['offset'], checkpoint['segment']
+        except (OSError, ValueError, KeyError):
+            return 0, None
+
+    @staticmethod
+    def _write_checkpoint(directory, segment, offset):
+        path = os.path.join(directory, 'checkpoint.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'segment': segment, 'offset': offset}, f)
+        os.replace(path + '.tmp', path)
+
+    def replay(self, writers, batch_size=EVENT_REPLAY_BATCH_SIZE):
+        """Stream every log directory into MongoDB; returns records replayed.
+
+        writers maps a record kind to a function taking a list of documents.
+        The checkpoint only advances after a batch was written, and a writer
+        that raises stops the replay so it resumes from there next time.
+        """
+        replayed = 0
+        for directory in self.directories():
+            replay_lock = _try_lock(os.path.join(directory, 'replay.lock'))
+            if replay_lock is None:
+                continue  # another worker is replaying this log
+            try:
+                replayed += self._replay_directory(directory, writers, batch_size)
+            finally:
+                replay_lock.close()
+        EVENT_LOG_PENDING_BYTES.set(self.pending_bytes())
+        return replayed
+
+    def _replay_directory(self, directory, writers, batch_size):
+        replayed = 0
+        offset, checkpoint_segment = self._read_checkpoint(directory)
+        owner_lock = _try_lock(os.path.join(directory, 'owner.lock'))
+        owner_alive = owner_lock is None
+        try:
+            segments = sorted(glob.glob(os.path.join(directory, '*.log')))
+            for index, path in enumerate(segments):
+                name = os.path.basename(path)
+                if checkpoint_segment is not None and name < checkpoint_segment:
+                    os.remove(path)
+                    continue
+                start = offset if name == checkpoint_segment else 0
+                with open(path, 'rb') as f:
+                    f.seek(start)
+                    while True:
+                        # Only whole lines count, a torn tail is retried later
+                        lines = []
+                        for _ in range(batch_size):
+                            line = f.readline()
+                            if not line.endswith(b'\n'):
+                                break
+                            lines.append(line)
+                        if not lines:
+                            break
+                        replayed += self._replay_lines(lines, writers)
+                        start += sum(len(line) for line in lines)
+                        self._write_checkpoint(directory, name, start)
+                is_active = owner_alive and index == len(segments) - 1
+                if not is_active:
+                    os.remove(path)
+            if not owner_alive:
+                for leftover in ('checkpoint.json', 'owner.lock', 'replay.lock'):
+                    try:
+                        os.remove(os.path.join(directory, leftover))
+                    except OSError:
+                        pass
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        finally:
+            if owner_lock is not None:
+                owner_lock.close()
+        return replayed
+
+    @staticmethod
+    def _replay_lines(lines, writers):
+        batches = {}
+        for line in lines:
+            try:
+                record = json_util.loads(line)
+                batches.setdefault(record['kind'], []).append(record['doc'])
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Skipping unreadable event log record: {e}")
+        for kind, docs in batches.items():
+            writers[kind](docs)
+            EVENT_LOG_REPLAYED.labels(kind).inc(len(docs))
+        return sum(len(docs) for docs in batches.values())
+
+event_log = EventLog(EVENT_LOG_DIR)
+
+class EventReplayer:
+    """Daemon thread that replays the event log once MongoDB is back"""
+
+    def __init__(self, log, interval=EVENT_REPLAY_INTERVAL):
+        self.log = log
+        self.interval = interval
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='event-replayer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.run_once()
+
+    def run_once(self):
+        if visitors_collection is None or contacts_collection is None:
+            return 0
+        try:
+            return self.log.replay({'visitor': _write_visitor_batch,
+                                    'visitor_effects': _write_visitor_effects,
+                                    'contact': _write_contact_batch})
+        except Exception as e:
+            print(f"Event log replay paused: {e}")
+            return 0
+
+event_replayer = EventReplayer(event_log)
+
+def spool_events(kind, docs):
+    """Park documents in the event log for later replay; returns True if stored"""
+    try:
+        event_log.append(kind, docs)
+        event_replayer.ensure_started()
+        return True
+    except Exception as e:
+        print(f"Error spooling {kind} events: {e}")
+        if kind == 'visitor':
+            VISITOR_EVENTS_DROPPED.labels('spool_error').inc(len(docs))
+        return False
+
+# ============================================
+# Recent Visitors Feed
+# ============================================
+
+RECENT_VISITORS_SIZE = int(os.getenv('RECENT_VISITORS_SIZE', '10'))
+RECENT_VISITORS_PUBLISH_INTERVAL = float(os.getenv('RECENT_VISITORS_PUBLISH_INTERVAL', '5'))
+
+class RecentVisitors:
+    """Bounded per-process ring buffer of the latest visits, newest first.
+
+    track_visitor() pushes into it and one query warms it at startup, so the
+    default feed never touches MongoDB. For a cluster-wide view every worker
+    periodically publishes its buffer to one small document, and the merged
+    feed combines those with the local buffer.
+    """
+
+    def __init__(self, size=RECENT_VISITORS_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._visits = deque(maxlen=size)
+        self._dirty = False
+
+    def add(self, visit):
+        with self._lock:
+            self._visits.appendleft(visit)
+            self._dirty = True
+
+    def latest(self):
+        with self._lock:
+            return list(self._visits)
+
+    @staticmethod
+    def _from_mongo(visit):
+        # Read back naive; every visit in the feed carries an aware UTC timestamp
+        return dict(visit, timestamp=_as_utc(visit['timestamp']))
+
+    def warm(self):
+        """Seed the buffer with the newest stored visits"""
+        stored = [self._from_mongo(visit)
+                  for visit in visitors_collection.find().sort('timestamp', -1).limit(self.size)]
+        with self._lock:
+            known = {visit.get('_id') for visit in self._visits}
+            merged = list(self._visits) + [visit for visit in stored if visit.get('_id') not in known]
+            merged.sort(key=lambda visit: visit['timestamp'], reverse=True)
+            self._visits = deque(merged[:self.size], maxlen=self.size)
+
+    def worker_id(self):
+        return f"{POD_NAME}:{os.getpid()}"
+
+    def publish(self):
+        if recent_collection is None or not self._dirty:
+            return
+        with self._lock:
+            visits = list(self._visits)
+            self._dirty = False
+        try:
+            recent_collection.update_one(
+                {'_id': self.worker_id()},
+                {'$set': {'visits': visits, 'updated': datetime.now(timezone.utc)}},
                 upsert=True
             )
+        except Exception:
+            self._dirty = True
+            raise
+
+    def published_query(self):
+        """Filter and projection for the buffers workers published recently"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=RECENT_VISITORS_STALE_AFTER)
+        return {'updated': {'$gte': cutoff}}, {'visits': 1}
+
+    def merged(self):
+        """Newest visits across every worker that published recently"""
+        return self.merge(recent_collection.find(*self.published_query()))
+
+    def merge(self, published):
+        """Fold published buffer documents into the local buffer, newest first"""
+        visits = {visit['_id']: visit for visit in self.latest()}
+        for doc in published:
+            if doc.get('_id') == self.worker_id():
+                continue
+            for visit in doc.get('visits', []):
+                if visit['_id'] not in visits:
+                    visits[visit['_id']] = self._from_mongo(visit)
+        ranked = sorted(visits.values(), key=lambda visit: visit['timestamp'], reverse=True)
+        return ranked[:self.size]
+
+recent_visitors = RecentVisitors()
+visitor_maintenance.append(PeriodicTask('recent visitors publish', RECENT_VISITORS_PUBLISH_INTERVAL, recent_visitors.publish))
+
+def new_visitor(ip, user_agent, page):
+    """Build a visit document"""
+    return {
+        '_id': ObjectId(),
+        'ip': ip,
+        'user_agent': user_agent,
+        'timestamp': datetime.now(timezone.utc),
+        'page': page
+    }
+
+def visitor_event():
+    """Build the visit document for the current request"""
+    return new_visitor(request.environ.get('REMOTE_ADDR', 'unknown'),
+                       request.environ.get('HTTP_USER_AGENT', 'unknown'),
+                       request.path)
+
+def record_visitor(visitor_data):
+    """Queue a visit for the background writer, or spool it while MongoDB is down"""
+    try:
+        if visitors_collection is not None:
+            return visitor_writer.submit(visitor_data)
+        return spool_events('visitor', [visitor_data])
+    except Exception as e:
+        print(f"Error tracking visitor: {e}")
+    return False
+
+def track_visitor(defer=False):
+    """Track the current request as a visit.
+
+    The recent-visitors feed is updated straight away. With defer=True the
+    write itself runs once the response has been sent (see after_response).
+    """
+    try:
+        visitor_data = visitor_event()
+        recent_visitors.add(visitor_data)
+        if defer:
+            after_response(record_visitor, visitor_data)
             return True
+        return record_visitor(visitor_data)
     except Exception as e:
         print(f"Error tracking visitor: {e}")
     return False
 
-def get_visitor_count():
-    """Get total visitor count from database"""
+class CachedValue:
+    """Per-process TTL cache for a single value with stale-while-revalidate.
+
+    The first lookup loads synchronously. Once the TTL has passed the stale
+    value keeps being served while exactly one background thread reloads it,
+    so a slow MongoDB never shows up in request latency. A failed refresh
+    keeps the stale value and is retried on the next lookup.
+    """
+
+    def __init__(self, name, loader, ttl):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded_at = None
+        self._refreshing = False
+
+    def get(self):
+        found, value = self.lookup()
+        if found:
+            return value
+        value = self.loader()
+        self.store(value)
+        return value
+
+    def lookup(self):
+        """(True, value) when a value is cached, fresh or stale; (False, None) on a miss.
+
+        Never loads in the caller's thread, which lets async callers do the
+        first load themselves and store() the result.
+        """
+        with self._lock:
+            loaded_at = self._loaded_at
+            if loaded_at is not None:
+                if time.monotonic() - loaded_at < self.ttl:
+                    CACHE_REQUESTS.labels(self.name, 'hit').inc()
+                    return True, self._value
+                CACHE_REQUESTS.labels(self.name, 'stale').inc()
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, name=f'{self.name}-refresh', daemon=True).start()
+                return True, self._value
+        CACHE_REQUESTS.labels(self.name, 'miss').inc()
+        return False, None
+
+    def store(self, value):
+        with self._lock:
+            self._value = value
+            self._loaded_at = time.monotonic()
+
+    def _refresh(self):
+        try:
+            self.store(self.loader())
+        except Exception as e:
+            CACHE_REFRESH_ERRORS.labels(self.name).inc()
+            print(f"Error refreshing {self.name} cache: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._loaded_at = None
+
+VISITOR_COUNT_CACHE_TTL = float(os.getenv('VISITOR_COUNT_CACHE_TTL', '5'))
+
+def _count_visitors():
+    """Sum the counter shards; raises if MongoDB is not available.
+
+    The shards are summed from the index alone. A fold moves value between
+    two documents, so the base document's fold records are read before and
+    after the scan, and only if a fold was in flight are the shards read
+    again with the fields needed to correct for it.
+    """
+    if stats_collection is None:
+        raise RuntimeError('MongoDB not available')
+    base = {'_id': VISITOR_COUNTER_BASE_ID}
+    before = stats_collection.find_one(base, VISITOR_COUNTER_BASE_PROJECTION)
+    shards = list(stats_collection.find({'counter': VISITOR_COUNTER}, VISITOR_COUNTER_PROJECTION))
+    after = stats_collection.find_one(base, VISITOR_COUNTER_BASE_PROJECTION)
+    if not visitor_counter_settled(before, after):
+        shards = list(stats_collection.find({'counter': VISITOR_COUNTER}, VISITOR_COUNTER_FOLD_PROJECTION))
+        if shards:
+            return visitor_counter_total(shards)
+    elif shards:
+        return sum(shard.get('total_visitors', 0) for shard in shards)
+    return 42
+
+visitor_count_cache = CachedValue('visitor_count', _count_visitors, VISITOR_COUNT_CACHE_TTL)
+
+def get_visitor_count():
+    """Get total visitor count, cached per process for VISITOR_COUNT_CACHE_TTL seconds"""
+    try:
+        return visitor_count_cache.get()
+    except:
+        pass
+    return 42  # Fallback
+
+# ============================================
+# Unique Visitor Sketches
+# ============================================
+
+HLL_PRECISION = int(os.getenv('HLL_PRECISION', '12'))
+HLL_FLUSH_INTERVAL = float(os.getenv('HLL_FLUSH_INTERVAL', '30'))
+UNIQUE_VISITORS_CACHE_TTL = float(os.getenv('UNIQUE_VISITORS_CACHE_TTL', '30'))
+
+# 2 ** -rank for every possible register value, so estimates are one table walk
+_HLL_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+class HyperLogLog:
+    """Fixed-size HyperLogLog sketch with 2 ** p one-byte registers.
+
+    With the default p=12 a sketch is 4 KiB and estimates cardinality within
+    about 1.6%. Sketches merge by taking the register-wise maximum, so the
+    union of several workers' sketches is exact with respect to each of them.
+    """
+
+    def __init__(self, p=HLL_PRECISION, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError(f"expected {self.m} registers, got {len(self.registers)}")
+
+    def add(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.p)
+        remainder = hashed & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError('cannot merge sketches with different precision')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(_HLL_INVERSE_POWERS[rank] for rank in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+def unique_sketch_key(day, page=ROLLUP_ALL_PAGES):
+    return f"day:{day.isoformat()}:{page}"
+
+class UniqueVisitorTracker:
+    """Per-worker HyperLogLog sketches of (ip, user agent) per day and page.
+
+    Visits update in-memory sketches; flush() overwrites this worker's own
+    sketch documents in MongoDB, so workers never contend on a document.
+    Readers merge every worker's sketch for a key, which costs a handful of
+    4 KiB documents no matter how much traffic there was.
+    """
+
+    def __init__(self, p=HLL_PRECISION, retention_days=HLL_RETENTION_DAYS):
+        self.p = p
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._sketches = {}
+        self._dirty = set()
+
+    def add_events(self, events):
+        with self._lock:
+            for event in events:
+                timestamp = event.get('timestamp')
+                if not isinstance(timestamp, datetime):
+                    continue
+                day = _as_utc(timestamp).date()
+                visitor = f"{event.get('ip', 'unknown')}|{event.get('user_agent', 'unknown')}"
+                for page in (event.get('page', 'unknown'), ROLLUP_ALL_PAGES):
+                    key = unique_sketch_key(day, page)
+                    sketch = self._sketches.get(key)
+                    if sketch is None:
+                        sketch = self._sketches[key] = HyperLogLog(self.p)
+                    sketch.add(visitor)
+                    self._dirty.add(key)
+
+    def local_sketch(self, key):
+        with self._lock:
+            sketch = self._sketches.get(key)
+            return HyperLogLog(self.p, sketch.registers) if sketch is not None else None
+
+    def flush(self):
+        """Persist dirty sketches and forget days past the retention window"""
+        if sketches_collection is None:
+            return 0
+        with self._lock:
+            pending = {key: self._sketches[key].to_bytes() for key in self._dirty}
+            self._dirty.clear()
+        worker = f"{POD_NAME}:{os.getpid()}"
+        try:
+            if pending:
+                sketches_collection.bulk_write([
+                    UpdateOne(
+                        {'_id': f"{key}:{worker}"},
+                        {'$set': {'key': key, 'p': self.p, 'registers': registers,
+                                  'updated': datetime.now(timezone.utc)}},
+                        upsert=True
+                    )
+                    for key, registers in pending.items()
+                ], ordered=False)
+        except Exception:
+            with self._lock:
+                self._dirty.update(pending)
+            raise
+        oldest = (datetime.now(timezone.utc) - timedelta(days=self.retention_days)).date()
+        with self._lock:
+            for key in list(self._sketches):
+                if key not in self._dirty and key.split(':')[1] < oldest.isoformat():
+                    del self._sketches[key]
+        return len(pending)
+
+unique_visitors = UniqueVisitorTracker()
+visitor_maintenance.append(PeriodicTask('unique visitor sketch flush', HLL_FLUSH_INTERVAL, unique_visitors.flush))
+
+def estimate_unique_visitors(day, page=ROLLUP_ALL_PAGES):
+    """Merge every worker's sketch for a day and page into one estimate"""
+    key = unique_sketch_key(day, page)
+    merged = unique_visitors.local_sketch(key) or HyperLogLog(HLL_PRECISION)
+    if sketches_collection is not None:
+        for doc in sketches_collection.find({'key': key}, {'_id': 0, 'p': 1, 'registers': 1}):
+            if doc.get('p') == merged.p:
+                merged.merge(HyperLogLog(doc['p'], doc['registers']))
+    return merged.estimate()
+
+unique_today_cache = CachedValue(
+    'unique_visitors_today',
+    lambda: estimate_unique_visitors(datetime.now(timezone.utc).date()),
+    UNIQUE_VISITORS_CACHE_TTL
+)
+
+def get_unique_visitors_today():
+    """Estimated distinct visitors today, cached per process"""
     try:
-        if stats_collection is not None:
-            stats = stats_collection.find_one({})
-            return stats.get('total_visitors', 42) if stats else 42
-    except:
-        pass
-    return 42  # Fallback
+        return unique_today_cache.get()
+    except Exception:
+        return 0
+
+# Comma-separated route templates to keep their own series, e.g.
+# "/,/api/stats,/api/visitors"; empty means every route of the app
+METRICS_ENDPOINTS = frozenset(e.strip() for e in os.getenv('METRICS_ENDPOINTS', '').split(',') if e.strip())
+METRICS_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+def metrics_endpoint(rule):
+    """Endpoint label for a matched route template; 'other' for unmatched or unlisted routes"""
+    if rule is None or (METRICS_ENDPOINTS and rule not in METRICS_ENDPOINTS):
+        return 'other'
+    return rule
+
+def observe_request(method, rule, status, seconds, request_bytes, response_bytes):
+    """Record one request; response_bytes is None when the body is streamed"""
+    endpoint = metrics_endpoint(rule)
+    REQUEST_COUNT.labels(method if method in METRICS_METHODS else 'other', endpoint, status).inc()
+    REQUEST_LATENCY.labels(endpoint).observe(seconds)
+    REQUEST_SIZE.labels(endpoint).observe(request_bytes or 0)
+    if response_bytes is not None:
+        RESPONSE_SIZE.labels(endpoint).observe(response_bytes)
 
 @app.before_request
 def before_request():
-    request._start_time = datetime.now(timezone.utc)
+    request._start_time = time.perf_counter()
 
 @app.after_request
 def after_request(response):
     try:
-        latency = (datetime.now(timezone.utc) - getattr(request, '_start_time', datetime.now(timezone.utc))).total_seconds()
-        REQUEST_LATENCY.labels(request.path).observe(latency)
-        REQUEST_COUNT.labels(request.method, request.path, response.status_code).inc()
+        latency = time.perf_counter() - getattr(request, '_start_time', time.perf_counter())
+        observe_request(request.method, request.url_rule.rule if request.url_rule else None,
+                        response.status_code, latency, request.content_length, response.content_length)
     except Exception:
         pass
     return response
 
+def after_response(func, *args):
+    """Run func(*args) after the current response has been sent to the client.
+
+    The work is attached to the response with call_on_close, so the WSGI
+    server runs it once the body is written. Failures (an exception or a
+    False result) and timings are recorded in metrics.
+    """
+    if 'post_response' not in g:
+        g.post_response = []
+    g.post_response.append((func, args))
+
+def run_post_response(tasks):
+    """Run deferred tasks in order; one failing task does not stop the rest"""
+    for func, args in tasks:
+        start = time.perf_counter()
+        try:
+            outcome = 'error' if func(*args) is False else 'ok'
+        except Exception as e:
+            print(f"❌ Post-response task {func.__name__} failed: {e}")
+            outcome = 'error'
+        POST_RESPONSE_LATENCY.labels(func.__name__).observe(time.perf_counter() - start)
+        POST_RESPONSE_TASKS.labels(func.__name__, outcome).inc()
+
+@app.after_request
+def schedule_post_response(response):
+    tasks = g.pop('post_response', None)
+    if tasks:
+        response.call_on_close(lambda: run_post_response(tasks))
+    return response
+
+def process_memory(path='/proc/self/smaps_rollup'):
+    """RSS, PSS, USS and shared bytes of this process, or {} where /proc is missing.
+
+    USS (private pages) is what a worker really costs; with a preloaded app
+    the pages still shared with the master only count towards PSS in part.
+    """
+    try:
+        with open(path) as f:
+            fields = {}
+            for line in f:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[name] = int(value.split()[0]) * 1024
+    except OSError:
+        return {}
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+    }
+
+PROCESS_MEMORY_SAMPLE_INTERVAL = float(os.getenv('PROCESS_MEMORY_SAMPLE_INTERVAL', '15'))
+
+def sample_process_memory():
+    for kind, value in process_memory().items():
+        PROCESS_MEMORY.labels(kind).set(value)
+
+# Every worker samples itself, not only the one that happens to answer a scrape
+process_memory_sampler = PeriodicTask('process memory sample', PROCESS_MEMORY_SAMPLE_INTERVAL, sample_process_memory)
+visitor_maintenance.append(process_memory_sampler)
+
+@app.after_request
+def poll_process_memory(response):
+    process_memory_sampler.poll()
+    return response
+
 @app.route('/metrics')
 def metrics():
-    return generate_latest(metrics_registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+    sample_process_memory()
+    registry = metrics_registry
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Sum the files of every live and exited worker instead of this process's values
+        registry = CollectorRegistry()
+        WorkerMetricsCollector(registry)
+    return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+# ============================================
+# Pre-serialized Responses
+# ============================================
+
+STATIC_API_MAX_AGE = int(os.getenv('STATIC_API_MAX_AGE', '300'))
+
+class PrebuiltResponse:
+    """A response body encoded once at startup, with validators and compressed variants.
+
+    Serving it is an If-None-Match comparison plus handing over bytes that
+    already exist: each content coding gets its own strong ETag, and gzip /
+    brotli variants are only kept when they are actually smaller.
+    """
+
+    def __init__(self, body, mimetype, cache_control, last_modified=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.last_modified = last_modified
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'identity': (body, f'"{digest}"')}
+        compressed = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(body, quality=11)
+        for coding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[coding] = (data, f'"{digest}-{coding}"')
+
+    def _negotiate(self, accepted):
+        best = 'identity'
+        for coding in ('br', 'gzip'):
+            if coding in self.variants and accepted[coding] > accepted[best]:
+                best = coding
+        return best
+
+    def _headers(self, etag, coding):
+        headers = {'ETag': etag, 'Cache-Control': self.cache_control, 'Vary': 'Accept-Encoding'}
+        if self.last_modified is not None:
+            headers['Last-Modified'] = http_date(self.last_modified)
+        if coding != 'identity':
+            headers['Content-Encoding'] = coding
+        return headers
+
+    def select(self, accept_encoding=None, if_none_match=None, if_modified_since=None):
+        """(status, body, headers) for the raw request header values.
+
+        Framework neutral so the ASGI entry point serves the same bytes.
+        """
+        coding = self._negotiate(parse_accept_header(accept_encoding))
+        body, etag = self.variants[coding]
+        etags = parse_etags(if_none_match)
+        if etags and any(etags.contains_weak(tag.strip('"')) for _, tag in self.variants.values()):
+            return 304, b'', self._headers(etag, coding)
+        modified_since = parse_date(if_modified_since)
+        if modified_since and self.last_modified is not None and not etags \
+                and modified_since >= self.last_modified:
+            return 304, b'', self._headers(etag, coding)
+        return 200, body, self._headers(etag, coding)
+
+    def serve(self):
+        status, body, headers = self.select(request.headers.get('Accept-Encoding'),
+                                            request.headers.get('If-None-Match'),
+                                            request.headers.get('If-Modified-Since'))
+        return Response(body, status=status, mimetype=self.mimetype, headers=headers)
+
+def prebuilt_json(payload, cache_control=f'public, max-age={STATIC_API_MAX_AGE}'):
+    return PrebuiltResponse(app.json.dumps(payload) + '\n', 'application/json', cache_control)
+
+# ============================================
+# Templates and Static Assets
+# ============================================
+
+# Compiled templates are cached on disk so new workers skip the Jinja compile
+JINJA_BYTECODE_CACHE_DIR = os.getenv('JINJA_BYTECODE_CACHE_DIR')
+if JINJA_BYTECODE_CACHE_DIR:
+    os.makedirs(JINJA_BYTECODE_CACHE_DIR, exist_ok=True)
+app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(JINJA_BYTECODE_CACHE_DIR))
+
+ASSET_DIST_DIR = os.path.join(app.static_folder, 'dist')
+ASSET_MANIFEST_PATH = os.path.join(ASSET_DIST_DIR, 'manifest.json')
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+ASSET_MIMETYPES = {'.css': 'text/css', '.js': 'text/javascript'}
+
+def asset_sources():
+    """Logical names (relative to static/) of every CSS and JS source file"""
+    sources = []
+    for extension in ASSET_MIMETYPES:
+        for path in glob.glob(os.path.join(app.static_folder, '**', f'*{extension}'), recursive=True):
+            if not path.startswith(ASSET_DIST_DIR + os.sep):
+                sources.append(os.path.relpath(path, app.static_folder).replace(os.sep, '/'))
+    return sorted(sources)
+
+def fingerprint_asset(logical):
+    """Return the content-hashed file name and the bytes of a source asset"""
+    with open(os.path.join(app.static_folder, logical), 'rb') as f:
+        data = f.read()
+    root, extension = os.path.splitext(logical)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{extension}", data
+
+def build_assets():
+    """Write fingerprinted copies and manifest.json under static/dist; returns the manifest"""
+    manifest = {}
+    for logical in asset_sources():
+        hashed, data = fingerprint_asset(logical)
+        target = os.path.join(ASSET_DIST_DIR, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        manifest[logical] = hashed
+    with open(ASSET_MANIFEST_PATH + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(ASSET_MANIFEST_PATH + '.tmp', ASSET_MANIFEST_PATH)
+    return manifest
+
+def load_assets():
+    """Load the built manifest, fingerprinting the sources in memory when there is none.
+
+    Returns (manifest, responses) where responses maps each hashed name to
+    a PrebuiltResponse cached as immutable.
+    """
+    responses = {}
+    if os.path.exists(ASSET_MANIFEST_PATH):
+        with open(ASSET_MANIFEST_PATH) as f:
+            manifest = json.load(f)
+        for hashed in manifest.values():
+            with open(os.path.join(ASSET_DIST_DIR, hashed), 'rb') as f:
+                responses[hashed] = f.read()
+    else:
+        manifest = {}
+        for logical in asset_sources():
+            hashed, responses[hashed] = fingerprint_asset(logical)
+            manifest[logical] = hashed
+    for hashed, data in responses.items():
+        mimetype = ASSET_MIMETYPES[os.path.splitext(hashed)[1]]
+        responses[hashed] = PrebuiltResponse(data, mimetype, ASSET_CACHE_CONTROL)
+    return manifest, responses
+
+ASSET_MANIFEST, ASSET_RESPONSES = load_assets()
+
+@app.template_global()
+def asset_url(logical):
+    """URL of the fingerprinted build of a file under static/"""
+    return f"/assets/{ASSET_MANIFEST[logical]}"
+
+@app.route('/assets/<path:filename>')
+def assets(filename):
+    prebuilt = ASSET_RESPONSES.get(filename)
+    if prebuilt is None:
+        return jsonify({'error': 'Not found'}), 404
+    return prebuilt.serve()
+
+@app.cli.group('assets')
+def assets_cli():
+    """Build the fingerprinted static assets."""
+
+@assets_cli.command('build')
+def assets_build_command():
+    """Write static/dist/ and its manifest.json."""
+    for logical, hashed in build_assets().items():
+        click.echo(f"{logical} -> {hashed}")
+
+def render_page(template):
+    """Render a page template once, outside of any request"""
+    with app.app_context():
+        return render_template(template)
+
+# Pages never change while the process runs, so they are rendered, encoded
+# and compressed once; Last-Modified follows the deployed templates and assets
+PAGE_LAST_MODIFIED = datetime.fromtimestamp(int(max(
+    os.path.getmtime(path) for path in
+    glob.glob(os.path.join(app.root_path, app.template_folder, '*.html'))
+    + [os.path.join(app.static_folder, logical) for logical in asset_sources()]
+)), timezone.utc)
+PAGE_CACHE_CONTROL = 'no-cache'
+
+HOME_PAGE_HTML = render_page('home.html')
+
+HOME_RESPONSE = PrebuiltResponse(HOME_PAGE_HTML, 'text/html', PAGE_CACHE_CONTROL, PAGE_LAST_MODIFIED)
 
 @app.route('/')
 def home():
-    track_visitor()  # Track visitor to MongoDB
-    return '''
-    <!DOCTYPE html>
-    <html lang="he" dir="rtl">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>אוריין ראסק - DevOps Portfolio</title>
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body { 
-                font-family: 'Segoe UI', Arial, sans-serif; 
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                color: #333;
-            }
-            .container { max-width: 1200px; margin: 0 auto; padding: 20px; }
-            
-            /* Header */
-            .hero { 
-                background: rgba(255,255,255,0.95); 
-                padding: 60px 40px; 
-                border-radius: 20px; 
-                text-align: center;
-                box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-                margin-bottom: 30px;
-                backdrop-filter: blur(10px);
-            }
-            .hero h1 { font-size: 3em; color: #2c3e50; margin-bottom: 10px; }
-            .hero h2 { font-size: 1.5em; color: #3498db; margin-bottom: 20px; }
-            .hero .subtitle { font-size: 1.2em; color: #7f8c8d; margin: 10px 0; }
-            .quote { 
-                font-style: italic; 
-                font-size: 1.3em; 
-                color: #e74c3c;
-                margin: 20px 0;
-                padding: 20px;
-                background: #f8f9fa;
-                border-radius: 10px;
-                border-left: 5px solid #e74c3c;
-            }
-            
-            /* Navigation Buttons */
-            .nav-buttons { margin: 30px 0; }
-            .btn { 
-                background: #3498db; 
-                color: white; 
-                padding: 15px 30px; 
-                text-decoration: none; 
-                border-radius: 50px; 
-                margin: 10px; 
-                display: inline-block;
-                transition: all 0.3s ease;
-                font-weight: bold;
-                box-shadow: 0 5px 15px rgba(52, 152, 219, 0.3);
-            }
-            .btn:hover { 
-                background: #2980b9; 
-                transform: translateY(-3px);
-                box-shadow: 0 10px 25px rgba(52, 152, 219, 0.4);
-            }
-            .btn i { margin-left: 8px; }
-            
-            /* Sections */
-            .section { 
-                background: rgba(255,255,255,0.95); 
-                padding: 40px; 
-                border-radius: 15px; 
-                margin: 30px 0; 
-                box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-                backdrop-filter: blur(10px);
-            }
-            .section h2 { color: #2c3e50; margin-bottom: 25px; font-size: 2.2em; }
-            .section h3 { color: #3498db; margin: 20px 0 15px 0; font-size: 1.5em; }
-            
-            /* Skills Grid */
-            .skills-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-                gap: 25px;
-                margin-top: 25px;
-            }
-            .skill-category {
-                background: #f8f9fa;
-                padding: 25px;
-                border-radius: 15px;
-                border-left: 5px solid #3498db;
-                transition: transform 0.3s ease;
-            }
-            .skill-category:hover { transform: translateY(-5px); }
-            .skill-category h4 { color: #2c3e50; margin-bottom: 15px; }
-            .skill-list { list-style: none; }
-            .skill-list li { 
-                padding: 8px 0; 
-                border-bottom: 1px solid #ecf0f1; 
-                color: #34495e;
-            }
-            .skill-list li:last-child { border-bottom: none; }
-            .skill-placeholder { 
-                color: #95a5a6; 
-                font-style: italic; 
-                background: #ecf0f1;
-                padding: 10px;
-                border-radius: 5px;
-            }
-            
-            /* Projects Grid */
-            .projects-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(350px, 1fr));
-                gap: 25px;
-                margin-top: 25px;
-            }
-            .project-card {
-                background: #fff;
-                padding: 25px;
-                border-radius: 15px;
-                box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-                border-left: 5px solid #e74c3c;
-                transition: transform 0.3s ease;
-            }
-            .project-card:hover { transform: translateY(-5px); }
-            .project-card h4 { color: #2c3e50; margin-bottom: 15px; }
-            .project-tech { margin: 15px 0; }
-            .tech-tag { 
-                background: #3498db; 
-                color: white; 
-                padding: 5px 12px; 
-                border-radius: 20px; 
-                font-size: 0.9em; 
-                margin: 3px;
-                display: inline-block;
-            }
-            
-            /* Certifications */
-            .certs-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-                gap: 20px;
-                margin-top: 25px;
-            }
-            .cert-card {
-                background: linear-gradient(45deg, #f39c12, #e67e22);
-                color: white;
-                padding: 25px;
-                border-radius: 15px;
-                text-align: center;
-                box-shadow: 0 8px 20px rgba(243, 156, 18, 0.3);
-            }
-            .cert-card i { font-size: 3em; margin-bottom: 15px; }
-            
-            /* Contact Section */
-            .contact-info { 
-                background: linear-gradient(45deg, #16a085, #27ae60);
-                color: white;
-                padding: 40px; 
-                border-radius: 15px; 
-                text-align: center;
-            }
-            .contact-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-                gap: 20px;
-                margin-top: 25px;
-            }
-            .contact-item { padding: 15px; }
-            .contact-item i { font-size: 2em; margin-bottom: 10px; }
-            
-            /* Responsive */
-            @media (max-width: 768px) {
-                .hero { padding: 40px 20px; }
-                .hero h1 { font-size: 2.2em; }
-                .section { padding: 25px; }
-                .skills-grid, .projects-grid { grid-template-columns: 1fr; }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <!-- Hero Section -->
-            <div class="hero">
-                <h1><i class="fas fa-rocket"></i> אוריין ראסק</h1>
-                <h2>Oriyan Rask - DevOps Junior Engineer</h2>
-                <p class="subtitle"><strong>בוגר מכללת SELA</strong> | בן 21 | מודיעין, ישראל 🇮🇱</p>
-                <p class="subtitle">שאפתני ומקצועי עם רקע ברשתות ובתכנות</p>
-                <p class="subtitle">מתקדם ללמידה של <strong>אבטחת מידע</strong> 🔒</p>
-                <div class="quote">
-                    <i class="fas fa-quote-right"></i>
-                    "מעוניין לשנות את העולם ולעשות את זה עם חיוך 😊"
-                </div>
-                
-                <div class="nav-buttons">
-                    <a href="https://github.com/MasteRefleX123" target="_blank" class="btn">
-                        <i class="fab fa-github"></i> GitHub Profile
-                    </a>
-                    <a href="mailto:oriyanrwork99@gmail.com" class="btn">
-                        <i class="fas fa-envelope"></i> צור קשר
-                    </a>
-                    <a href="#" class="btn" style="background: #0077b5;">
-                        <i class="fab fa-linkedin"></i> LinkedIn (להוסיף)
-                    </a>
-                    <a href="/health" class="btn" style="background: #28a745;">
-                        <i class="fas fa-heartbeat"></i> Health Check
-                    </a>
-                    <a href="/api/stats" class="btn" style="background: #6f42c1;">
-                        <i class="fas fa-chart-bar"></i> API Stats
-                    </a>
-                </div>
-            </div>
-            
-            <!-- About Section -->
-            <div class="section">
-                <h2><i class="fas fa-user"></i> אודותיי</h2>
-                <p style="font-size: 1.2em; line-height: 1.8;">
-                    DevOps ג'וניור עם <strong>תשוקה לטכנולוגיה וללמידה מתמדת</strong>. 
-                    רקע חזק ברשתות ותכנות, עם התמחות בכלי DevOps מודרניים. 
-                    שואף להביא חדשנות ויעילות לתהליכי פיתוח ופריסה. 
-                    בוגר מכללת SELA עם מיקוד ב-DevOps ואבטחת מידע.
-                </p>
-            </div>
-            
-            <!-- Skills Section -->
-            <div class="section">
-                <h2><i class="fas fa-tools"></i> כישורים טכניים</h2>
-                <div class="skills-grid">
-                    <div class="skill-category">
-                        <h4><i class="fab fa-docker"></i> DevOps & Containerization</h4>
-                        <ul class="skill-list">
-                            <li>Docker & Docker Compose</li>
-                            <li>Kubernetes (K8s)</li>
-                            <li class="skill-placeholder">Jenkins - להוסיף רמת ידע</li>
-                            <li class="skill-placeholder">Ansible - להוסיף אם רלוונטי</li>
-                            <li class="skill-placeholder">Terraform - להוסיף אם רלוונטי</li>
-                        </ul>
-                    </div>
-                    
-                    <div class="skill-category">
-                        <h4><i class="fas fa-cloud"></i> Cloud Platforms</h4>
-                        <ul class="skill-list">
-                            <li class="skill-placeholder">AWS - להוסיף שירותים ספציפיים</li>
-                            <li class="skill-placeholder">Azure - להוסיף אם רלוונטי</li>
-                            <li class="skill-placeholder">GCP - להוסיף אם רלוונטי</li>
-                        </ul>
-                    </div>
-                    
-                    <div class="skill-category">
-                        <h4><i class="fas fa-network-wired"></i> רשתות ואבטחה</h4>
-                        <ul class="skill-list">
-                            <li>Network Administration</li>
-                            <li>Network Security</li>
-                            <li class="skill-placeholder">אבטחת מידע - להוסיף פרטים</li>
-                            <li class="skill-placeholder">Monitoring Tools</li>
-                        </ul>
-                    </div>
-                    
-                    <div class="skill-category">
-                        <h4><i class="fas fa-code"></i> תכנות ופיתוח</h4>
-                        <ul class="skill-list">
-                            <li>Python</li>
-                            <li>Bash Scripting</li>
-                            <li>YAML</li>
-                            <li class="skill-placeholder">שפות נוספות - להוסיף</li>
-                        </ul>
-                    </div>
-                    
-                    <div class="skill-category">
-                        <h4><i class="fas fa-chart-line"></i> Monitoring & CI/CD</h4>
-                        <ul class="skill-list">
-                            <li class="skill-placeholder">Prometheus - להוסיף אם רלוונטי</li>
-                            <li class="skill-placeholder">Grafana - להוסיף אם רלוונטי</li>
-                            <li class="skill-placeholder">GitLab CI - להוסיף אם רלוונטי</li>
-                            <li class="skill-placeholder">GitHub Actions - להוסיף אם רלוונטי</li>
-                        </ul>
-                    </div>
-                    
-                    <div class="skill-category">
-                        <h4><i class="fas fa-graduation-cap"></i> למידה נוכחית</h4>
-                        <ul class="skill-list">
-                            <li>אבטחת מידע - בתהליך למידה</li>
-                            <li class="skill-placeholder">נושאים נוספים - להוסיף</li>
-                        </ul>
-                    </div>
-                </div>
-            </div>
-            
-            <!-- Projects Section -->
-            <div class="section">
-                <h2><i class="fas fa-project-diagram"></i> פרויקטים</h2>
-                <div class="projects-grid">
-                    <div class="project-card">
-                        <h4><i class="fas fa-rocket"></i> DevOps Portfolio Project</h4>
-                        <p>פרויקט גמר DevOps מקיף עם Flask, Docker, Kubernetes ו-CI/CD pipeline מלא.</p>
-                        <div class="project-tech">
-                            <span class="tech-tag">Flask</span>
-                            <span class="tech-tag">Docker</span>
-                            <span class="tech-tag">Kubernetes</span>
-                            <span class="tech-tag">Jenkins</span>
-                            <span class="tech-tag">MongoDB</span>
-                        </div>
-                        <p><a href="https://github.com/MasteRefleX123/devops-portfolio-project" target="_blank">
-                            <i class="fab fa-github"></i> View on GitHub
-                        </a></p>
-                    </div>
-                    
-                    <div class="project-card">
-                        <h4><i class="fas fa-plus"></i> פרויקט נוסף #1</h4>
-                        <p class="skill-placeholder">תיאור פרויקט - להוסיף פרטים על פרויקט שעשית</p>
-                        <div class="project-tech">
-                            <span class="tech-tag skill-placeholder">טכנולוגיה 1</span>
-                            <span class="tech-tag skill-placeholder">טכנולוגיה 2</span>
-                        </div>
-                        <p class="skill-placeholder">קישור GitHub - להוסיף</p>
-                    </div>
-                    
-                    <div class="project-card">
-                        <h4><i class="fas fa-plus"></i> פרויקט נוסף #2</h4>
-                        <p class="skill-placeholder">תיאור פרויקט - להוסיף פרטים על פרויקט שעשית</p>
-                        <div class="project-tech">
-                            <span class="tech-tag skill-placeholder">טכנולוגיה 1</span>
-                            <span class="tech-tag skill-placeholder">טכנולוגיה 2</span>
-                        </div>
-                        <p class="skill-placeholder">קישור GitHub - להוסיף</p>
-                    </div>
-                </div>
-            </div>
-            
-            <!-- Certifications Section -->
-            <div class="section">
-                <h2><i class="fas fa-certificate"></i> תעודות מקצועיות</h2>
-                <div class="certs-grid">
-                    <div class="cert-card">
-                        <i class="fas fa-graduation-cap"></i>
-                        <h4>בוגר מכללת SELA</h4>
-                        <p>DevOps Engineering</p>
-                        <p><strong>2024</strong></p>
-                    </div>
-                    
-                    <div class="cert-card" style="background: linear-gradient(45deg, #95a5a6, #7f8c8d);">
-                        <i class="fab fa-aws"></i>
-                        <h4>AWS Certification</h4>
-                        <p class="skill-placeholder">להוסייף אם יש/מתוכנן</p>
-                        <p class="skill-placeholder">תאריך</p>
-                    </div>
-                    
-                    <div class="cert-card" style="background: linear-gradient(45deg, #3498db, #2980b9);">
-                        <i class="fas fa-dharmachakra"></i>
-                        <h4>Kubernetes Certification</h4>
-                        <p class="skill-placeholder">CKA/CKAD - להוסיף אם יש/מתוכנן</p>
-                        <p class="skill-placeholder">תאריך</p>
-                    </div>
-                    
-                    <div class="cert-card" style="background: linear-gradient(45deg, #e67e22, #d35400);">
-                        <i class="fab fa-docker"></i>
-                        <h4>Docker Certification</h4>
-                        <p class="skill-placeholder">להוסיף אם יש/מתוכנן</p>
-                        <p class="skill-placeholder">תאריך</p>
-                    </div>
-                </div>
-            </div>
-            
-            <!-- Contact Section -->
-            <div class="contact-info">
-                <h2><i class="fas fa-address-card"></i> פרטי יצירת קשר</h2>
-                <div class="contact-grid">
-                    <div class="contact-item">
-                        <i class="fas fa-envelope"></i>
-                        <h4>אימייל</h4>
-                        <p><a href="mailto:oriyanrwork99@gmail.com" style="color: white;">oriyanrwork99@gmail.com</a></p>
-                    </div>
-                    
-                    <div class="contact-item">
-                        <i class="fas fa-map-marker-alt"></i>
-                        <h4>מיקום</h4>
-                        <p>מודיעין, ישראל</p>
-                    </div>
-                    
-                    <div class="contact-item">
-                        <i class="fab fa-github"></i>
-                        <h4>GitHub</h4>
-                        <p><a href="https://github.com/MasteRefleX123" target="_blank" style="color: white;">MasteRefleX123</a></p>
-                    </div>
-                    
-                    <div class="contact-item">
-                        <i class="fab fa-linkedin"></i>
-                        <h4>LinkedIn</h4>
-                        <p style="color: #ecf0f1;">להוסיף קישור</p>
-                    </div>
-                    
-                    <div class="contact-item">
-                        <i class="fas fa-birthday-cake"></i>
-                        <h4>גיל</h4>
-                        <p>21</p>
-                    </div>
-                    
-                    <div class="contact-item">
-                        <i class="fas fa-university"></i>
-                        <h4>השכלה</h4>
-                        <p>בוגר מכללת SELA - DevOps</p>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    '''
+    track_visitor(defer=True)  # Recorded once the page has been sent
+    return HOME_RESPONSE.serve()
+
+HEALTH_RESPONSE = prebuilt_json({
+    'status': 'healthy', 
+    'app': 'Oriyan Rask DevOps Portfolio',
+    'owner': 'אוריין ראסק (Oriyan Rask)',
+    'email': 'oriyanrwork99@gmail.com',
+    'location': 'מודיעין, ישראל',
+    'age': 21,
+    'education': 'SELA College Graduate',
+    'github': 'https://github.com/MasteRefleX123'
+}, cache_control='no-cache')
+
+SKILLS_RESPONSE = prebuilt_json({
+    'devops_tools': ['Docker', 'Kubernetes', 'Jenkins', 'Git'],
+    'cloud_platforms': ['AWS (בתהליך)', 'Azure (בתהליך)'],
+    'networking': ['Network Administration', 'Network Security'],
+    'programming': ['Python', 'Bash', 'YAML'],
+    'security': ['Information Security (בלמידה)'],
+    'monitoring': ['בתהליך למידה'],
+    'current_learning': ['אבטחת מידע', 'Cloud Technologies']
+})
+
+PROJECTS_RESPONSE = prebuilt_json([
+    {
+        'name': 'DevOps Portfolio Project',
+        'description': 'פרויקט גמר DevOps מקיף',
+        'technologies': ['Flask', 'Docker', 'Kubernetes', 'Jenkins', 'MongoDB'],
+        'github': 'https://github.com/MasteRefleX123/devops-portfolio-project',
+        'status': 'בפיתוח'
+    }
+])
 
 @app.route('/health')
 def health():
-    return jsonify({
-        'status': 'healthy', 
-        'app': 'Oriyan Rask DevOps Portfolio',
-        'owner': 'אוריין ראסק (Oriyan Rask)',
-        'email': 'oriyanrwork99@gmail.com',
-        'location': 'מודיעין, ישראל',
-        'age': 21,
-        'education': 'SELA College Graduate',
-        'github': 'https://github.com/MasteRefleX123'
-    })
+    return HEALTH_RESPONSE.serve()
 
-@app.route('/api/stats')
-def stats():
-    return jsonify({
+# ============================================
+# Liveness and Readiness Probes
+# ============================================
+
+MONGO_PING_INTERVAL = float(os.getenv('MONGO_PING_INTERVAL', '5'))
+# A ping result older than this means the pinger itself is stuck
+MONGO_PING_STALE_AFTER = float(os.getenv('MONGO_PING_STALE_AFTER', str(3 * MONGO_PING_INTERVAL)))
+
+class MongoHealth:
+    """Pings MongoDB on a background interval and caches the result.
+
+    /readyz only reads the cached result, so probe traffic never reaches the
+    database however often Kubernetes asks. Pings go through the circuit
+    breaker: an open circuit reports not ready without a round trip.
+    """
+
+    def __init__(self, interval=MONGO_PING_INTERVAL):
+        self.interval = interval
+        self.ok = False
+        self.error = 'not checked yet'
+        self.latency = None
+        self.checked_at = None
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def ensure_started(self):
+        # Threads do not survive fork, so a dead thread is simply restarted
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='mongo-ping', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self.check()
+            time.sleep(self.interval)
+
+    def check(self):
+        """Ping once and store the outcome"""
+        start = time.perf_counter()
+        try:
+            if mongo_client is None:
+                raise RuntimeError('MongoDB not connected')
+            mongo_breaker.call(mongo_client.admin.command, 'ping')
+            self.ok, self.error = True, None
+        except Exception as e:
+            self.ok, self.error = False, str(e)
+        self.latency = time.perf_counter() - start
+        self.checked_at = time.monotonic()
+        return self.ok
+
+    def status(self):
+        """(ready, details) from the last ping, the pool and the circuit breaker"""
+        age = None if self.checked_at is None else time.monotonic() - self.checked_at
+        pool = pool_monitor.snapshot()
+        reasons = []
+        if not mongo_connection.ready.is_set():
+            reasons.append('not connected')
+        if not self.ok:
+            reasons.append(f'ping failed: {self.error}')
+        elif age is None or age > MONGO_PING_STALE_AFTER:
+            reasons.append('ping result is stale')
+        if pool['cleared']:
+            reasons.append('connection pool cleared')
+        if mongo_breaker.state == CircuitBreaker.OPEN:
+            reasons.append('circuit open')
+        return not reasons, {
+            'ping': {
+                'ok': self.ok,
+                'age_seconds': None if age is None else round(age, 3),
+                'latency_ms': None if self.latency is None else round(self.latency * 1000, 3),
+            },
+            'pool': pool,
+            'circuit': mongo_breaker.state,
+            'reasons': reasons,
+        }
+
+mongo_health = MongoHealth()
+
+LIVEZ_RESPONSE = prebuilt_json({'status': 'alive'}, cache_control='no-store')
+
+@app.route('/livez')
+def livez():
+    """Liveness: the process serves requests; never touches MongoDB"""
+    return LIVEZ_RESPONSE.serve()
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: the cached MongoDB ping, pool state and circuit breaker"""
+    mongo_health.ensure_started()
+    ready, details = mongo_health.status()
+    details['status'] = 'ready' if ready else 'not ready'
+    response = jsonify(details)
+    response.status_code = 200 if ready else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def stats_payload(visitors, unique_visitors_today):
+    return {
         'portfolio_owner': 'Oriyan Rask (אוריין ראסק)',
         'email': 'oriyanrwork99@gmail.com',
         'github': 'https://github.com/MasteRefleX123',
         'location': 'מודיעין, ישראל',
         'age': 21,
-        'visitors': get_visitor_count(),
+        'visitors': visitors,
+        'unique_visitors_today': unique_visitors_today,
         'projects': 3,
         'certifications': 1,
         'experience': 'DevOps Junior Engineer',
         'education': 'SELA College Graduate',
         'specialization': 'DevOps, Networks, Security'
-    })
+    }
+
+@app.route('/api/stats')
+def stats():
+    return jsonify(stats_payload(get_visitor_count(), get_unique_visitors_today()))
 
 @app.route('/api/skills')
 def skills():
-    return jsonify({
-        'devops_tools': ['Docker', 'Kubernetes', 'Jenkins', 'Git'],
-        'cloud_platforms': ['AWS (בתהליך)', 'Azure (בתהליך)'],
-        'networking': ['Network Administration', 'Network Security'],
-        'programming': ['Python', 'Bash', 'YAML'],
-        'security': ['Information Security (בלמידה)'],
-        'monitoring': ['בתהליך למידה'],
-        'current_learning': ['אבטחת מידע', 'Cloud Technologies']
-    })
+    return SKILLS_RESPONSE.serve()
 
 @app.route('/api/projects')
 def projects():
-    return jsonify([
-        {
-            'name': 'DevOps Portfolio Project',
-            'description': 'פרויקט גמר DevOps מקיף',
-            'technologies': ['Flask', 'Docker', 'Kubernetes', 'Jenkins', 'MongoDB'],
-            'github': 'https://github.com/MasteRefleX123/devops-portfolio-project',
-            'status': 'בפיתוח'
-        }
-    ])
+    return PROJECTS_RESPONSE.serve()
 
 
 # ============================================
 # Contact Form Feature
 # ============================================
 
-# Initialize contacts collection
-contacts_collection = None
-try:
-    if db is not None:
-        contacts_collection = db.contacts
-        print("✅ Contacts collection initialized")
-except:
-    contacts_collection = None
-    print("⚠️ Contacts collection not available")
+CONTACT_PAGE_HTML = render_page('contact.html')
+
+CONTACT_RESPONSE = PrebuiltResponse(CONTACT_PAGE_HTML, 'text/html', PAGE_CACHE_CONTROL, PAGE_LAST_MODIFIED)
 
 @app.route('/contact')
 def contact_page():
     """Render contact form page"""
-    html = """
-    <!DOCTYPE html>
-    <html lang="he" dir="rtl">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>צור קשר - אוריין ראסק</title>
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body { 
-                font-family: 'Segoe UI', Arial, sans-serif; 
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                padding: 20px;
-            }
-            .contact-container {
-                background: white;
-                border-radius: 20px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                max-width: 600px;
-                width: 100%;
-                padding: 40px;
-                animation: slideIn 0.5s ease;
-            }
-            @keyframes slideIn {
-                from { opacity: 0; transform: translateY(30px); }
-                to { opacity: 1; transform: translateY(0); }
-            }
-            h1 {
-                color: #333;
-                margin-bottom: 10px;
-                font-size: 2.5em;
-            }
-            .subtitle {
-                color: #666;
-                margin-bottom: 30px;
-                font-size: 1.1em;
-            }
-            .form-group {
-                margin-bottom: 25px;
-            }
-            label {
-                display: block;
-                margin-bottom: 8px;
-                color: #555;
-                font-weight: 600;
-            }
-            input, textarea {
-                width: 100%;
-                padding: 12px 15px;
-                border: 2px solid #e0e0e0;
-                border-radius: 10px;
-                font-size: 16px;
-                transition: all 0.3s;
-                font-family: inherit;
-            }
-            input:focus, textarea:focus {
-                outline: none;
-                border-color: #667eea;
-                box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-            }
-            textarea {
-                resize: vertical;
-                min-height: 120px;
-            }
-            .btn-submit {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border: none;
-                padding: 15px 40px;
-                border-radius: 30px;
-                font-size: 18px;
-                font-weight: 600;
-                cursor: pointer;
-                transition: transform 0.3s, box-shadow 0.3s;
-                width: 100%;
-            }
-            .btn-submit:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 10px 30px rgba(102, 126, 234, 0.4);
-            }
-            .back-link {
-                display: inline-block;
-                margin-top: 20px;
-                color: #667eea;
-                text-decoration: none;
-                font-weight: 600;
-                transition: color 0.3s;
-            }
-            .back-link:hover {
-                color: #764ba2;
-            }
-            .success-message, .error-message {
-                padding: 15px;
-                border-radius: 10px;
-                margin-bottom: 20px;
-                display: none;
-            }
-            .success-message {
-                background: #d4edda;
-                color: #155724;
-                border: 1px solid #c3e6cb;
-            }
-            .error-message {
-                background: #f8d7da;
-                color: #721c24;
-                border: 1px solid #f5c6cb;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="contact-container">
-            <h1>צור קשר</h1>
-            <p class="subtitle">אשמח לשמוע ממך! מלא את הטופס ואחזור אליך בהקדם</p>
-            
-            <div class="success-message" id="successMsg">
-                <i class="fas fa-check-circle"></i> ההודעה נשלחה בהצלחה! אחזור אליך בקרוב.
-            </div>
-            
-            <div class="error-message" id="errorMsg">
-                <i class="fas fa-exclamation-circle"></i> אופס! משהו השתבש. אנא נסה שוב.
-            </div>
-            
-            <form id="contactForm">
-                <div class="form-group">
-                    <label for="name">שם מלא *</label>
-                    <input type="text" id="name" name="name" required>
-                </div>
-                
-                <div class="form-group">
-                    <label for="email">כתובת אימייל *</label>
-                    <input type="email" id="email" name="email" required>
-                </div>
-                
-                <div class="form-group">
-                    <label for="message">הודעה *</label>
-                    <textarea id="message" name="message" required></textarea>
-                </div>
-                
-                <button type="submit" class="btn-submit">
-                    <i class="fas fa-paper-plane"></i> שלח הודעה
-                </button>
-            </form>
-            
-            <a href="/" class="back-link">
-                <i class="fas fa-arrow-right"></i> חזרה לדף הבית
-            </a>
-        </div>
-        
-        <script>
-            document.getElementById('contactForm').addEventListener('submit', async (e) => {
-                e.preventDefault();
-                
-                const formData = {
-                    name: document.getElementById('name').value,
-                    email: document.getElementById('email').value,
-                    message: document.getElementById('message').value
-                };
-                
-                try {
-                    const response = await fetch('/api/contact', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify(formData)
-                    });
-                    
-                    const result = await response.json();
-                    
-                    if (response.ok) {
-                        document.getElementById('successMsg').style.display = 'block';
-                        document.getElementById('errorMsg').style.display = 'none';
-                        document.getElementById('contactForm').reset();
-                        
-                        setTimeout(() => {
-                            document.getElementById('successMsg').style.display = 'none';
-                        }, 5000);
-                    } else {
-                        throw new Error(result.error || 'Failed to send message');
-                    }
-                } catch (error) {
-                    document.getElementById('errorMsg').style.display = 'block';
-                    document.getElementById('successMsg').style.display = 'none';
-                    
-                    setTimeout(() => {
-                        document.getElementById('errorMsg').style.display = 'none';
-                    }, 5000);
-                }
-            });
-        </script>
-    </body>
-    </html>
-    """
-    return html
+    return CONTACT_RESPONSE.serve()
+
+def _write_contact_batch(contacts):
+    """Insert contact submissions, skipping ones that are already stored"""
+    if contacts_collection is None:
+        raise RuntimeError('MongoDB not available')
+    return len(_insert_new(contacts_collection, contacts, 'contact'))
+
+CONTACT_REQUIRED_FIELDS = ('name', 'email', 'message')
+
+def contact_form_error(data):
+    """Validation message for a submitted form, None when it is complete"""
+    for field in CONTACT_REQUIRED_FIELDS:
+        if not data.get(field):
+            return f'{field} is required'
+    return None
+
+def new_contact(data, ip):
+    """Build the contact document for a validated form"""
+    return {
+        '_id': ObjectId(),
+        'name': data.get('name'),
+        'email': data.get('email'),
+        'message': data.get('message'),
+        'timestamp': datetime.now(timezone.utc),
+        'status': 'new',
+        'ip': ip
+    }
+
+def contact_accepted(contact):
+    return {
+        'success': True,
+        'status': 'success',
+        'message': 'Thank you for your message! I will get back to you soon.',
+        'contact_id': contact['_id']
+    }
+
+def store_contact(contact):
+    """Save a contact to MongoDB if available, otherwise keep it in the event log.
+
+    Returns 'stored', 'queued', or None when the contact could not be kept.
+    """
+    if contacts_collection is not None:
+        try:
+            contacts_collection.insert_one(contact)
+            return 'stored'
+        except Exception as e:
+            print(f"⚠️ Contact insert failed, spooling to event log: {e}")
+    if spool_events('contact', [contact]):
+        return 'queued'
+    print(f"❌ Contact form submission from {contact['name']} could not be stored")
+    return None
+
+def log_contact(contact, outcome):
+    if outcome == 'stored':
+        print(f"✅ New contact form submission from {contact['name']}")
+    else:
+        print(f"⚠️ Contact form submission from {contact['name']} queued until MongoDB is available")
 
 @app.route('/api/contact', methods=['POST'])
 def submit_contact():
@@ -773,103 +2338,355 @@ def submit_contact():
         data = request.json
         
         # Validate required fields
-        required_fields = ['name', 'email', 'message']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'error': f'{field} is required'}), 400
-        
-        # Create contact document
-        contact = {
-            'name': data.get('name'),
-            'email': data.get('email'),
-            'message': data.get('message'),
-            'timestamp': datetime.now(timezone.utc),
-            'status': 'new',
-            'ip': request.remote_addr
-        }
+        error = contact_form_error(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Save to MongoDB if available
-        if contacts_collection is not None:
-            result = contacts_collection.insert_one(contact)
-            contact['_id'] = str(result.inserted_id)
-            print(f"✅ New contact form submission from {contact['name']}")
-        else:
-            print(f"⚠️ Contact form submitted but MongoDB not available: {contact['name']}")
+        contact = new_contact(data, request.remote_addr)
         
-        # Convert datetime for JSON response
-        contact['timestamp'] = contact['timestamp'].isoformat()
+        # Kept before answering, so a 201 always means the message is safe
+        outcome = store_contact(contact)
+        if outcome is None:
+            return jsonify({'error': 'Failed to submit contact form'}), 503
+        after_response(log_contact, contact, outcome)
         
-        return jsonify({
-            'success': True,
-            'status': 'success',
-            'message': 'Thank you for your message! I will get back to you soon.',
-            'contact_id': contact.get('_id', 'temp-id')
-        }), 201
+        return jsonify(contact_accepted(contact)), 201
         
     except Exception as e:
         print(f"Error submitting contact form: {e}")
         return jsonify({'error': 'Failed to submit contact form'}), 500
 
+CONTACTS_PAGE_SIZE = int(os.getenv('CONTACTS_PAGE_SIZE', '50'))
+CONTACTS_MAX_PAGE_SIZE = int(os.getenv('CONTACTS_MAX_PAGE_SIZE', '200'))
+CONTACT_FIELDS = ('name', 'email', 'message', 'timestamp', 'status', 'ip')
+
+def encode_contacts_cursor(contact):
+    """Opaque token for the (timestamp, _id) position after a contact"""
+    position = {'t': contact['timestamp'].isoformat(), 'id': str(contact['_id'])}
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+def decode_contacts_cursor(token):
+    """Inverse of encode_contacts_cursor; raises ValueError for bad tokens"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return datetime.fromisoformat(position['t']), ObjectId(position['id'])
+    except Exception as e:
+        raise ValueError('invalid cursor') from e
+
+def _is_admin():
+    """Check for simple auth header"""
+    return request.headers.get('Authorization') == 'Bearer admin-secret-key'
+
 @app.route('/api/contacts', methods=['GET'])
 def get_contacts():
-    """Get all contact form submissions (admin endpoint)"""
+    """Get contact form submissions newest first, one keyset page at a time (admin endpoint)"""
     try:
-        # Check for simple auth header
-        auth = request.headers.get('Authorization')
-        if auth != 'Bearer admin-secret-key':
+        if not _is_admin():
             return jsonify({'error': 'Unauthorized'}), 401
         
+        try:
+            limit = int(request.args.get('limit', CONTACTS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if not 1 <= limit <= CONTACTS_MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {CONTACTS_MAX_PAGE_SIZE}'}), 400
+        
+        fields = CONTACT_FIELDS
+        if request.args.get('fields'):
+            fields = tuple(field.strip() for field in request.args['fields'].split(','))
+            unknown = [field for field in fields if field not in CONTACT_FIELDS]
+            if unknown:
+                return jsonify({'error': f"unknown fields: {', '.join(unknown)}"}), 400
+        
+        query = {}
+        if request.args.get('cursor'):
+            try:
+                after_timestamp, after_id = decode_contacts_cursor(request.args['cursor'])
+            except ValueError:
+                return jsonify({'error': 'invalid cursor'}), 400
+            query = {'$or': [
+                {'timestamp': {'$lt': after_timestamp}},
+                {'timestamp': after_timestamp, '_id': {'$lt': after_id}},
+            ]}
+        
         if contacts_collection is not None:
-            contacts = list(contacts_collection.find().sort('timestamp', -1))
+            # The keyset fields always come back so the next cursor can be built
+            projection = dict.fromkeys(fields + ('timestamp',), 1)
+            contacts = list(
+                contacts_collection.find(query, projection)
+                .sort([('timestamp', DESCENDING), ('_id', DESCENDING)])
+                .limit(limit + 1)
+            )
+            has_more = len(contacts) > limit
+            contacts = contacts[:limit]
+            next_cursor = encode_contacts_cursor(contacts[-1]) if has_more else None
             
-            # Convert ObjectId and datetime for JSON
-            for contact in contacts:
-                contact['_id'] = str(contact['_id'])
-                contact['timestamp'] = contact['timestamp'].isoformat()
+            if 'timestamp' not in fields:
+                for contact in contacts:
+                    del contact['timestamp']
             
             return jsonify({
-                'total': len(contacts),
-                'contacts': contacts
+                'total': contacts_collection.estimated_document_count(),
+                'count': len(contacts),
+                'contacts': contacts,
+                'next_cursor': next_cursor
             })
         else:
-            return jsonify({'total': 0, 'contacts': []})
+            return jsonify({'total': 0, 'count': 0, 'contacts': [], 'next_cursor': None})
             
     except Exception as e:
         print(f"Error getting contacts: {e}")
         return jsonify({'error': 'Failed to retrieve contacts'}), 500
 
-if __name__ == '__main__':
-    print('🚀 Oriyan Rask DevOps Portfolio Starting...')
-    print('📧 Contact: oriyanrwork99@gmail.com')
-    print('🌐 Access at: http://localhost:5000')
-    print('📂 GitHub: https://github.com/MasteRefleX123')
-    # Disable debug by default for production safety; enable via FLASK_DEBUG=true if needed
-    debug_flag = os.getenv('FLASK_DEBUG', 'False').lower() in ('1', 'true', 'yes')
-    app.run(host='0.0.0.0', port=5000, debug=debug_flag)
+# ============================================
+# Streaming Exports
+# ============================================
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+def _export_value(value):
+    if isinstance(value, (datetime, ObjectId)):
+        return app.json.default(value)
+    return value
+
+def _export_lines(cursor, fields, fmt):
+    """Encode documents one at a time as NDJSON or CSV lines"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('_id',) + fields)
+        for doc in cursor:
+            writer.writerow([_export_value(doc.get(field, '')) for field in ('_id',) + fields])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    else:
+        for doc in cursor:
+            yield app.json.dumps(doc) + '\n'
+
+def _export_chunks(lines, compress):
+    """Group lines into ~64 KiB chunks, gzip-compressing them if asked to"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            chunk = b''.join(pending)
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+def export_collection(collection, fields, name):
+    """Stream a whole collection straight from a MongoDB cursor.
+
+    Supports ?format=ndjson|csv, ?since=/&until= on timestamp and gzip
+    output (Accept-Encoding: gzip or ?gzip=1). Memory stays flat because
+    documents are pulled EXPORT_BATCH_SIZE at a time and encoded as they
+    arrive.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    try:
+        since = _parse_time_arg('since')
+        until = _parse_time_arg('until')
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO 8601 timestamps'}), 400
+    if collection is None:
+        return jsonify({'error': 'MongoDB not available'}), 503
+
+    query = {}
+    if since or until:
+        query['timestamp'] = {}
+        if since:
+            query['timestamp']['$gte'] = since
+        if until:
+            query['timestamp']['$lt'] = until
+    cursor = (
+        collection.find(query, dict.fromkeys(fields, 1))
+        .sort('timestamp', ASCENDING)
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+    # Fetch the first batch before committing to a 200: once streaming has
+    # started, a failure could only cut the download short
+    try:
+        first = next(cursor, None)
+    except ConnectionFailure as e:
+        print(f"Error exporting {name}: {e}")
+        return jsonify({'error': 'MongoDB not available'}), 503
+    docs = itertools.chain([first], cursor) if first is not None else iter(())
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes') or \
+        request.accept_encodings['gzip'] > 0
+
+    response = Response(
+        stream_with_context(_export_chunks(_export_lines(docs, fields, fmt), compress)),
+        mimetype=EXPORT_FORMATS[fmt]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    # Let nginx pass chunks through instead of buffering the whole export
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@app.route('/api/contacts/export', methods=['GET'])
+def export_contacts():
+    """Stream every contact submission as NDJSON or CSV (admin endpoint)"""
+    if not _is_admin():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return export_collection(contacts_collection, CONTACT_FIELDS, 'contacts')
+
+VISITOR_FIELDS = ('ip', 'user_agent', 'timestamp', 'page')
+
+@app.route('/api/visitors/export', methods=['GET'])
+def export_visitors():
+    """Stream every stored visit as NDJSON or CSV (admin endpoint)"""
+    if not _is_admin():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return export_collection(visitors_collection, VISITOR_FIELDS, 'visitors')
 
 @app.route('/api/visitors', methods=['GET', 'POST'])
 def visitors_api():
     """Handle visitor tracking and retrieval"""
     if request.method == 'POST':
         # Manual visitor tracking
-        track_visitor()
+        track_visitor(defer=True)
         return jsonify({'status': 'visitor tracked', 'total': get_visitor_count()})
     else:
-        # Get visitor stats
-        try:
-            if visitors_collection is not None:
-                total = get_visitor_count()
-                recent = list(visitors_collection.find().sort('timestamp', -1).limit(10))
-                # Convert ObjectId to string for JSON serialization
-                for visit in recent:
-                    visit['_id'] = str(visit['_id'])
-                    visit['timestamp'] = visit['timestamp'].isoformat()
-                
-                return jsonify({
-                    'total_visitors': total,
-                    'recent_visitors': recent
-                })
-        except Exception as e:
-            print(f"Error getting visitor data: {e}")
+        # Recent visits come from the in-memory ring buffer; consistency=merged
+        # also folds in the buffers other workers published
+        consistency = request.args.get('consistency', 'local')
+        if consistency not in ('local', 'merged'):
+            return jsonify({'error': 'consistency must be local or merged'}), 400
+        recent = recent_visitors.latest()
+        if consistency == 'merged':
+            try:
+                if recent_collection is not None:
+                    recent = recent_visitors.merged()
+            except Exception as e:
+                print(f"Error getting visitor data: {e}")
         
-        return jsonify({'total_visitors': get_visitor_count(), 'recent_visitors': []})
+        return jsonify({
+            'total_visitors': get_visitor_count(),
+            'recent_visitors': recent,
+            'consistency': consistency
+        })
+
+@app.route('/api/visitors/unique', methods=['GET'])
+def visitors_unique():
+    """Estimated distinct visitors for a day (default today) and optional page"""
+    try:
+        day = datetime.strptime(request.args['day'], '%Y-%m-%d').date() if 'day' in request.args \
+            else datetime.now(timezone.utc).date()
+    except ValueError:
+        return jsonify({'error': 'day must be formatted as YYYY-MM-DD'}), 400
+    page = request.args.get('page', ROLLUP_ALL_PAGES)
+    try:
+        unique = estimate_unique_visitors(day, page)
+    except Exception as e:
+        print(f"Error estimating unique visitors: {e}")
+        return jsonify({'error': 'Failed to estimate unique visitors'}), 500
+    return jsonify({
+        'day': day.isoformat(),
+        'page': page,
+        'unique_visitors': unique,
+        'relative_error': round(1.04 / math.sqrt(1 << HLL_PRECISION), 4)
+    })
+
+@app.route('/api/visitors/top', methods=['GET'])
+def visitors_top():
+    """Most frequent pages or user agents, answered from the heavy hitter sketches"""
+    field = request.args.get('field', 'page')
+    if field not in TOP_FIELDS:
+        return jsonify({'error': f"field must be one of {', '.join(TOP_FIELDS)}"}), 400
+    try:
+        k = int(request.args.get('k', '10'))
+    except ValueError:
+        return jsonify({'error': 'k must be an integer'}), 400
+    if not 1 <= k <= TOP_CAPACITY:
+        return jsonify({'error': f'k must be between 1 and {TOP_CAPACITY}'}), 400
+    try:
+        top = top_visitors(field, k)
+    except Exception as e:
+        print(f"Error getting top visitors: {e}")
+        top = heavy_hitters.snapshot(field)[:k]
+    return jsonify({'field': field, 'k': k, 'top': top})
+
+def _parse_time_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    return _as_utc(datetime.fromisoformat(value))
+
+@app.route('/api/visitors/timeseries', methods=['GET'])
+def visitors_timeseries():
+    """Visitor counts per minute, hour or day, answered from the rollups"""
+    granularity = request.args.get('granularity', 'hour')
+    settings = ROLLUP_GRANULARITIES.get(granularity)
+    if settings is None:
+        return jsonify({'error': f"granularity must be one of {', '.join(ROLLUP_GRANULARITIES)}"}), 400
+    try:
+        until = _parse_time_arg('until') or datetime.now(timezone.utc)
+        since = _parse_time_arg('since') or until - settings['window']
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO 8601 timestamps'}), 400
+    since = rollup_bucket(since, granularity)
+    if since > until:
+        return jsonify({'error': 'since must be before until'}), 400
+    buckets = int((until - since) / settings['step']) + 1
+    if buckets > settings['max_points']:
+        return jsonify({'error': f"at most {settings['max_points']} {granularity} buckets per request"}), 400
+    page = request.args.get('page', ROLLUP_ALL_PAGES)
+
+    counts = {}
+    try:
+        if rollups_collection is not None:
+            # One indexed range read, bounded by the number of buckets
+            for doc in rollups_collection.find(
+                {'granularity': granularity, 'page': page, 'bucket': {'$gte': since, '$lte': until}},
+                {'_id': 0, 'bucket': 1, 'count': 1}
+            ):
+                counts[_as_utc(doc['bucket'])] = doc.get('count', 0)
+    except Exception as e:
+        print(f"Error getting visitor timeseries: {e}")
+
+    points = []
+    bucket = since
+    while bucket <= until:
+        points.append({'bucket': bucket.isoformat(), 'count': counts.get(bucket, 0)})
+        bucket += settings['step']
+    return jsonify({
+        'granularity': granularity,
+        'page': page,
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        'points': points
+    })
+
+# Everything the connect thread touches is defined by now. Forked children
+# start their own connect thread from reset_after_fork()
+if MONGO_CONNECT_ON_IMPORT:
+    mongo_connection.start()
+
+if __name__ == '__main__':
+    print('🚀 Oriyan Rask DevOps Portfolio Starting...')
+    print('📧 Contact: oriyanrwork99@gmail.com')
+    print('🌐 Access at: http://localhost:5000')
+    print('📂 GitHub: https://github.com/MasteRefleX123')
+    # Disable debug by default for production safety; enable via FLASK_DEBUG=true if needed
+    debug_flag = os.getenv('FLASK_DEBUG', 'False').lower() in ('1', 'true', 'yes')
+    app.run(host='0.0.0.0', port=5000, debug=debug_flag)
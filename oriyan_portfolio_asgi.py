@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for the portfolio.
+
+The hot routes (pages, assets, the static APIs, stats, visitors and the
+contact form) are async Starlette handlers that talk to MongoDB through
+Motor, behind the same circuit breaker as the sync collections, so a
+request waiting on the database costs a coroutine instead of a thread or a
+whole worker. Everything else (admin endpoints, exports,
+analytics, /metrics) is served by the Flask app through a WSGI adapter.
+Both halves share the same module state: prebuilt responses, caches, the
+visitor write-behind queue and the event log.
+
+    uvicorn oriyan_portfolio_asgi:app --host 0.0.0.0 --port 5000 --workers 2
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker oriyan_portfolio_asgi:app
+"""
+
+import re
+import time
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+import oriyan_portfolio as portfolio
+
+# Motor client, created per worker process once its event loop is running
+motor_client = None
+
+
+def motor_database():
+    """The async database, or None until the worker has connected to MongoDB"""
+    if motor_client is None or not portfolio.mongo_connection.ready.is_set():
+        return None
+    return motor_client.get_default_database()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global motor_client
+    motor_client = AsyncIOMotorClient(portfolio.MONGO_URI, **portfolio.mongo_client_options())
+    try:
+        yield
+    finally:
+        motor_client.close()
+        motor_client = None
+
+
+def json_response(payload, status_code=200, background=None):
+    return Response(portfolio.app.json.dumps(payload) + '\n', status_code=status_code,
+                    media_type='application/json', background=background)
+
+
+def prebuilt(response, request):
+    """Serve a PrebuiltResponse with the same negotiation and validators as Flask"""
+    status, body, headers = response.select(request.headers.get('accept-encoding'),
+                                            request.headers.get('if-none-match'),
+                                            request.headers.get('if-modified-since'))
+    return Response(body, status_code=status, headers=headers,
+                    media_type=response.mimetype if status == 200 else None)
+
+
+def instrumented(path, handler):
+    """Record the request metrics the Flask hooks record for WSGI routes, labelled with path"""
+    async def endpoint(request):
+        start = time.perf_counter()
+        response = await handler(request)
+        content_length = request.headers.get('content-length', '')
+        portfolio.observe_request(request.method, path, response.status_code, time.perf_counter() - start,
+                                  int(content_length) if content_length.isdigit() else 0, len(response.body))
+        return response
+    endpoint.__name__ = handler.__name__
+    return endpoint
+
+
+def route(path, handler, **kwargs):
+    # Label with the Flask form of the template ({filename:path} -> <path:filename>)
+    # so both servers share series and the METRICS_ENDPOINTS allow-list
+    rule = re.sub(r'\{(\w+):(\w+)\}', r'<\2:\1>', path)
+    return Route(path, instrumented(rule, handler), **kwargs)
+
+
+def track(request):
+    """Add the visit to the recent feed and queue its write after the response"""
+    visitor = portfolio.new_visitor(request.client.host if request.client else 'unknown',
+                                    request.headers.get('user-agent', 'unknown'),
+                                    request.url.path)
+    portfolio.recent_visitors.add(visitor)
+    # A queue put (or an event log append while MongoDB is down), off the loop
+    return BackgroundTask(portfolio.record_visitor, visitor)
+
+
+async def cached(cache, load):
+    """CachedValue lookup whose first load is awaited instead of blocking the loop"""
+    found, value = cache.lookup()
+    if found:
+        return value
+    value = await load()
+    cache.store(value)
+    return value
+
+
+async def count_visitors():
+    database = motor_database()
+    if database is None:
+        raise RuntimeError('MongoDB not available')
+    # Same reads as portfolio._count_visitors()
+    base = {'_id': portfolio.VISITOR_COUNTER_BASE_ID}
+    breaker = portfolio.mongo_breaker
+    before = await breaker.acall(database.stats.find_one, base, portfolio.VISITOR_COUNTER_BASE_PROJECTION)
+    shards = await breaker.acall(database.stats.find(
+        {'counter': portfolio.VISITOR_COUNTER},
+        portfolio.VISITOR_COUNTER_PROJECTION
+    ).to_list, None)
+    after = await breaker.acall(database.stats.find_one, base, portfolio.VISITOR_COUNTER_BASE_PROJECTION)
+    if not portfolio.visitor_counter_settled(before, after):
+        shards = await breaker.acall(database.stats.find(
+            {'counter': portfolio.VISITOR_COUNTER},
+            portfolio.VISITOR_COUNTER_FOLD_PROJECTION
+        ).to_list, None)
+        if shards:
+            return portfolio.visitor_counter_total(shards)
+    elif shards:
+        return sum(shard.get('total_visitors', 0) for shard in shards)
+    return 42
+
+
+async def visitor_count():
+    try:
+        return await cached(portfolio.visitor_count_cache, count_visitors)
+    except Exception as e:
+        print(f"Error getting visitor count: {e}")
+        return 42
+
+
+async def unique_visitors_today():
+    # HyperLogLog merging stays on the sync path; it runs in a thread on a miss
+    cache = portfolio.unique_today_cache
+    try:
+        return await cached(cache, lambda: run_in_threadpool(cache.loader))
+    except Exception as e:
+        print(f"Error estimating unique visitors: {e}")
+        return 0
+
+
+async def store_contact(contact):
+    """Insert with Motor, falling back to the event log like the WSGI path"""
+    database = motor_database()
+    if database is not None:
+        try:
+            await portfolio.mongo_breaker.acall(database.contacts.insert_one, contact)
+            return 'stored'
+        except Exception as e:
+            print(f"⚠️ Contact insert failed, spooling to event log: {e}")
+    if await run_in_threadpool(portfolio.spool_events, 'contact', [contact]):
+        return 'queued'
+    print(f"❌ Contact form submission from {contact['name']} could not be stored")
+    return None
+
+
+async def home(request):
+    response = prebuilt(portfolio.HOME_RESPONSE, request)
+    response.background = track(request)
+    return response
+
+
+async def contact_page(request):
+    return prebuilt(portfolio.CONTACT_RESPONSE, request)
+
+
+async def health(request):
+    return prebuilt(portfolio.HEALTH_RESPONSE, request)
+
+
+async def skills(request):
+    return prebuilt(portfolio.SKILLS_RESPONSE, request)
+
+
+async def projects(request):
+    return prebuilt(portfolio.PROJECTS_RESPONSE, request)
+
+
+async def assets(request):
+    response = portfolio.ASSET_RESPONSES.get(request.path_params['filename'])
+    if response is None:
+        return json_response({'error': 'Not found'}, 404)
+    return prebuilt(response, request)
+
+
+async def stats(request):
+    return json_response(portfolio.stats_payload(await visitor_count(), await unique_visitors_today()))
+
+
+async def visitors_api(request):
+    if request.method == 'POST':
+        background = track(request)
+        return json_response({'status': 'visitor tracked', 'total': await visitor_count()},
+                             background=background)
+    consistency = request.query_params.get('consistency', 'local')
+    if consistency not in ('local', 'merged'):
+        return json_response({'error': 'consistency must be local or merged'}, 400)
+    recent = portfolio.recent_visitors.latest()
+    database = motor_database()
+    if consistency == 'merged' and database is not None:
+        try:
+            query, projection = portfolio.recent_visitors.published_query()
+            cursor = database.visitor_recent.find(query, projection)
+            published = await portfolio.mongo_breaker.acall(cursor.to_list, None)
+            recent = portfolio.recent_visitors.merge(published)
+        except Exception as e:
+            print(f"Error getting visitor data: {e}")
+    return json_response({
+        'total_visitors': await visitor_count(),
+        'recent_visitors': recent,
+        'consistency': consistency
+    })
+
+
+async def submit_contact(request):
+    try:
+        data = await request.json()
+        error = portfolio.contact_form_error(data)
+        if error:
+            return json_response({'error': error}, 400)
+        contact = portfolio.new_contact(data, request.client.host if request.client else None)
+        outcome = await store_contact(contact)
+        if outcome is None:
+            return json_response({'error': 'Failed to submit contact form'}, 503)
+        return json_response(portfolio.contact_accepted(contact), 201,
+                             background=BackgroundTask(portfolio.log_contact, contact, outcome))
+    except Exception as e:
+        print(f"Error submitting contact form: {e}")
+        return json_response({'error': 'Failed to submit contact form'}, 500)
+
+
+app = Starlette(
+    routes=[
+        route('/', home),
+        route('/contact', contact_page),
+        route('/health', health),
+        route('/api/skills', skills),
+        route('/api/projects', projects),
+        route('/assets/{filename:path}', assets),
+        route('/api/stats', stats),
+        route('/api/visitors', visitors_api, methods=['GET', 'POST']),
+        route('/api/contact', submit_contact, methods=['POST']),
+        # Admin, export and analytics routes keep running on the Flask app
+        Mount('/', WSGIMiddleware(portfolio.app)),
+    ],
+    lifespan=lifespan,
+)
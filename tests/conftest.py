@@ -1,5 +1,12 @@
+import os
+import tempfile
+
 import pytest
 
+# Keep spooled events out of the working tree and away from mocked collections
+os.environ.setdefault('EVENT_LOG_DIR', tempfile.mkdtemp(prefix='portfolio-events-'))
+os.environ.setdefault('EVENT_REPLAY_INTERVAL', '3600')
+
 from oriyan_portfolio import app
 
 @pytest.fixture
@@ -9,3 +16,12 @@ def client():
     })
     with app.test_client() as client:
         yield client
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start every test with empty per-process caches"""
+    import oriyan_portfolio
+    oriyan_portfolio.visitor_count_cache.invalidate()
+    oriyan_portfolio.unique_today_cache.invalidate()
+    yield
@@ -0,0 +1,173 @@
+"""Tests for the async ASGI entry point"""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from starlette.testclient import TestClient
+
+import oriyan_portfolio
+import oriyan_portfolio_asgi
+
+
+@pytest.fixture
+def asgi_client():
+    with TestClient(oriyan_portfolio_asgi.app) as client:
+        yield client
+
+
+@pytest.fixture
+def motor_db(mocker):
+    database = MagicMock()
+    mocker.patch.object(oriyan_portfolio_asgi, 'motor_database', return_value=database)
+    return database
+
+
+def _find_returning(docs):
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=docs)
+    return MagicMock(return_value=cursor)
+
+
+@pytest.mark.parametrize('path', ['/', '/contact', '/health', '/api/skills', '/api/projects'])
+def test_prebuilt_routes_match_wsgi(asgi_client, client, mocker, path):
+    mocker.patch.object(oriyan_portfolio, 'record_visitor')
+    headers = {'Accept-Encoding': 'identity'}
+
+    asgi = asgi_client.get(path, headers=headers)
+    wsgi = client.get(path, headers=headers)
+
+    assert asgi.status_code == 200
+    assert asgi.content == wsgi.data
+    assert asgi.headers['etag'] == wsgi.headers['ETag']
+    assert asgi.headers['cache-control'] == wsgi.headers['Cache-Control']
+
+
+def test_prebuilt_revalidation(asgi_client):
+    etag = asgi_client.get('/health').headers['etag']
+
+    response = asgi_client.get('/health', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.content == b''
+
+
+def test_fingerprinted_asset(asgi_client):
+    response = asgi_client.get(oriyan_portfolio.asset_url('css/home.css'))
+
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['cache-control']
+    assert asgi_client.get('/assets/missing.css').status_code == 404
+
+
+def test_home_queues_visit_after_response(asgi_client, mocker):
+    record = mocker.patch.object(oriyan_portfolio, 'record_visitor')
+
+    asgi_client.get('/', headers={'User-Agent': 'pytest'})
+
+    visitor = record.call_args[0][0]
+    assert visitor['page'] == '/'
+    assert visitor['user_agent'] == 'pytest'
+
+
+def test_stats_counts_with_motor(asgi_client, motor_db, mocker):
+    motor_db.stats.find_one = AsyncMock(return_value={'fold_seq': 3})
+    motor_db.stats.find = _find_returning([{'total_visitors': 5}, {'total_visitors': 7}])
+    mocker.patch.object(oriyan_portfolio, 'get_unique_visitors_today', return_value=0)
+    mocker.patch.object(oriyan_portfolio.unique_today_cache, 'loader', return_value=3)
+
+    data = asgi_client.get('/api/stats').json()
+
+    assert data['visitors'] == 12
+    assert data['unique_visitors_today'] == 3
+    assert motor_db.stats.find.call_args[0][1] == oriyan_portfolio.VISITOR_COUNTER_PROJECTION
+    # The count is cached for the WSGI side as well
+    assert oriyan_portfolio.get_visitor_count() == 12
+
+
+def test_stats_without_mongo(asgi_client, mocker):
+    mocker.patch.object(oriyan_portfolio_asgi, 'motor_database', return_value=None)
+    mocker.patch.object(oriyan_portfolio.unique_today_cache, 'loader', side_effect=RuntimeError('down'))
+
+    data = asgi_client.get('/api/stats').json()
+
+    assert data['visitors'] == 42
+    assert data['unique_visitors_today'] == 0
+
+
+def test_contact_stored_with_motor(asgi_client, motor_db):
+    motor_db.contacts.insert_one = AsyncMock()
+
+    response = asgi_client.post('/api/contact', json={
+        'name': 'Test User', 'email': 'test@example.com', 'message': 'hi'})
+
+    assert response.status_code == 201
+    stored = motor_db.contacts.insert_one.call_args[0][0]
+    assert response.json()['contact_id'] == str(stored['_id'])
+
+
+def test_contact_spooled_without_mongo(asgi_client, mocker):
+    mocker.patch.object(oriyan_portfolio_asgi, 'motor_database', return_value=None)
+    spool = mocker.patch.object(oriyan_portfolio, 'spool_events', return_value=True)
+
+    response = asgi_client.post('/api/contact', json={
+        'name': 'Test User', 'email': 'test@example.com', 'message': 'hi'})
+
+    assert response.status_code == 201
+    assert spool.call_args[0][0] == 'contact'
+
+
+def test_contact_refused_when_it_cannot_be_kept(asgi_client, mocker):
+    mocker.patch.object(oriyan_portfolio_asgi, 'motor_database', return_value=None)
+    mocker.patch.object(oriyan_portfolio, 'spool_events', return_value=False)
+
+    response = asgi_client.post('/api/contact', json={
+        'name': 'Test User', 'email': 'test@example.com', 'message': 'hi'})
+
+    assert response.status_code == 503
+
+
+def test_contact_validation(asgi_client):
+    response = asgi_client.post('/api/contact', json={'name': 'Test User'})
+
+    assert response.status_code == 400
+    assert response.json() == {'error': 'email is required'}
+
+
+def test_merged_visitors_with_motor(asgi_client, motor_db, mocker):
+    mocker.patch.object(oriyan_portfolio_asgi, 'visitor_count', AsyncMock(return_value=1))
+    merge = mocker.patch.object(oriyan_portfolio.recent_visitors, 'merge', return_value=[])
+    motor_db.visitor_recent.find = _find_returning([{'_id': 'other', 'visits': []}])
+
+    data = asgi_client.get('/api/visitors?consistency=merged').json()
+
+    assert data['consistency'] == 'merged'
+    merge.assert_called_once_with([{'_id': 'other', 'visits': []}])
+    assert asgi_client.get('/api/visitors?consistency=bogus').status_code == 400
+
+
+def test_other_routes_fall_through_to_flask(asgi_client):
+    response = asgi_client.get('/api/contacts')
+
+    assert response.status_code == 401
+    assert response.json() == {'error': 'Unauthorized'}
+    assert 'portfolio_requests_total' in asgi_client.get('/metrics').text
+
+
+def test_native_routes_record_route_metrics(asgi_client):
+    labels = {'method': 'GET', 'endpoint': '/api/skills', 'http_status': '200'}
+    registry = oriyan_portfolio.metrics_registry
+    before = registry.get_sample_value('portfolio_requests_total', labels) or 0
+
+    body = asgi_client.get('/api/skills', headers={'Accept-Encoding': 'identity'}).content
+
+    assert registry.get_sample_value('portfolio_requests_total', labels) == before + 1
+    assert registry.get_sample_value('portfolio_response_size_bytes_sum', {'endpoint': '/api/skills'}) >= len(body)
+
+
+def test_asset_route_records_the_flask_rule(asgi_client):
+    labels = {'method': 'GET', 'endpoint': '/assets/<path:filename>', 'http_status': '200'}
+    registry = oriyan_portfolio.metrics_registry
+    before = registry.get_sample_value('portfolio_requests_total', labels) or 0
+
+    assert asgi_client.get(oriyan_portfolio.asset_url('css/home.css')).status_code == 200
+
+    assert registry.get_sample_value('portfolio_requests_total', labels) == before + 1
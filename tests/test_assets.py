@@ -0,0 +1,71 @@
+"""Tests for the templated pages and fingerprinted static assets"""
+import json
+
+import oriyan_portfolio
+from oriyan_portfolio import app
+
+
+def test_pages_link_fingerprinted_assets():
+    home_css = oriyan_portfolio.asset_url('css/home.css')
+    contact_js = oriyan_portfolio.asset_url('js/contact.js')
+
+    assert home_css.startswith('/assets/css/home.') and home_css.endswith('.css')
+    assert home_css in oriyan_portfolio.HOME_PAGE_HTML
+    assert contact_js in oriyan_portfolio.CONTACT_PAGE_HTML
+    assert '<style>' not in oriyan_portfolio.HOME_PAGE_HTML
+
+
+def test_asset_served_immutable(client):
+    url = oriyan_portfolio.asset_url('css/home.css')
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/css'
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    with open(f"{app.static_folder}/css/home.css", 'rb') as f:
+        assert response.data == f.read()
+
+    revalidated = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_unknown_asset_is_404(client):
+    assert client.get('/assets/css/home.0000.css').status_code == 404
+
+
+def test_fingerprint_changes_with_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    (tmp_path / 'site.css').write_text('body { color: red; }')
+    first, _ = oriyan_portfolio.fingerprint_asset('site.css')
+    (tmp_path / 'site.css').write_text('body { color: blue; }')
+    second, _ = oriyan_portfolio.fingerprint_asset('site.css')
+
+    assert first != second
+    assert first.startswith('site.') and first.endswith('.css')
+
+
+def test_assets_build_writes_manifest(tmp_path, mocker, monkeypatch):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('body {}')
+    dist = tmp_path / 'dist'
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    mocker.patch.object(oriyan_portfolio, 'ASSET_DIST_DIR', str(dist))
+    mocker.patch.object(oriyan_portfolio, 'ASSET_MANIFEST_PATH', str(dist / 'manifest.json'))
+
+    result = app.test_cli_runner().invoke(args=['assets', 'build'])
+
+    assert result.exit_code == 0
+    manifest = json.loads((dist / 'manifest.json').read_text())
+    assert list(manifest) == ['css/site.css']
+    assert (dist / manifest['css/site.css']).read_text() == 'body {}'
+
+    # A second build does not pick up its own output
+    app.test_cli_runner().invoke(args=['assets', 'build'])
+    assert list(json.loads((dist / 'manifest.json').read_text())) == ['css/site.css']
+
+    manifest, responses = oriyan_portfolio.load_assets()
+    assert set(responses) == {manifest['css/site.css']}
+
+
+def test_templates_use_bytecode_cache():
+    assert app.jinja_env.bytecode_cache is not None
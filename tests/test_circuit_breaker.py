@@ -0,0 +1,157 @@
+"""Tests for the MongoDB circuit breaker"""
+from unittest.mock import MagicMock
+
+import pytest
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+
+import oriyan_portfolio
+from oriyan_portfolio import CircuitBreaker, CircuitOpenError, GuardedCollection
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _state_gauge(name):
+    return oriyan_portfolio.metrics_registry.get_sample_value('portfolio_mongo_circuit_state', {'breaker': name})
+
+
+def _fail():
+    raise ServerSelectionTimeoutError('no servers')
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker('test', failure_rate=0.5, min_calls=4, window=30, cooldown=10, clock=clock)
+
+
+def _trip(breaker):
+    while breaker.state != CircuitBreaker.OPEN:
+        with pytest.raises(ServerSelectionTimeoutError):
+            breaker.call(_fail)
+
+
+def test_opens_once_failure_rate_reached(breaker):
+    breaker.call(lambda: 1)
+    breaker.call(lambda: 1)
+    for _ in range(2):
+        with pytest.raises(ServerSelectionTimeoutError):
+            breaker.call(_fail)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert _state_gauge('test') == 2
+
+
+def test_stays_closed_below_min_calls(breaker):
+    for _ in range(3):
+        with pytest.raises(ServerSelectionTimeoutError):
+            breaker.call(_fail)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_old_failures_leave_the_window(breaker, clock):
+    for _ in range(3):
+        with pytest.raises(ServerSelectionTimeoutError):
+            breaker.call(_fail)
+    clock.now += 31
+    with pytest.raises(ServerSelectionTimeoutError):
+        breaker.call(_fail)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_server_errors_count_as_success(breaker):
+    def duplicate():
+        raise DuplicateKeyError('E11000')
+
+    for _ in range(6):
+        with pytest.raises(DuplicateKeyError):
+            breaker.call(duplicate)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_breaker_short_circuits(breaker):
+    _trip(breaker)
+    func = MagicMock()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(func)
+
+    func.assert_not_called()
+
+
+def test_half_open_trial_closes_on_success(breaker, clock):
+    _trip(breaker)
+    clock.now += 10
+
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert _state_gauge('test') == 0
+
+
+def test_half_open_trial_reopens_on_failure(breaker, clock):
+    _trip(breaker)
+    clock.now += 10
+
+    with pytest.raises(ServerSelectionTimeoutError):
+        breaker.call(_fail)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'ok')
+
+
+def test_half_open_lets_one_trial_through(breaker, clock):
+    _trip(breaker)
+    clock.now += 10
+    breaker.before_call()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'ok')
+
+
+def test_guarded_collection_and_cursor(breaker):
+    collection = MagicMock()
+    collection.find.return_value.sort.return_value = iter([{'_id': 1}, {'_id': 2}])
+    guarded = GuardedCollection(collection, breaker)
+
+    assert [doc['_id'] for doc in guarded.find({}).sort('_id')] == [1, 2]
+    guarded.update_one({'_id': 1}, {'$set': {'x': 1}})
+    collection.update_one.assert_called_once()
+
+    _trip(breaker)
+    with pytest.raises(CircuitOpenError):
+        guarded.insert_one({'_id': 3})
+    with pytest.raises(CircuitOpenError):
+        list(guarded.find({}))
+    collection.insert_one.assert_not_called()
+
+
+def test_open_breaker_serves_cached_count(mocker, breaker):
+    stats = MagicMock()
+    stats.find_one.return_value = None
+    stats.find.return_value = iter([{'total_visitors': 9}])
+    mocker.patch.object(oriyan_portfolio, 'stats_collection', GuardedCollection(stats, breaker))
+    assert oriyan_portfolio.get_visitor_count() == 9
+
+    _trip(breaker)
+    rejected = oriyan_portfolio.metrics_registry.get_sample_value(
+        'portfolio_mongo_circuit_rejected_total', {'breaker': 'test'}) or 0
+    oriyan_portfolio.visitor_count_cache.invalidate()
+
+    # No cached value left and the circuit is open: the degraded count, immediately
+    assert oriyan_portfolio.get_visitor_count() == 42
+    assert oriyan_portfolio.metrics_registry.get_sample_value(
+        'portfolio_mongo_circuit_rejected_total', {'breaker': 'test'}) == rejected + 1
@@ -0,0 +1,86 @@
+"""Tests for keyset pagination on the admin contacts endpoint"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from bson import ObjectId
+
+import oriyan_portfolio
+
+AUTH = {'Authorization': 'Bearer admin-secret-key'}
+
+
+def _contacts(n):
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    return [
+        {'_id': ObjectId(), 'name': f'User {i}', 'email': f'u{i}@example.com',
+         'message': 'hi', 'timestamp': start - timedelta(minutes=i)}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def contacts(mocker):
+    collection = MagicMock()
+    collection.estimated_document_count.return_value = 1000
+    mocker.patch.object(oriyan_portfolio, 'contacts_collection', collection)
+    return collection
+
+
+def _page(collection, docs):
+    collection.find.return_value.sort.return_value.limit.return_value = docs
+
+
+def test_first_page_uses_limit_plus_one_and_returns_cursor(client, contacts):
+    docs = _contacts(3)
+    expected = (docs[1]['timestamp'], docs[1]['_id'])
+    _page(contacts, docs)
+
+    response = client.get('/api/contacts?limit=2', headers=AUTH)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 2
+    assert data['total'] == 1000
+    assert data['next_cursor'] is not None
+    query, projection = contacts.find.call_args[0]
+    assert query == {}
+    contacts.find.return_value.sort.assert_called_with([('timestamp', -1), ('_id', -1)])
+    contacts.find.return_value.sort.return_value.limit.assert_called_with(3)
+
+    cursor = oriyan_portfolio.decode_contacts_cursor(data['next_cursor'])
+    assert cursor == expected
+
+
+def test_cursor_turns_into_keyset_query(client, contacts):
+    docs = _contacts(2)
+    _page(contacts, docs[1:])
+    token = oriyan_portfolio.encode_contacts_cursor(docs[0])
+
+    data = client.get(f'/api/contacts?limit=5&cursor={token}', headers=AUTH).get_json()
+
+    assert data['next_cursor'] is None
+    query = contacts.find.call_args[0][0]
+    assert query == {'$or': [
+        {'timestamp': {'$lt': docs[0]['timestamp']}},
+        {'timestamp': docs[0]['timestamp'], '_id': {'$lt': docs[0]['_id']}},
+    ]}
+
+
+def test_fields_are_pushed_down_as_projection(client, contacts):
+    docs = [{'_id': ObjectId(), 'email': 'a@example.com', 'timestamp': datetime(2024, 1, 1)}]
+    _page(contacts, docs)
+
+    data = client.get('/api/contacts?fields=email', headers=AUTH).get_json()
+
+    assert contacts.find.call_args[0][1] == {'email': 1, 'timestamp': 1}
+    assert set(data['contacts'][0]) == {'_id', 'email'}
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=1000', 'limit=ten', 'fields=password', 'cursor=not-a-cursor'])
+def test_invalid_arguments_are_rejected(client, contacts, query):
+    assert client.get(f'/api/contacts?{query}', headers=AUTH).status_code == 400
+    contacts.find.assert_not_called()
+
+
+def test_requires_auth(client, contacts):
+    assert client.get('/api/contacts').status_code == 401
@@ -0,0 +1,185 @@
+"""Tests for the durable local event log and its replayer"""
+import os
+import threading
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+import oriyan_portfolio
+from oriyan_portfolio import EventLog
+
+
+@pytest.fixture
+def log(tmp_path):
+    return EventLog(str(tmp_path), segment_bytes=200)
+
+
+def _docs(n):
+    return [{'_id': ObjectId(), 'page': '/', 'timestamp': datetime.now(timezone.utc)} for _ in range(n)]
+
+
+def test_replay_streams_records_in_order_and_roundtrips_types(log):
+    docs = _docs(3)
+    log.append('visitor', docs)
+    written = []
+
+    assert log.replay({'visitor': written.extend}) == 3
+    assert [d['_id'] for d in written] == [d['_id'] for d in docs]
+    assert isinstance(written[0]['timestamp'], datetime)
+
+
+def test_segments_rotate_and_checkpoint_prevents_rewrites(log):
+    for _ in range(5):
+        log.append('visitor', _docs(1))
+    directory = log.directories()[0]
+    assert len([n for n in os.listdir(directory) if n.endswith('.log')]) > 1
+
+    written = []
+    assert log.replay({'visitor': written.extend}) == 5
+    # Replayed segments are dropped, only the one still being appended stays
+    assert len([n for n in os.listdir(directory) if n.endswith('.log')]) == 1
+    assert log.replay({'visitor': written.extend}) == 0
+
+    log.append('visitor', _docs(1))
+    assert log.replay({'visitor': written.extend}) == 1
+    assert len(written) == 6
+    assert log.pending_bytes() == 0
+
+
+def test_failed_write_keeps_checkpoint(log):
+    log.append('contact', _docs(2))
+
+    def failing(docs):
+        raise RuntimeError('still down')
+
+    with pytest.raises(RuntimeError):
+        log.replay({'contact': failing})
+    written = []
+    assert log.replay({'contact': written.extend}) == 2
+
+
+def test_torn_tail_is_left_for_later(log):
+    log.append('visitor', _docs(1))
+    directory = log.directories()[0]
+    segment = sorted(n for n in os.listdir(directory) if n.endswith('.log'))[-1]
+    with open(os.path.join(directory, segment), 'ab') as f:
+        f.write(b'{"kind": "visitor", "doc"')
+
+    written = []
+    assert log.replay({'visitor': written.extend}) == 1
+    assert log.pending_bytes() > 0
+
+
+def _owner_directory(log):
+    return os.path.join(log.root, f"{oriyan_portfolio.POD_NAME}-{os.getpid()}")
+
+
+def _append_in_thread(log, docs):
+    thread = threading.Thread(target=log.append, args=('visitor', docs), daemon=True)
+    thread.start()
+    thread.join(0.2)
+    return thread
+
+
+def test_append_waits_for_owner_lock_held_by_replayer(log):
+    directory = _owner_directory(log)
+    os.makedirs(directory)
+    # Another worker's replayer probing whether the owner is alive
+    probe = oriyan_portfolio._try_lock(os.path.join(directory, 'owner.lock'))
+
+    thread = _append_in_thread(log, _docs(1))
+    assert thread.is_alive()
+    probe.close()
+    thread.join(5)
+
+    log.append('visitor', _docs(1))
+    written = []
+    assert log.replay({'visitor': written.extend}) == 2
+    # The owner is alive, so its active segment and directory are kept
+    assert os.listdir(directory)
+    log.append('visitor', _docs(1))
+    assert log.replay({'visitor': written.extend}) == 1
+
+
+def test_append_retakes_lock_removed_by_replayer(log):
+    directory = _owner_directory(log)
+    os.makedirs(directory)
+    lock_path = os.path.join(directory, 'owner.lock')
+    probe = oriyan_portfolio._try_lock(lock_path)
+
+    thread = _append_in_thread(log, _docs(1))
+    # The replayer took the directory for abandoned and cleaned it up
+    os.remove(lock_path)
+    os.rmdir(directory)
+    probe.close()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert oriyan_portfolio._try_lock(lock_path) is None
+    assert log.replay({'visitor': lambda docs: None}) == 1
+
+
+def test_replay_does_not_double_count_duplicates(mocker):
+    visitors = MagicMock()
+    stats = MagicMock()
+    visitors.insert_many.side_effect = BulkWriteError({
+        'nInserted': 1,
+        'writeErrors': [{'index': 0, 'code': 11000}],
+    })
+    mocker.patch.object(oriyan_portfolio, 'visitors_collection', visitors)
+    mocker.patch.object(oriyan_portfolio, 'stats_collection', stats)
+
+    # The first event already made it to MongoDB before the checkpoint moved
+    assert oriyan_portfolio._write_visitor_batch(_docs(2)) == 1
+    assert stats.update_one.call_args[0][1]['$inc'] == {'total_visitors': 1}
+
+
+
+def test_counter_failure_after_insert_spools_effects_not_visits(log, mocker):
+    visitors = MagicMock()
+    stats = MagicMock()
+    stats.update_one.side_effect = [Exception('timeout'), None, None]
+    mocker.patch.object(oriyan_portfolio, 'visitors_collection', visitors)
+    mocker.patch.object(oriyan_portfolio, 'stats_collection', stats)
+    mocker.patch.object(oriyan_portfolio, 'event_log', log)
+    mocker.patch.object(oriyan_portfolio.event_replayer, 'ensure_started')
+    rollups = mocker.patch.object(oriyan_portfolio, '_update_visitor_rollups')
+
+    # Stored, so the batch itself is not retried
+    assert oriyan_portfolio._write_visitor_batch(_docs(2)) == 2
+    rollups.assert_not_called()
+
+    writers = {'visitor_effects': oriyan_portfolio._write_visitor_effects}
+    assert log.replay(writers) == 1
+    shard_filter, update = stats.update_one.call_args[0][:2]
+    assert shard_filter['_id'].startswith('visitors:batch:')
+    assert update['$setOnInsert']['total_visitors'] == 2
+    assert len(rollups.call_args[0][0]) == 2
+    assert log.replay(writers) == 0
+
+def test_contact_spooled_when_mongo_unavailable(client, mocker):
+    mocker.patch.object(oriyan_portfolio, 'contacts_collection', None)
+    mock_log = mocker.patch.object(oriyan_portfolio, 'event_log')
+
+    response = client.post('/api/contact', json={
+        'name': 'Test User', 'email': 'test@example.com', 'message': 'hi'})
+
+    assert response.status_code == 201
+    kind, docs = mock_log.append.call_args[0]
+    assert kind == 'contact'
+    assert response.get_json()['contact_id'] == str(docs[0]['_id'])
+
+
+def test_contact_spooled_when_insert_fails(client, mocker):
+    contacts = MagicMock()
+    contacts.insert_one.side_effect = Exception('timeout')
+    mocker.patch.object(oriyan_portfolio, 'contacts_collection', contacts)
+    mock_log = mocker.patch.object(oriyan_portfolio, 'event_log')
+
+    response = client.post('/api/contact', json={
+        'name': 'Test User', 'email': 'test@example.com', 'message': 'hi'})
+
+    assert response.status_code == 201
+    assert mock_log.append.call_args[0][0] == 'contact'
@@ -0,0 +1,142 @@
+"""Tests for the streaming NDJSON/CSV exports"""
+import csv
+import gzip
+import io
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from bson import ObjectId
+from pymongo.errors import ServerSelectionTimeoutError
+
+import oriyan_portfolio
+
+AUTH = {'Authorization': 'Bearer admin-secret-key'}
+
+
+def _visits(n):
+    start = datetime(2024, 1, 1)
+    return [
+        {'_id': ObjectId(), 'ip': '10.0.0.1', 'user_agent': 'agent, "quoted"',
+         'page': '/', 'timestamp': start + timedelta(seconds=i)}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def visitors(mocker):
+    collection = MagicMock()
+    mocker.patch.object(oriyan_portfolio, 'visitors_collection', collection)
+    return collection
+
+
+def _cursor(collection, docs):
+    collection.find.return_value.sort.return_value.batch_size.return_value = iter(docs)
+
+
+def test_ndjson_export_streams_one_document_per_line(client, visitors):
+    docs = _visits(3)
+    _cursor(visitors, docs)
+
+    response = client.get('/api/visitors/export', headers=AUTH)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=visitors.ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['_id'] for line in lines] == [str(d['_id']) for d in docs]
+    assert lines[0]['timestamp'] == '2024-01-01T00:00:00'
+    visitors.find.return_value.sort.return_value.batch_size.assert_called_with(oriyan_portfolio.EXPORT_BATCH_SIZE)
+
+
+def test_csv_export_quotes_fields(client, visitors):
+    _cursor(visitors, _visits(2))
+
+    response = client.get('/api/visitors/export?format=csv', headers=AUTH)
+
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['_id', 'ip', 'user_agent', 'timestamp', 'page']
+    assert rows[1][2] == 'agent, "quoted"'
+    assert len(rows) == 3
+
+
+def test_gzip_export(client, visitors):
+    _cursor(visitors, _visits(2000))
+
+    response = client.get('/api/visitors/export', headers=dict(AUTH, **{'Accept-Encoding': 'gzip'}))
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    body = gzip.decompress(response.get_data())
+    assert len(body.splitlines()) == 2000
+
+
+def test_since_until_filter(client, mocker):
+    contacts = MagicMock()
+    mocker.patch.object(oriyan_portfolio, 'contacts_collection', contacts)
+    _cursor(contacts, [])
+
+    client.get('/api/contacts/export?since=2024-01-01T00:00:00Z&until=2024-02-01T00:00:00Z', headers=AUTH)
+
+    query = contacts.find.call_args[0][0]
+    assert set(query['timestamp']) == {'$gte', '$lt'}
+    assert query['timestamp']['$gte'].year == 2024
+
+
+def test_export_is_lazy(client, visitors, mocker):
+    mocker.patch.object(oriyan_portfolio, 'EXPORT_CHUNK_BYTES', 1)
+    consumed = []
+
+    def documents():
+        for doc in _visits(5):
+            consumed.append(doc)
+            yield doc
+
+    _cursor(visitors, documents())
+    response = client.get('/api/visitors/export', headers=AUTH, buffered=False)
+    # Documents are pulled from the cursor only as the body is read
+    assert len(consumed) < 5
+    response.get_data()
+    assert len(consumed) == 5
+
+
+def test_export_requires_admin_and_valid_arguments(client, visitors):
+    assert client.get('/api/visitors/export').status_code == 401
+    assert client.get('/api/contacts/export').status_code == 401
+    assert client.get('/api/visitors/export?format=xml', headers=AUTH).status_code == 400
+    assert client.get('/api/visitors/export?since=last-week', headers=AUTH).status_code == 400
+
+
+def test_export_unavailable_without_mongo(client, mocker):
+    mocker.patch.object(oriyan_portfolio, 'contacts_collection', None)
+    assert client.get('/api/contacts/export', headers=AUTH).status_code == 503
+
+
+def test_export_fails_before_streaming_when_mongo_unreachable(client, visitors):
+    visitors.find.return_value.sort.return_value.batch_size.return_value = MagicMock(
+        __next__=MagicMock(side_effect=ServerSelectionTimeoutError('no servers')))
+
+    response = client.get('/api/visitors/export', headers=AUTH)
+
+    assert response.status_code == 503
+    assert response.get_json() == {'error': 'MongoDB not available'}
+
+
+def test_export_fails_before_streaming_while_circuit_open(client, mocker):
+    breaker = oriyan_portfolio.CircuitBreaker('test')
+    breaker._open(breaker.clock())
+    cursor = MagicMock()
+    # Like pymongo, sort() and batch_size() return the cursor itself
+    cursor.sort.return_value = cursor.batch_size.return_value = cursor
+    collection = oriyan_portfolio.GuardedCollection(MagicMock(**{'find.return_value': cursor}), breaker)
+    mocker.patch.object(oriyan_portfolio, 'visitors_collection', collection)
+
+    assert client.get('/api/visitors/export', headers=AUTH).status_code == 503
+
+
+def test_empty_export(client, visitors):
+    _cursor(visitors, [])
+
+    response = client.get('/api/visitors/export?format=csv', headers=AUTH)
+
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).splitlines() == ['_id,ip,user_agent,timestamp,page']
@@ -0,0 +1,95 @@
+"""Tests for the cgroup-aware worker sizing in gunicorn.conf.py"""
+import importlib.util
+import os
+
+import pytest
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+@pytest.fixture(scope='module')
+def conf():
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', CONF_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_cgroup_v2_limits(conf, tmp_path):
+    (tmp_path / 'cpu.max').write_text('20000 100000\n')
+    (tmp_path / 'memory.max').write_text(f'{256 * 1024 * 1024}\n')
+
+    assert conf.cgroup_cpu_limit(str(tmp_path)) == pytest.approx(0.2)
+    assert conf.cgroup_memory_limit(str(tmp_path)) == 256 * 1024 * 1024
+
+
+def test_cgroup_v2_unlimited(conf, tmp_path):
+    (tmp_path / 'cpu.max').write_text('max 100000\n')
+    (tmp_path / 'memory.max').write_text('max\n')
+
+    assert conf.cgroup_cpu_limit(str(tmp_path)) is None
+    assert conf.cgroup_memory_limit(str(tmp_path)) is None
+
+
+def test_cgroup_v1_limits(conf, tmp_path):
+    (tmp_path / 'cpu').mkdir()
+    (tmp_path / 'cpu' / 'cpu.cfs_quota_us').write_text('150000\n')
+    (tmp_path / 'cpu' / 'cpu.cfs_period_us').write_text('100000\n')
+    (tmp_path / 'memory').mkdir()
+    (tmp_path / 'memory' / 'memory.limit_in_bytes').write_text('9223372036854771712\n')
+
+    assert conf.cgroup_cpu_limit(str(tmp_path)) == pytest.approx(1.5)
+    assert conf.cgroup_memory_limit(str(tmp_path)) is None
+
+
+def test_no_cgroup_files(conf, tmp_path):
+    assert conf.cgroup_cpu_limit(str(tmp_path)) is None
+    assert conf.cgroup_memory_limit(str(tmp_path)) is None
+
+
+@pytest.mark.parametrize('cpus, memory_mb, expected', [
+    (0.2, 256, 2),     # the deployment's limits
+    (1, None, 3),
+    (4, None, 9),
+    (4, 256, 3),       # memory bound
+    (0.1, 32, 1),
+])
+def test_worker_count(conf, cpus, memory_mb, expected):
+    memory = memory_mb * 1024 * 1024 if memory_mb else None
+    assert conf.worker_count(cpus, memory, 80 * 1024 * 1024) == expected
+
+
+def test_preload_freezes_before_fork(conf, mocker):
+    mocker.patch.object(conf, 'preload_app', True)
+    gc = mocker.patch.object(conf, 'gc')
+
+    conf.pre_fork(None, None)
+
+    assert gc.method_calls == [mocker.call.freeze(), mocker.call.enable()]
+
+
+def test_hooks_do_nothing_without_preload(conf, mocker):
+    mocker.patch.object(conf, 'preload_app', False)
+    gc = mocker.patch.object(conf, 'gc')
+
+    conf.pre_fork(None, None)
+
+    assert not gc.method_calls
+
+
+def test_child_exit_marks_worker_dead(conf, mocker, monkeypatch, tmp_path):
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+    mark_process_dead = mocker.patch.object(conf.multiprocess, 'mark_process_dead')
+
+    conf.child_exit(None, mocker.Mock(pid=1234))
+
+    mark_process_dead.assert_called_once_with(1234)
+
+
+def test_clear_metrics_dir(conf, tmp_path):
+    (tmp_path / 'counter_1.db').write_bytes(b'')
+    (tmp_path / 'keep.txt').write_text('')
+
+    conf.clear_metrics_dir(str(tmp_path))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['keep.txt']
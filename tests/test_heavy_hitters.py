@@ -0,0 +1,61 @@
+"""Tests for Space-Saving heavy hitter tracking"""
+from unittest.mock import MagicMock
+
+import oriyan_portfolio
+from oriyan_portfolio import SpaceSaving, HeavyHitterTracker
+
+
+def test_space_saving_keeps_heavy_items_in_bounded_memory():
+    sketch = SpaceSaving(capacity=10)
+    for i in range(5000):
+        sketch.add('/' if i % 2 == 0 else f'crawler-{i}')
+
+    assert len(sketch.counters) == 10
+    top = sketch.top(1)[0]
+    assert top['item'] == '/'
+    # Space-Saving never underestimates and the error bound covers the overshoot
+    assert top['count'] >= 2500
+    assert top['count'] - top['error'] <= 2500
+
+
+def test_tracker_truncates_long_items():
+    tracker = HeavyHitterTracker(capacity=5)
+    tracker.add_events([{'page': '/', 'user_agent': 'x' * 5000}])
+    assert len(tracker.snapshot('user_agent')[0]['item']) == oriyan_portfolio.TOP_MAX_ITEM_LENGTH
+
+
+def test_top_endpoint_merges_other_workers(client, mocker):
+    top = MagicMock()
+    top.find.return_value = [
+        {'_id': 'page:other-pod:1', 'field': 'page',
+         'counters': [{'item': '/contact', 'count': 40, 'error': 0}, {'item': '/', 'count': 5, 'error': 0}]},
+    ]
+    mocker.patch.object(oriyan_portfolio, 'top_collection', top)
+    tracker = HeavyHitterTracker(capacity=10)
+    tracker.add_events([{'page': '/', 'user_agent': 'a'}] * 3)
+    mocker.patch.object(oriyan_portfolio, 'heavy_hitters', tracker)
+
+    response = client.get('/api/visitors/top?field=page&k=2')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [(t['item'], t['count']) for t in data['top']] == [('/contact', 40), ('/', 8)]
+    assert top.find.call_args[0][0]['field'] == 'page'
+
+
+def test_tracker_flush_writes_worker_snapshots(mocker):
+    top = MagicMock()
+    mocker.patch.object(oriyan_portfolio, 'top_collection', top)
+    tracker = HeavyHitterTracker(capacity=10)
+    assert tracker.flush() == 0
+
+    tracker.add_events([{'page': '/', 'user_agent': 'a'}])
+    assert tracker.flush() == 2
+    ids = sorted(op._filter['_id'] for op in top.bulk_write.call_args[0][0])
+    assert ids == sorted([tracker.worker_id('page'), tracker.worker_id('user_agent')])
+
+
+def test_top_endpoint_validates_arguments(client):
+    assert client.get('/api/visitors/top?field=ip').status_code == 400
+    assert client.get('/api/visitors/top?k=0').status_code == 400
+    assert client.get('/api/visitors/top?k=lots').status_code == 400
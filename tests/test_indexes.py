@@ -0,0 +1,91 @@
+"""Tests for the declarative index registry and its CLI"""
+import pytest
+from unittest.mock import MagicMock
+
+import oriyan_portfolio
+
+
+@pytest.fixture
+def database():
+    collections = {}
+
+    def get(name):
+        return collections.setdefault(name, MagicMock(name=name))
+
+    db = MagicMock()
+    db.__getitem__.side_effect = get
+    db.collections = collections
+    return db
+
+
+def test_ensure_creates_every_declared_index(database):
+    database_collections = database.collections
+    oriyan_portfolio.ensure_indexes(database)
+
+    assert set(database_collections) == set(oriyan_portfolio.REQUIRED_INDEXES)
+    models = database_collections['contacts'].create_indexes.call_args[0][0]
+    assert list(models[0].document['key'].items()) == [('timestamp', -1), ('_id', -1)]
+    assert models[0].document['background'] is True
+
+
+def test_snapshot_collections_expire_with_their_retention(database):
+    ttl = {name: {model.document['name']: model.document.get('expireAfterSeconds') for model in models}
+           for name, models in oriyan_portfolio.REQUIRED_INDEXES.items()}
+
+    assert ttl['visitor_top']['updated_ttl'] == oriyan_portfolio.TOP_RETENTION_DAYS * 86400
+    assert ttl['visitor_recent']['updated'] == oriyan_portfolio.RECENT_VISITORS_STALE_AFTER
+    assert ttl['visitor_sketches']['updated_ttl'] >= oriyan_portfolio.HLL_RETENTION_DAYS * 86400
+
+
+def test_ensure_rebuilds_index_whose_ttl_changed(database):
+    # A plain index from before the TTL, and one whose retention was since changed
+    database['visitor_recent'].index_information.return_value = {'_id_': {}, 'updated': {'key': [('updated', 1)]}}
+    database['visitor_top'].index_information.return_value = {
+        'updated_ttl': {'expireAfterSeconds': oriyan_portfolio.TOP_RETENTION_DAYS * 86400}}
+    database['visitor_sketches'].index_information.return_value = {'updated_ttl': {'expireAfterSeconds': 1}}
+
+    oriyan_portfolio.ensure_indexes(database)
+
+    database['visitor_recent'].drop_index.assert_called_once_with('updated')
+    database['visitor_top'].drop_index.assert_not_called()
+    database['visitor_sketches'].drop_index.assert_called_once_with('updated_ttl')
+    database['visitors'].index_information.assert_not_called()
+
+
+def test_check_reports_missing_unused_and_undeclared(database):
+    visitors = database['visitors']
+    visitors.index_information.return_value = {'_id_': {}, 'ip_1': {}}
+    visitors.aggregate.return_value = [
+        {'name': '_id_', 'accesses': {'ops': 0}},
+        {'name': 'ip_1', 'accesses': {'ops': 0}},
+    ]
+    stats = database['stats']
+    stats.index_information.return_value = {'_id_': {}, 'counter_total': {}}
+    stats.aggregate.return_value = [{'name': 'counter_total', 'accesses': {'ops': 12}}]
+
+    report = oriyan_portfolio.check_indexes(database)
+
+    assert report['visitors'] == {'missing': ['timestamp_desc'], 'unused': ['ip_1'], 'undeclared': ['ip_1']}
+    assert report['stats'] == {'missing': [], 'unused': [], 'undeclared': []}
+    visitors.aggregate.assert_called_with([{'$indexStats': {}}])
+
+
+def test_cli_check_exits_nonzero_when_indexes_missing(database, mocker):
+    mocker.patch.object(oriyan_portfolio, 'db', database)
+    for name in oriyan_portfolio.REQUIRED_INDEXES:
+        database[name].index_information.return_value = {'_id_': {}}
+        database[name].aggregate.return_value = []
+
+    result = oriyan_portfolio.app.test_cli_runner().invoke(args=['indexes', 'check'])
+
+    assert result.exit_code == 1
+    assert "contacts: missing=['timestamp_id_desc']" in result.output
+
+
+def test_cli_ensure_requires_database(mocker):
+    mocker.patch.object(oriyan_portfolio, 'db', None)
+    connect = mocker.patch.object(oriyan_portfolio.mongo_connection, 'connect', return_value=False)
+    result = oriyan_portfolio.app.test_cli_runner().invoke(args=['indexes', 'ensure'])
+    connect.assert_called_once()
+    assert result.exit_code != 0
+    assert 'MongoDB not available' in result.output
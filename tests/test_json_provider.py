@@ -0,0 +1,54 @@
+"""Tests for the ObjectId/datetime aware JSON provider"""
+import json
+import pytest
+from datetime import datetime, timezone
+from bson import ObjectId
+
+import oriyan_portfolio
+from oriyan_portfolio import PortfolioJSONProvider, app
+
+DOC = {
+    '_id': ObjectId('507f1f77bcf86cd799439011'),
+    'timestamp': datetime(2024, 1, 1, 10, 0, 0, 123000, tzinfo=timezone.utc),
+    'naive': datetime(2024, 1, 1, 10, 0, 0),
+    'name': 'אוריין',
+}
+EXPECTED = {
+    '_id': '507f1f77bcf86cd799439011',
+    'timestamp': '2024-01-01T10:00:00.123000+00:00',
+    'naive': '2024-01-01T10:00:00',
+    'name': 'אוריין',
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def provider(request, mocker):
+    if request.param == 'stdlib':
+        mocker.patch.object(oriyan_portfolio, 'orjson', None)
+    elif oriyan_portfolio.orjson is None:
+        pytest.skip('orjson not installed')
+    return PortfolioJSONProvider(app)
+
+
+def test_dumps_encodes_bson_types(provider):
+    assert json.loads(provider.dumps(DOC)) == EXPECTED
+
+
+def test_response_encodes_documents_in_one_pass(provider):
+    with app.app_context():
+        response = provider.response({'visits': [DOC]})
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data()) == {'visits': [EXPECTED]}
+
+
+def test_loads_roundtrip(provider):
+    assert provider.loads(provider.dumps({'a': [1, 2]})) == {'a': [1, 2]}
+
+
+def test_unknown_types_still_fail(provider):
+    with pytest.raises(TypeError):
+        provider.dumps({'value': object()})
+
+
+def test_app_uses_provider():
+    assert isinstance(app.json, PortfolioJSONProvider)
@@ -0,0 +1,143 @@
+"""Tests for the background MongoDB connection"""
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+import oriyan_portfolio
+from oriyan_portfolio import MongoConnection
+
+
+@pytest.fixture
+def published(mocker):
+    """Undo whatever a test publishes into the module globals"""
+    for name in ('mongo_client', 'db', 'visitors_collection', 'stats_collection', 'rollups_collection',
+                 'sketches_collection', 'top_collection', 'recent_collection', 'contacts_collection'):
+        mocker.patch.object(oriyan_portfolio, name, None)
+    mocker.patch.object(oriyan_portfolio, 'recent_visitors')
+
+
+def test_connect_seeds_and_publishes(mocker, published):
+    client = MagicMock()
+    client.get_default_database.return_value.stats.count_documents.return_value = 0
+    mocker.patch.object(oriyan_portfolio, 'MongoClient', return_value=client)
+    mocker.patch.object(oriyan_portfolio, 'ENSURE_INDEXES_ON_STARTUP', False)
+    connection = MongoConnection('mongodb://example/portfolio')
+
+    assert connection.connect() is True
+
+    database = client.get_default_database.return_value
+    assert connection.ready.is_set()
+    assert oriyan_portfolio.db is database
+    # Published collections go through the shared circuit breaker
+    assert isinstance(oriyan_portfolio.contacts_collection, oriyan_portfolio.GuardedCollection)
+    oriyan_portfolio.contacts_collection.insert_one({'name': 'x'})
+    database.contacts.insert_one.assert_called_once_with({'name': 'x'})
+    assert database.stats.insert_one.call_args[0][0]['_id'] == 'visitors:base'
+    oriyan_portfolio.recent_visitors.warm.assert_called_once()
+
+
+def test_failed_attempt_publishes_nothing_and_retries(mocker, published):
+    client = MagicMock()
+    client.get_default_database.return_value.stats.count_documents.side_effect = [Exception('timeout'), 3]
+    mocker.patch.object(oriyan_portfolio, 'MongoClient', return_value=client)
+    mocker.patch.object(oriyan_portfolio, 'ENSURE_INDEXES_ON_STARTUP', False)
+    connection = MongoConnection('mongodb://example/portfolio')
+
+    assert connection.connect() is False
+    assert not connection.ready.is_set()
+    assert oriyan_portfolio.visitors_collection is None
+    assert str(connection.last_error) == 'timeout'
+
+    assert connection.connect() is True
+    assert oriyan_portfolio.visitors_collection is not None
+    # The client is built once and reused across attempts
+    assert oriyan_portfolio.MongoClient.call_count == 1
+
+
+def test_background_thread_connects(mocker, published):
+    mocker.patch.object(oriyan_portfolio, 'MongoClient', return_value=MagicMock())
+    mocker.patch.object(oriyan_portfolio, 'ENSURE_INDEXES_ON_STARTUP', False)
+    connection = MongoConnection('mongodb://example/portfolio', retry_interval=0.01)
+
+    connection.start()
+
+    assert connection.ready.wait(5)
+
+
+
+def test_client_options_from_environment(mocker):
+    mocker.patch.object(oriyan_portfolio, 'MONGO_MAX_POOL_SIZE', 8)
+    mocker.patch.object(oriyan_portfolio, 'MONGO_COMPRESSORS', 'zstd, zlib')
+
+    options = oriyan_portfolio.mongo_client_options()
+
+    assert options['maxPoolSize'] == 8
+    assert options['compressors'] == ['zstd', 'zlib']
+    assert {'minPoolSize', 'maxIdleTimeMS', 'waitQueueTimeoutMS', 'serverSelectionTimeoutMS'} <= set(options)
+
+
+def test_no_compressors_by_default(mocker):
+    mocker.patch.object(oriyan_portfolio, 'MONGO_COMPRESSORS', '')
+    assert 'compressors' not in oriyan_portfolio.mongo_client_options()
+
+
+def test_pool_is_warmed_before_ready(mocker, published):
+    client = MagicMock()
+    database = client.get_default_database.return_value
+    ready_during_ping = []
+    database.command.side_effect = lambda name: ready_during_ping.append(connection.ready.is_set())
+    mocker.patch.object(oriyan_portfolio, 'MongoClient', return_value=client)
+    mocker.patch.object(oriyan_portfolio, 'ENSURE_INDEXES_ON_STARTUP', False)
+    mocker.patch.object(oriyan_portfolio, 'MONGO_WARM_CONNECTIONS', 3)
+    connection = MongoConnection('mongodb://example/portfolio')
+
+    assert connection.connect() is True
+
+    assert ready_during_ping == [False, False, False]
+
+
+def test_reset_after_fork_drops_parent_client(mocker, published):
+    mocker.patch.object(oriyan_portfolio, 'MongoClient', return_value=MagicMock())
+    mocker.patch.object(oriyan_portfolio, 'ENSURE_INDEXES_ON_STARTUP', False)
+    connection = MongoConnection('mongodb://example/portfolio')
+    connection.connect()
+    start = mocker.patch.object(connection, 'start')
+
+    connection.reset_after_fork()
+
+    assert connection.client is None
+    assert not connection.ready.is_set()
+    assert oriyan_portfolio.db is None
+    assert oriyan_portfolio.visitors_collection is None
+    start.assert_called_once()
+
+
+def test_reset_after_fork_replaces_locks_held_by_parent(mocker, published):
+    connection = MongoConnection('mongodb://example/portfolio')
+    mocker.patch.object(connection, 'start')
+    mocker.patch.object(oriyan_portfolio, 'pool_monitor', oriyan_portfolio.PoolMonitor())
+    mocker.patch.object(oriyan_portfolio, 'mongo_breaker', oriyan_portfolio.CircuitBreaker('test'))
+    # Held by a parent thread that does not exist in the child
+    oriyan_portfolio.pool_monitor._lock.acquire()
+    oriyan_portfolio.mongo_breaker._lock.acquire()
+
+    connection.reset_after_fork()
+
+    assert oriyan_portfolio.pool_monitor.snapshot()['checked_out'] == 0
+    assert oriyan_portfolio.mongo_breaker.call(lambda: 'ok') == 'ok'
+
+
+def test_preloading_master_does_not_connect(tmp_path):
+    # A log left behind by an earlier worker is replayed once a worker connects
+    (tmp_path / 'pod-1234').mkdir()
+    env = dict(os.environ, MONGO_CONNECT_ON_IMPORT='false', MONGO_URI='mongodb://127.0.0.1:1/portfolio',
+               EVENT_LOG_DIR=str(tmp_path))
+    code = 'import threading, oriyan_portfolio; print(sorted(t.name for t in threading.enumerate()))'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    result = subprocess.run([sys.executable, '-c', code], cwd=root, env=env, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "['MainThread']"
@@ -8,6 +8,7 @@ import pytest
 import json
 import sys
 import os
+from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 
 # Add parent directory to path
@@ -37,36 +38,44 @@ class TestMongoDBFunctionality:
         # Mock request context
         with client.application.test_request_context('/', environ_base={'REMOTE_ADDR': '127.0.0.1', 'HTTP_USER_AGENT': 'TestAgent'}):
             result = oriyan_portfolio.track_visitor()
+            oriyan_portfolio.visitor_writer.flush()
             
             assert result == True
-            mock_visitors_collection.insert_one.assert_called_once()
+            mock_visitors_collection.insert_many.assert_called_once()
             mock_stats_collection.update_one.assert_called_once()
 
     def test_track_visitor_none_collection(self, client, mocker):
         """Test visitor tracking when collections are None"""
         mocker.patch.object(oriyan_portfolio, 'visitors_collection', None)
         mocker.patch.object(oriyan_portfolio, 'stats_collection', None)
+        mock_log = mocker.patch.object(oriyan_portfolio, 'event_log')
         
         with client.application.test_request_context('/'):
             result = oriyan_portfolio.track_visitor()
-            assert result == False
+            # The visit is kept in the local event log until MongoDB is back
+            assert result == True
+            kind, docs = mock_log.append.call_args[0]
+            assert kind == 'visitor'
+            assert docs[0]['page'] == '/'
 
     def test_track_visitor_exception(self, client, mocker):
         """Test visitor tracking with database exception"""
         mock_collection = MagicMock()
-        mock_collection.insert_one.side_effect = Exception("DB Error")
+        mock_collection.insert_many.side_effect = Exception("DB Error")
         
         mocker.patch.object(oriyan_portfolio, 'visitors_collection', mock_collection)
         mocker.patch.object(oriyan_portfolio, 'stats_collection', mock_collection)
         
         with client.application.test_request_context('/'):
-            result = oriyan_portfolio.track_visitor()
-            assert result == False
+            # Queuing never touches MongoDB, the failure shows up on flush
+            assert oriyan_portfolio.track_visitor() == True
+            assert oriyan_portfolio.visitor_writer.flush() == 0
+            mock_collection.update_one.assert_not_called()
 
     def test_get_visitor_count_success(self, mocker):
         """Test successful visitor count retrieval"""
         mock_collection = MagicMock()
-        mock_collection.find_one.return_value = {'total_visitors': 150}
+        mock_collection.find.return_value = [{'total_visitors': 100}, {'total_visitors': 50}]
         
         mocker.patch.object(oriyan_portfolio, 'stats_collection', mock_collection)
         
@@ -76,7 +85,7 @@ class TestMongoDBFunctionality:
     def test_get_visitor_count_no_stats(self, mocker):
         """Test visitor count when no stats exist"""
         mock_collection = MagicMock()
-        mock_collection.find_one.return_value = None
+        mock_collection.find.return_value = []
         
         mocker.patch.object(oriyan_portfolio, 'stats_collection', mock_collection)
         
@@ -93,7 +102,7 @@ class TestMongoDBFunctionality:
     def test_get_visitor_count_exception(self, mocker):
         """Test visitor count with exception"""
         mock_collection = MagicMock()
-        mock_collection.find_one.side_effect = Exception("DB Error")
+        mock_collection.find.side_effect = Exception("DB Error")
         
         mocker.patch.object(oriyan_portfolio, 'stats_collection', mock_collection)
         
@@ -118,28 +127,37 @@ class TestAdvancedAPIEndpoints:
         
         # Mock data
         mock_visitors_collection.find.return_value.sort.return_value.limit.return_value = [
-            {'_id': 'test_id', 'timestamp': '2024-01-01T10:00:00', 'ip': '127.0.0.1'}
+            {'_id': 'test_id', 'timestamp': datetime(2024, 1, 1, 10, 0, 0), 'ip': '127.0.0.1'}
         ]
         
         mocker.patch.object(oriyan_portfolio, 'visitors_collection', mock_visitors_collection)
         mocker.patch.object(oriyan_portfolio, 'stats_collection', mock_stats_collection)
         mocker.patch.object(oriyan_portfolio, 'get_visitor_count', return_value=100)
+        recent = oriyan_portfolio.RecentVisitors(size=10)
+        recent.warm()
+        mocker.patch.object(oriyan_portfolio, 'recent_visitors', recent)
         
         response = client.get('/api/visitors')
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data['total_visitors'] == 100
-        assert 'recent_visitors' in data
+        assert data['recent_visitors'][0]['_id'] == 'test_id'
+        
+        # Serving the feed again does not query MongoDB
+        client.get('/api/visitors')
+        assert mock_visitors_collection.find.call_count == 1
 
     def test_visitors_api_get_exception(self, client, mocker):
         """Test visitors API GET with exception"""
         mock_collection = MagicMock()
         mock_collection.find.side_effect = Exception("DB Error")
         
-        mocker.patch.object(oriyan_portfolio, 'visitors_collection', mock_collection)
+        mocker.patch.object(oriyan_portfolio, 'recent_collection', mock_collection)
+        mocker.patch.object(oriyan_portfolio, 'recent_visitors', oriyan_portfolio.RecentVisitors(size=10))
         mocker.patch.object(oriyan_portfolio, 'get_visitor_count', return_value=42)
         
-        response = client.get('/api/visitors')
+        # A failing merged read falls back to the local buffer
+        response = client.get('/api/visitors?consistency=merged')
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data['total_visitors'] == 42
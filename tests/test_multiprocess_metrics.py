@@ -0,0 +1,94 @@
+"""Tests for /metrics aggregation across gunicorn workers (PROMETHEUS_MULTIPROC_DIR)"""
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+
+import oriyan_portfolio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 3
+REQUESTS = 60
+
+pytest.importorskip('gunicorn')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get(port, path):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+        return response.read().decode()
+
+
+def sample(text, name, labels):
+    for family in text_string_to_metric_families(text):
+        for s in family.samples:
+            if s.name == name and all(s.labels.get(k) == v for k, v in labels.items()):
+                return s.value
+    return None
+
+
+@pytest.fixture
+def server(tmp_path):
+    port = free_port()
+    metrics_dir = tmp_path / 'metrics'
+    metrics_dir.mkdir()
+    # A sample left over from a previous run must not leak into the totals
+    (metrics_dir / 'counter_1.db').write_bytes(b'stale')
+    env = dict(os.environ,
+               PROMETHEUS_MULTIPROC_DIR=str(metrics_dir),
+               GUNICORN_WORKERS=str(WORKERS),
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               EVENT_LOG_DIR=str(tmp_path / 'events'),
+               MONGO_URI='mongodb://127.0.0.1:1/oriyan_portfolio',
+               MONGO_SERVER_SELECTION_TIMEOUT_MS='100')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'oriyan_portfolio:app'],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    try:
+        while True:
+            try:
+                get(port, '/livez')
+                break
+            except OSError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    pytest.fail('gunicorn did not start')
+                time.sleep(0.1)
+        yield port, metrics_dir
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def test_metrics_totals_span_all_workers(server):
+    port, metrics_dir = server
+    # Separate connections, several at a time, so the workers share the load
+    with ThreadPoolExecutor(max_workers=WORKERS * 2) as pool:
+        list(pool.map(lambda _: get(port, '/api/skills'), range(REQUESTS)))
+
+    labels = {'method': 'GET', 'endpoint': '/api/skills', 'http_status': '200'}
+    # Whichever worker answers the scrape reports the same aggregated total
+    for _ in range(WORKERS * 2):
+        assert sample(get(port, '/metrics'), 'portfolio_requests_total', labels) == REQUESTS
+
+    assert not (metrics_dir / 'counter_1.db').exists()
+
+
+def test_scrape_skips_metric_file_being_created(tmp_path):
+    # Created by a worker that has not sized it yet
+    (tmp_path / 'counter_999.db').write_bytes(b'')
+    registry = CollectorRegistry()
+    oriyan_portfolio.WorkerMetricsCollector(registry, path=str(tmp_path))
+
+    assert generate_latest(registry) == b''
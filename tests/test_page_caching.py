@@ -0,0 +1,51 @@
+"""Tests for the precompressed, cacheable HTML pages"""
+import gzip
+import pytest
+from email.utils import format_datetime
+
+import oriyan_portfolio
+
+
+@pytest.fixture(autouse=True)
+def no_tracking(mocker):
+    return mocker.patch.object(oriyan_portfolio, 'track_visitor', return_value=True)
+
+
+@pytest.mark.parametrize('path', ['/', '/contact'])
+def test_pages_carry_validators(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/html'
+    assert response.headers['ETag']
+    assert response.headers['Last-Modified']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+
+@pytest.mark.parametrize('path', ['/', '/contact'])
+def test_pages_are_precompressed(client, path):
+    plain = client.get(path)
+    compressed = client.get(path, headers={'Accept-Encoding': 'gzip'})
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert len(compressed.data) < len(plain.data) / 2
+    assert gzip.decompress(compressed.data) == plain.data
+
+
+def test_if_none_match_skips_body_but_still_tracks(client, no_tracking):
+    etag = client.get('/').headers['ETag']
+    response = client.get('/', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert no_tracking.call_count == 2
+
+
+def test_if_modified_since(client):
+    last_modified = oriyan_portfolio.PAGE_LAST_MODIFIED
+    response = client.get('/contact', headers={'If-Modified-Since': format_datetime(last_modified, usegmt=True)})
+    assert response.status_code == 304
+
+
+def test_home_page_bytes_prebuilt():
+    body, _ = oriyan_portfolio.HOME_RESPONSE.variants['identity']
+    assert body == oriyan_portfolio.HOME_PAGE_HTML.encode('utf-8')
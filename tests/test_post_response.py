@@ -0,0 +1,77 @@
+"""Tests for work deferred until after the response is sent"""
+from unittest.mock import MagicMock
+
+import oriyan_portfolio
+
+
+def _task_count(task, outcome):
+    return oriyan_portfolio.metrics_registry.get_sample_value(
+        'portfolio_post_response_tasks_total', {'task': task, 'outcome': outcome}) or 0
+
+
+def test_home_records_visit_after_close(client, mocker):
+    record = mocker.patch.object(oriyan_portfolio, 'record_visitor', autospec=True, return_value=True)
+
+    response = client.get('/')
+    assert response.status_code == 200
+    record.assert_not_called()
+
+    response.close()
+    record.assert_called_once()
+    assert record.call_args[0][0]['page'] == '/'
+
+
+def test_contact_stored_before_response_and_logged_after_close(client, mocker):
+    contacts = MagicMock()
+    mocker.patch.object(oriyan_portfolio, 'contacts_collection', contacts)
+    log = mocker.patch.object(oriyan_portfolio, 'log_contact', autospec=True)
+
+    response = client.post('/api/contact', json={
+        'name': 'Test User', 'email': 'test@example.com', 'message': 'hi'})
+    assert response.status_code == 201
+    stored = contacts.insert_one.call_args[0][0]
+    assert response.get_json()['contact_id'] == str(stored['_id'])
+    log.assert_not_called()
+
+    response.close()
+    log.assert_called_once_with(stored, 'stored')
+
+
+def test_contact_that_cannot_be_kept_is_refused(client, mocker):
+    mocker.patch.object(oriyan_portfolio, 'contacts_collection', None)
+    mocker.patch.object(oriyan_portfolio, 'spool_events', return_value=False)
+
+    response = client.post('/api/contact', json={
+        'name': 'Test User', 'email': 'test@example.com', 'message': 'hi'})
+
+    assert response.status_code == 503
+    assert response.get_json() == {'error': 'Failed to submit contact form'}
+
+
+def test_failures_are_counted_and_do_not_stop_other_tasks():
+    calls = []
+
+    def broken():
+        raise RuntimeError('boom')
+
+    def refused():
+        return False
+
+    def fine():
+        calls.append('fine')
+
+    before = (_task_count('broken', 'error'), _task_count('refused', 'error'), _task_count('fine', 'ok'))
+    oriyan_portfolio.run_post_response([(broken, ()), (refused, ()), (fine, ())])
+
+    assert calls == ['fine']
+    assert _task_count('broken', 'error') == before[0] + 1
+    assert _task_count('refused', 'error') == before[1] + 1
+    assert _task_count('fine', 'ok') == before[2] + 1
+
+
+def test_responses_without_deferred_work_are_untouched(client, mocker):
+    run = mocker.patch.object(oriyan_portfolio, 'run_post_response')
+
+    client.get('/health').close()
+
+    run.assert_not_called()
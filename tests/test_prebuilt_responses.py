@@ -0,0 +1,58 @@
+"""Tests for pre-serialized, ETag-versioned static API responses"""
+import gzip
+import json
+import pytest
+
+import oriyan_portfolio
+
+
+@pytest.mark.parametrize('path', ['/health', '/api/skills', '/api/projects'])
+def test_conditional_get_returns_304(client, path):
+    first = client.get(path)
+    etag = first.headers['ETag']
+    assert etag.startswith('"') and not etag.startswith('W/')
+
+    second = client.get(path, headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == etag
+
+
+def test_body_is_built_once(client, mocker):
+    spy = mocker.spy(oriyan_portfolio.app.json, 'dumps')
+    client.get('/api/skills')
+    client.get('/api/skills')
+    spy.assert_not_called()
+
+
+def test_gzip_variant_negotiated(client):
+    plain = client.get('/api/skills')
+    compressed = client.get('/api/skills', headers={'Accept-Encoding': 'gzip'})
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+    # Any representation's validator is enough to revalidate
+    revalidated = client.get('/api/skills', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_brotli_preferred_when_available(client):
+    if oriyan_portfolio.brotli is None:
+        pytest.skip('brotli not installed')
+    response = client.get('/api/skills', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(oriyan_portfolio.brotli.decompress(response.data))['devops_tools'][0] == 'Docker'
+
+
+def test_cache_control_headers(client):
+    assert client.get('/health').headers['Cache-Control'] == 'no-cache'
+    assert client.get('/api/projects').headers['Cache-Control'] == \
+        f'public, max-age={oriyan_portfolio.STATIC_API_MAX_AGE}'
+
+
+def test_variants_only_kept_when_smaller():
+    prebuilt = oriyan_portfolio.PrebuiltResponse(b'{}', 'application/json', 'no-cache')
+    assert list(prebuilt.variants) == ['identity']
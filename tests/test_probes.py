@@ -0,0 +1,105 @@
+"""Tests for the liveness and readiness probes"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+import oriyan_portfolio
+from oriyan_portfolio import MongoHealth, PoolMonitor
+
+
+@pytest.fixture
+def connected(mocker):
+    mocker.patch.object(oriyan_portfolio, 'mongo_client', MagicMock())
+    mocker.patch.object(oriyan_portfolio.mongo_connection, 'ready', MagicMock(is_set=lambda: True))
+    mocker.patch.object(oriyan_portfolio, 'pool_monitor', PoolMonitor())
+    mocker.patch.object(oriyan_portfolio.mongo_breaker, 'state', oriyan_portfolio.CircuitBreaker.CLOSED)
+    health = MongoHealth()
+    mocker.patch.object(oriyan_portfolio, 'mongo_health', health)
+    mocker.patch.object(health, 'ensure_started')
+    return health
+
+
+def test_livez_never_touches_mongo(client, mocker):
+    mocker.patch.object(oriyan_portfolio, 'mongo_client', None)
+    response = client.get('/livez')
+
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'alive'}
+
+
+def test_ready_after_successful_ping(client, connected):
+    assert connected.check() is True
+
+    response = client.get('/readyz')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['status'] == 'ready'
+    assert data['ping']['ok'] is True
+    assert data['circuit'] == 'closed'
+    assert response.headers['Cache-Control'] == 'no-store'
+
+
+def test_not_ready_when_ping_fails(client, connected):
+    oriyan_portfolio.mongo_client.admin.command.side_effect = ServerSelectionTimeoutError('no servers')
+    connected.check()
+
+    response = client.get('/readyz')
+
+    assert response.status_code == 503
+    assert response.get_json()['reasons'] == ['ping failed: no servers']
+
+
+def test_not_ready_before_first_ping(client, connected):
+    response = client.get('/readyz')
+
+    assert response.status_code == 503
+    connected.ensure_started.assert_called_once()
+
+
+def test_readyz_does_not_ping(client, connected):
+    connected.check()
+    command = oriyan_portfolio.mongo_client.admin.command
+    for _ in range(5):
+        client.get('/readyz')
+
+    assert command.call_count == 1
+
+
+def test_stale_ping_is_not_ready(client, connected, mocker):
+    connected.check()
+    mocker.patch.object(oriyan_portfolio, 'MONGO_PING_STALE_AFTER', -1)
+
+    assert client.get('/readyz').get_json()['reasons'] == ['ping result is stale']
+
+
+def test_not_ready_while_pool_cleared(client, connected):
+    connected.check()
+    address = ('mongodb-service', 27017)
+    oriyan_portfolio.pool_monitor.pool_cleared(SimpleNamespace(address=address))
+
+    data = client.get('/readyz').get_json()
+    assert data['reasons'] == ['connection pool cleared']
+    assert data['pool']['cleared'] == ['mongodb-service:27017']
+
+    oriyan_portfolio.pool_monitor.pool_ready(SimpleNamespace(address=address))
+    assert client.get('/readyz').status_code == 200
+
+
+def test_pool_monitor_counts_checkouts():
+    monitor = PoolMonitor()
+    event = SimpleNamespace(address=('db', 27017))
+    monitor.connection_checked_out(event)
+    monitor.connection_checked_out(event)
+    monitor.connection_checked_in(event)
+    monitor.connection_check_out_failed(event)
+
+    snapshot = monitor.snapshot()
+    assert snapshot['checked_out'] == 1
+    assert snapshot['checkout_failures'] == 1
+
+
+def test_client_options_register_pool_monitor():
+    assert oriyan_portfolio.pool_monitor in oriyan_portfolio.mongo_client_options()['event_listeners']
@@ -0,0 +1,47 @@
+"""Tests for the per-worker USS/PSS memory gauges"""
+import oriyan_portfolio
+
+SMAPS_ROLLUP = """\
+558121467000-7ffd9abb0000 ---p 00000000 00:00 0                          [rollup]
+Rss:                1408 kB
+Pss:                 483 kB
+Shared_Clean:       1268 kB
+Shared_Dirty:          0 kB
+Private_Clean:        40 kB
+Private_Dirty:       100 kB
+"""
+
+
+def test_process_memory_parses_smaps_rollup(tmp_path):
+    path = tmp_path / 'smaps_rollup'
+    path.write_text(SMAPS_ROLLUP)
+
+    assert oriyan_portfolio.process_memory(str(path)) == {
+        'rss': 1408 * 1024,
+        'pss': 483 * 1024,
+        'uss': 140 * 1024,
+        'shared': 1268 * 1024,
+    }
+
+
+def test_process_memory_without_proc(tmp_path):
+    assert oriyan_portfolio.process_memory(str(tmp_path / 'missing')) == {}
+
+
+def test_metrics_report_process_memory(client, mocker):
+    mocker.patch.object(oriyan_portfolio, 'process_memory', return_value={'uss': 4096, 'pss': 8192})
+
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert 'portfolio_process_memory_bytes{kind="uss"} 4096.0' in body
+    assert 'portfolio_process_memory_bytes{kind="pss"} 8192.0' in body
+
+
+def test_workers_sample_memory_between_scrapes(client, mocker):
+    mocker.patch.object(oriyan_portfolio, 'process_memory', return_value={'uss': 2048})
+    mocker.patch.object(oriyan_portfolio.process_memory_sampler, 'interval', 0)
+
+    client.get('/api/skills')
+
+    assert oriyan_portfolio.metrics_registry.get_sample_value(
+        'portfolio_process_memory_bytes', {'kind': 'uss'}) == 2048
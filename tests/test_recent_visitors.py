@@ -0,0 +1,94 @@
+"""Tests for the in-memory recent visitors ring buffer"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from bson import ObjectId
+
+import oriyan_portfolio
+from oriyan_portfolio import RecentVisitors
+
+
+def _visit(seconds_ago, page='/'):
+    return {
+        '_id': ObjectId(),
+        'ip': '127.0.0.1',
+        'user_agent': 'TestAgent',
+        'page': page,
+        'timestamp': datetime.now(timezone.utc) - timedelta(seconds=seconds_ago),
+    }
+
+
+def test_buffer_is_bounded_and_newest_first():
+    buffer = RecentVisitors(size=3)
+    visits = [_visit(10 - i) for i in range(5)]
+    for visit in visits:
+        buffer.add(visit)
+
+    assert buffer.latest() == visits[::-1][:3]
+
+
+def test_track_visitor_fills_buffer(client, mocker):
+    buffer = RecentVisitors(size=5)
+    mocker.patch.object(oriyan_portfolio, 'recent_visitors', buffer)
+    mocker.patch.object(oriyan_portfolio, 'visitors_collection', MagicMock())
+    mocker.patch.object(oriyan_portfolio, 'visitor_writer')
+
+    client.post('/api/visitors')
+    data = client.get('/api/visitors').get_json()
+
+    assert data['consistency'] == 'local'
+    assert len(data['recent_visitors']) == 1
+    assert data['recent_visitors'][0]['page'] == '/api/visitors'
+
+
+def test_merged_feed_combines_published_buffers(client, mocker):
+    buffer = RecentVisitors(size=3)
+    mine = _visit(5)
+    buffer.add(mine)
+    other = [_visit(1, '/contact'), _visit(30)]
+    recent = MagicMock()
+    recent.find.return_value = [
+        {'_id': 'other-pod:7', 'visits': [dict(v, timestamp=v['timestamp'].replace(tzinfo=None)) for v in other]},
+    ]
+    mocker.patch.object(oriyan_portfolio, 'recent_visitors', buffer)
+    mocker.patch.object(oriyan_portfolio, 'recent_collection', recent)
+
+    data = client.get('/api/visitors?consistency=merged').get_json()
+
+    assert [v['_id'] for v in data['recent_visitors']] == [str(other[0]['_id']), str(mine['_id']), str(other[1]['_id'])]
+    # Naive timestamps read back from MongoDB are served like local ones
+    assert all(v['timestamp'].endswith('+00:00') for v in data['recent_visitors'])
+
+
+def test_warm_normalizes_stored_timestamps(mocker):
+    buffer = RecentVisitors(size=3)
+    mine = _visit(5)
+    buffer.add(mine)
+    stored = _visit(10)
+    visitors = MagicMock()
+    visitors.find.return_value.sort.return_value.limit.return_value = [
+        dict(stored, timestamp=stored['timestamp'].replace(tzinfo=None))
+    ]
+    mocker.patch.object(oriyan_portfolio, 'visitors_collection', visitors)
+
+    buffer.warm()
+
+    assert [v['_id'] for v in buffer.latest()] == [mine['_id'], stored['_id']]
+    assert [v['timestamp'] for v in buffer.latest()] == [mine['timestamp'], stored['timestamp']]
+
+
+def test_publish_writes_only_when_changed(mocker):
+    recent = MagicMock()
+    mocker.patch.object(oriyan_portfolio, 'recent_collection', recent)
+    buffer = RecentVisitors(size=3)
+
+    buffer.publish()
+    recent.update_one.assert_not_called()
+    buffer.add(_visit(0))
+    buffer.publish()
+    buffer.publish()
+    assert recent.update_one.call_count == 1
+    assert recent.update_one.call_args[0][0] == {'_id': buffer.worker_id()}
+
+
+def test_invalid_consistency_rejected(client):
+    assert client.get('/api/visitors?consistency=strong').status_code == 400
@@ -0,0 +1,76 @@
+"""Tests for route-template labels and size histograms on the request metrics"""
+import oriyan_portfolio
+
+
+def _sample(name, labels):
+    return oriyan_portfolio.metrics_registry.get_sample_value(name, labels) or 0
+
+
+def _requests(method, endpoint, status):
+    return _sample('portfolio_requests_total', {'method': method, 'endpoint': endpoint, 'http_status': str(status)})
+
+
+def _series_with(value):
+    return [sample for metric in oriyan_portfolio.metrics_registry.collect()
+            for sample in metric.samples if value in sample.labels.values()]
+
+
+def test_unmatched_paths_share_one_series(client):
+    before = _requests('GET', 'other', 404)
+
+    for i in range(5):
+        assert client.get(f'/wp-admin/probe-{i}.php').status_code == 404
+
+    assert _requests('GET', 'other', 404) == before + 5
+    assert not _series_with('/wp-admin/probe-0.php')
+
+
+def test_label_is_route_template(client):
+    path = oriyan_portfolio.asset_url('css/home.css')
+    before = _requests('GET', '/assets/<path:filename>', 200)
+
+    assert client.get(path).status_code == 200
+
+    assert _requests('GET', '/assets/<path:filename>', 200) == before + 1
+    assert not _series_with(path)
+
+
+def test_unknown_methods_are_bucketed(client):
+    before = _requests('other', 'other', 405)
+
+    client.open('/', method='PROPFIND')
+
+    assert _requests('other', 'other', 405) == before + 1
+
+
+def test_allow_list_limits_endpoints(client, mocker):
+    mocker.patch.object(oriyan_portfolio, 'METRICS_ENDPOINTS', frozenset({'/health'}))
+    health = _requests('GET', '/health', 200)
+    other = _requests('GET', 'other', 200)
+
+    client.get('/health')
+    client.get('/api/skills')
+
+    assert _requests('GET', '/health', 200) == health + 1
+    assert _requests('GET', 'other', 200) == other + 1
+
+
+def test_size_histograms(client, mocker):
+    mocker.patch.object(oriyan_portfolio, 'store_contact')
+    response_count = _sample('portfolio_response_size_bytes_count', {'endpoint': '/api/skills'})
+    request_sum = _sample('portfolio_request_size_bytes_sum', {'endpoint': '/api/contact'})
+
+    body = client.get('/api/skills', headers={'Accept-Encoding': 'identity'}).data
+    client.post('/api/contact', data=b'{"name": "a", "email": "a@b.c", "message": "hi"}',
+                content_type='application/json')
+
+    assert _sample('portfolio_response_size_bytes_count', {'endpoint': '/api/skills'}) == response_count + 1
+    assert _sample('portfolio_response_size_bytes_sum', {'endpoint': '/api/skills'}) >= len(body)
+    assert _sample('portfolio_request_size_bytes_sum', {'endpoint': '/api/contact'}) == request_sum + 48
+
+
+def test_latency_buckets_resolve_sub_millisecond(client):
+    client.get('/health')
+
+    labels = {'endpoint': '/health', 'le': '0.00025'}
+    assert oriyan_portfolio.metrics_registry.get_sample_value('portfolio_request_latency_seconds_bucket', labels) is not None
@@ -0,0 +1,78 @@
+"""Tests for HyperLogLog unique visitor estimates"""
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import oriyan_portfolio
+from oriyan_portfolio import HyperLogLog, UniqueVisitorTracker
+
+
+def _sketch(values):
+    sketch = HyperLogLog(12)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_estimate_is_within_error_bounds():
+    for n in (10, 1000, 20000):
+        estimate = _sketch(f"10.0.{i}|agent" for i in range(n)).estimate()
+        assert abs(estimate - n) <= max(1, n * 0.05)
+
+
+def test_duplicates_do_not_inflate_estimate():
+    assert _sketch(['1.2.3.4|curl'] * 500).estimate() == 1
+
+
+def test_merge_is_union_and_sketch_size_is_fixed():
+    a = _sketch(f"a{i}" for i in range(3000))
+    b = _sketch(f"a{i}" for i in range(1500, 4500))
+    merged = HyperLogLog(12, a.to_bytes()).merge(b)
+
+    assert len(merged.to_bytes()) == 4096
+    assert abs(merged.estimate() - 4500) <= 4500 * 0.05
+
+
+def test_tracker_flushes_one_document_per_worker_and_key(mocker):
+    sketches = MagicMock()
+    mocker.patch.object(oriyan_portfolio, 'sketches_collection', sketches)
+    tracker = UniqueVisitorTracker(p=12)
+    at = datetime.now(timezone.utc)
+    tracker.add_events([
+        {'ip': '1.1.1.1', 'user_agent': 'a', 'page': '/', 'timestamp': at},
+        {'ip': '2.2.2.2', 'user_agent': 'a', 'page': '/', 'timestamp': at},
+    ])
+
+    assert tracker.flush() == 2
+    ops = sketches.bulk_write.call_args[0][0]
+    keys = sorted(op._doc['$set']['key'] for op in ops)
+    day = at.date().isoformat()
+    assert keys == [f"day:{day}:*", f"day:{day}:/"]
+    assert all(op._filter['_id'].endswith(f":{oriyan_portfolio.os.getpid()}") for op in ops)
+    # Nothing new since the last flush
+    assert tracker.flush() == 0
+
+
+def test_unique_endpoint_merges_worker_sketches(client, mocker):
+    sketches = MagicMock()
+    sketches.find.return_value = [
+        {'p': 12, 'registers': _sketch(f"x{i}" for i in range(100)).to_bytes()},
+        {'p': 12, 'registers': _sketch(f"x{i}" for i in range(50, 200)).to_bytes()},
+    ]
+    mocker.patch.object(oriyan_portfolio, 'sketches_collection', sketches)
+
+    response = client.get('/api/visitors/unique?day=2024-05-06&page=/')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert abs(data['unique_visitors'] - 200) <= 10
+    assert sketches.find.call_args[0][0] == {'key': 'day:2024-05-06:/'}
+
+
+def test_unique_endpoint_rejects_bad_day(client):
+    assert client.get('/api/visitors/unique?day=today').status_code == 400
+
+
+def test_stats_reports_unique_visitors_today(client, mocker):
+    mocker.patch.object(oriyan_portfolio, 'get_unique_visitors_today', return_value=17)
+    data = client.get('/api/stats').get_json()
+    assert data['unique_visitors_today'] == 17
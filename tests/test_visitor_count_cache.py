@@ -0,0 +1,76 @@
+"""Tests for the stale-while-revalidate visitor count cache"""
+import threading
+import time
+
+import oriyan_portfolio
+from oriyan_portfolio import CachedValue
+
+
+def _cache_metric(name, result):
+    return oriyan_portfolio.metrics_registry.get_sample_value(
+        'portfolio_cache_requests_total', {'cache': name, 'result': result}) or 0
+
+
+def test_hit_within_ttl_does_not_reload():
+    calls = []
+    cache = CachedValue('test_hit', lambda: calls.append(1) or len(calls), ttl=60)
+
+    assert cache.get() == 1
+    assert cache.get() == 1
+    assert len(calls) == 1
+    assert _cache_metric('test_hit', 'miss') == 1
+    assert _cache_metric('test_hit', 'hit') == 1
+
+
+def test_stale_value_served_while_single_refresh_runs():
+    release = threading.Event()
+    refreshed = threading.Event()
+    values = iter([1, 2])
+    loads = []
+
+    def loader():
+        loads.append(1)
+        value = next(values)
+        if value == 2:
+            release.wait(5)
+            refreshed.set()
+        return value
+
+    cache = CachedValue('test_stale', loader, ttl=0.01)
+    assert cache.get() == 1
+    time.sleep(0.02)
+
+    # Both lookups return immediately with the stale value
+    assert cache.get() == 1
+    assert cache.get() == 1
+    release.set()
+    assert refreshed.wait(5)
+    time.sleep(0.01)
+
+    assert len(loads) == 2
+    assert _cache_metric('test_stale', 'stale') == 2
+
+
+def test_failed_refresh_keeps_stale_value():
+    state = {'fail': False}
+
+    def loader():
+        if state['fail']:
+            raise RuntimeError('mongo down')
+        return 10
+
+    cache = CachedValue('test_fail', loader, ttl=0)
+    assert cache.get() == 10
+    state['fail'] = True
+    assert cache.get() == 10
+    deadline = time.time() + 5
+    while cache._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get() == 10
+    assert oriyan_portfolio.metrics_registry.get_sample_value(
+        'portfolio_cache_refresh_errors_total', {'cache': 'test_fail'}) >= 1
+
+
+def test_get_visitor_count_falls_back_when_first_load_fails(mocker):
+    mocker.patch.object(oriyan_portfolio, 'stats_collection', None)
+    assert oriyan_portfolio.get_visitor_count() == 42
@@ -0,0 +1,167 @@
+"""Tests for the sharded visitor counter"""
+import os
+import pytest
+from unittest.mock import MagicMock
+
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
+
+import oriyan_portfolio
+
+
+@pytest.fixture
+def stats(mocker):
+    collection = MagicMock()
+    mocker.patch.object(oriyan_portfolio, 'stats_collection', collection)
+    return collection
+
+
+def test_increment_targets_worker_shard(stats):
+    oriyan_portfolio.increment_visitor_counter(3)
+
+    shard_filter, update = stats.update_one.call_args[0]
+    prefix = f"visitors:{oriyan_portfolio.POD_NAME}:{os.getpid()}:"
+    assert shard_filter['_id'].startswith(prefix)
+    assert int(shard_filter['_id'][len(prefix):]) < oriyan_portfolio.VISITOR_COUNTER_STRIPES
+    assert update['$inc'] == {'total_visitors': 3}
+    assert update['$set']['counter'] == 'visitors'
+    assert stats.update_one.call_args[1] == {'upsert': True}
+
+
+def test_count_sums_shards_with_covered_projection(stats):
+    stats.find_one.return_value = {'fold_seq': 3}
+    stats.find.return_value = [{'total_visitors': 7}, {'total_visitors': 5}, {}]
+
+    assert oriyan_portfolio.get_visitor_count() == 12
+    query, projection = stats.find.call_args[0]
+    assert query == {'counter': 'visitors'}
+    assert projection == {'_id': 0, 'total_visitors': 1}
+    assert stats.find.call_count == 1
+
+
+def test_count_rereads_shards_when_a_fold_ran_during_the_scan(stats):
+    fold = {'_id': 'f1', 'shard': 'visitors:pod:1:0', 'value': 4}
+    stats.find_one.side_effect = [{'fold_seq': 3}, {'fold_seq': 4, 'folds': [fold]}]
+    stats.find.side_effect = [
+        # The base document was read before the fold, the shard after it
+        [{'total_visitors': 10}, {'total_visitors': 0}],
+        [{'_id': 'visitors:base', 'total_visitors': 14, 'folds': [fold]},
+         {'_id': fold['shard'], 'total_visitors': 4}],
+    ]
+
+    assert oriyan_portfolio._count_visitors() == 14
+    assert stats.find.call_args[0][1] == oriyan_portfolio.VISITOR_COUNTER_FOLD_PROJECTION
+
+
+def _fold_states():
+    """Counter documents after each write of folding a shard of 4 into a base of 10"""
+    fold = {'_id': 'f1', 'shard': 'visitors:pod:1:0', 'value': 4}
+    return [
+        [{'_id': 'visitors:base', 'total_visitors': 10}, {'_id': fold['shard'], 'total_visitors': 4}],
+        [{'_id': 'visitors:base', 'total_visitors': 14, 'folds': [fold]}, {'_id': fold['shard'], 'total_visitors': 4}],
+        [{'_id': 'visitors:base', 'total_visitors': 14, 'folds': [fold]},
+         {'_id': fold['shard'], 'total_visitors': 0, 'applied': ['f1']}],
+        [{'_id': 'visitors:base', 'total_visitors': 14}, {'_id': fold['shard'], 'total_visitors': 0, 'applied': ['f1']}],
+    ]
+
+
+def test_total_is_exact_while_a_fold_is_in_progress():
+    assert [oriyan_portfolio.visitor_counter_total(docs) for docs in _fold_states()] == [14, 14, 14, 14]
+
+
+def test_compaction_records_fold_before_moving_it(stats):
+    stats.find_one.return_value = {}
+    stats.find.return_value = [{'_id': 'visitors:pod:1:0', 'total_visitors': 4}]
+
+    assert oriyan_portfolio.compact_visitor_counter() == 1
+
+    (base_filter, record), (shard_filter, move), (_, pull) = [c[0] for c in stats.update_one.call_args_list]
+    fold = record['$push']['folds']
+    assert base_filter == {'_id': 'visitors:base', 'folds.shard': {'$ne': 'visitors:pod:1:0'}}
+    assert record['$inc'] == {'total_visitors': 4, 'fold_seq': 1}
+    assert fold['shard'] == 'visitors:pod:1:0' and fold['value'] == 4
+    assert shard_filter == {'_id': 'visitors:pod:1:0', 'applied': {'$ne': fold['_id']}}
+    assert move['$inc'] == {'total_visitors': -4}
+    assert move['$push']['applied']['$each'] == [fold['_id']]
+    assert pull == {'$pull': {'folds': {'_id': fold['_id']}}}
+    stats.delete_one.assert_not_called()
+
+
+class FakeStats:
+    """Just enough of update_one for the fold and shard writes"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def update_one(self, query, update, upsert=False):
+        doc = self.docs[query['_id']]
+        for field, condition in query.items():
+            if field != '_id' and condition['$ne'] in doc.get(field, ()):
+                raise DuplicateKeyError('E11000')  # the upsert collides with the existing shard
+        for field, amount in update.get('$inc', {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        for field, push in update.get('$push', {}).items():
+            doc[field] = (doc.get(field, []) + push['$each'])[push['$slice']:]
+        for field, pull in update.get('$pull', {}).items():
+            doc[field] = [item for item in doc.get(field, []) if item['_id'] != pull['_id']]
+
+
+def test_stalled_worker_cannot_reapply_an_older_fold(mocker):
+    fake = FakeStats({'visitors:base': {'_id': 'visitors:base', 'total_visitors': 14},
+                      'visitors:pod:1:0': {'_id': 'visitors:pod:1:0', 'total_visitors': 4}})
+    mocker.patch.object(oriyan_portfolio, 'stats_collection', fake)
+    first = {'_id': 'f1', 'shard': 'visitors:pod:1:0', 'value': 4}
+    fake.docs['visitors:base']['folds'] = [first]
+    # Another worker finishes the first fold, the shard takes 3 more hits and is folded again
+    oriyan_portfolio._finish_fold(first)
+    fake.docs['visitors:pod:1:0']['total_visitors'] += 3
+    fake.docs['visitors:base']['total_visitors'] += 3
+    oriyan_portfolio._finish_fold({'_id': 'f2', 'shard': 'visitors:pod:1:0', 'value': 3})
+
+    # The worker that recorded the first fold wakes up and finishes it late
+    oriyan_portfolio._finish_fold(first)
+
+    assert oriyan_portfolio.visitor_counter_total(fake.docs.values()) == 17
+
+
+def test_interrupted_fold_is_finished_by_next_compaction(stats):
+    stats.find_one.return_value = {}
+    stats.find.return_value = [{'_id': 'visitors:pod:1:0', 'total_visitors': 4}]
+    # The base document took the fold, then the shard update failed
+    stats.update_one.side_effect = [MagicMock(), ConnectionFailure('connection reset')]
+
+    with pytest.raises(ConnectionFailure):
+        oriyan_portfolio.compact_visitor_counter()
+
+    fold = stats.update_one.call_args_list[0][0][1]['$push']['folds']
+    stats.update_one.reset_mock()
+    stats.update_one.side_effect = None
+    stats.find_one.return_value = {'_id': 'visitors:base', 'folds': [fold]}
+    stats.find.return_value = []
+
+    oriyan_portfolio.compact_visitor_counter()
+
+    (shard_filter, move), (_, pull) = [c[0] for c in stats.update_one.call_args_list]
+    assert shard_filter == {'_id': 'visitors:pod:1:0', 'applied': {'$ne': fold['_id']}}
+    assert move['$inc'] == {'total_visitors': -4}
+    assert pull == {'$pull': {'folds': {'_id': fold['_id']}}}
+
+
+def test_shard_already_being_folded_is_skipped(stats):
+    stats.find_one.return_value = {}
+    stats.find.return_value = [{'_id': 'visitors:pod:1:0', 'total_visitors': 4}]
+    stats.update_one.side_effect = DuplicateKeyError('E11000')
+
+    assert oriyan_portfolio.compact_visitor_counter() == 0
+    assert stats.update_one.call_count == 1
+
+
+def test_compaction_removes_only_idle_empty_shards(stats):
+    stats.find_one.return_value = {}
+    stats.find.return_value = [{'_id': 'visitors:pod:1:0', 'total_visitors': 0}]
+
+    assert oriyan_portfolio.compact_visitor_counter() == 0
+
+    shard_filter = stats.delete_one.call_args[0][0]
+    assert shard_filter['total_visitors'] == 0
+    assert '$lt' in shard_filter['last_updated']
+    stats.update_one.assert_not_called()
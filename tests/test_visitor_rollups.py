@@ -0,0 +1,68 @@
+"""Tests for time-bucketed visitor rollups and the timeseries endpoint"""
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import oriyan_portfolio
+
+
+@pytest.fixture
+def rollups(mocker):
+    collection = MagicMock()
+    mocker.patch.object(oriyan_portfolio, 'rollups_collection', collection)
+    return collection
+
+
+def test_rollup_bucket_truncation():
+    moment = datetime(2024, 5, 6, 13, 47, 21, 500, tzinfo=timezone.utc)
+    assert oriyan_portfolio.rollup_bucket(moment, 'minute') == datetime(2024, 5, 6, 13, 47, tzinfo=timezone.utc)
+    assert oriyan_portfolio.rollup_bucket(moment, 'hour') == datetime(2024, 5, 6, 13, tzinfo=timezone.utc)
+    assert oriyan_portfolio.rollup_bucket(moment.replace(tzinfo=None), 'day') == datetime(2024, 5, 6, tzinfo=timezone.utc)
+
+
+def test_batch_folds_into_one_bulk_write(rollups):
+    at = datetime(2024, 5, 6, 13, 47, tzinfo=timezone.utc)
+    oriyan_portfolio._update_visitor_rollups([
+        {'page': '/', 'timestamp': at},
+        {'page': '/', 'timestamp': at},
+        {'page': '/api/visitors', 'timestamp': at},
+    ])
+
+    rollups.bulk_write.assert_called_once()
+    ops = rollups.bulk_write.call_args[0][0]
+    increments = {op._filter['_id']: op._doc['$inc']['count'] for op in ops}
+    assert increments['minute:/:2024-05-06T13:47'] == 2
+    assert increments['hour:*:2024-05-06T13:00'] == 3
+    assert increments['day:/api/visitors:2024-05-06T00:00'] == 1
+    # 3 granularities x (2 pages + the all-pages total)
+    assert len(ops) == 9
+
+
+def test_timeseries_reads_rollups_once_and_zero_fills(client, rollups):
+    rollups.find.return_value = [
+        {'bucket': datetime(2024, 5, 6, 13, 0), 'count': 4},
+    ]
+
+    response = client.get('/api/visitors/timeseries?granularity=hour'
+                          '&since=2024-05-06T12:30:00Z&until=2024-05-06T14:00:00Z')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [p['count'] for p in data['points']] == [0, 4, 0]
+    assert data['points'][0]['bucket'] == '2024-05-06T12:00:00+00:00'
+    rollups.find.assert_called_once()
+    query = rollups.find.call_args[0][0]
+    assert query['granularity'] == 'hour'
+    assert query['page'] == '*'
+
+
+def test_timeseries_rejects_unbounded_ranges(client, rollups):
+    response = client.get('/api/visitors/timeseries?granularity=minute'
+                          '&since=2024-01-01T00:00:00Z&until=2024-02-01T00:00:00Z')
+    assert response.status_code == 400
+    rollups.find.assert_not_called()
+
+
+def test_timeseries_validates_arguments(client, rollups):
+    assert client.get('/api/visitors/timeseries?granularity=week').status_code == 400
+    assert client.get('/api/visitors/timeseries?since=yesterday').status_code == 400
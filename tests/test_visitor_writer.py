@@ -0,0 +1,92 @@
+"""Tests for the batched background visitor writer"""
+import pytest
+from unittest.mock import MagicMock
+from pymongo.errors import BulkWriteError
+
+import oriyan_portfolio
+from oriyan_portfolio import VisitorWriter
+
+
+@pytest.fixture
+def collections(mocker):
+    visitors = MagicMock()
+    stats = MagicMock()
+    mocker.patch.object(oriyan_portfolio, 'visitors_collection', visitors)
+    mocker.patch.object(oriyan_portfolio, 'stats_collection', stats)
+    return visitors, stats
+
+
+def _metric(name, **labels):
+    return oriyan_portfolio.metrics_registry.get_sample_value(name, labels) or 0
+
+
+def test_flush_batches_inserts_and_counter(collections):
+    """A flush becomes one unordered insert_many and one $inc"""
+    visitors, stats = collections
+    writer = VisitorWriter(maxsize=100, batch_size=50, flush_interval=60)
+    for i in range(5):
+        assert writer.submit({'page': '/', 'n': i})
+
+    assert writer.flush() == 5
+    visitors.insert_many.assert_called_once()
+    docs = visitors.insert_many.call_args[0][0]
+    assert [d['n'] for d in docs] == list(range(5))
+    assert visitors.insert_many.call_args[1] == {'ordered': False}
+    update = stats.update_one.call_args[0][1]
+    assert update['$inc'] == {'total_visitors': 5}
+    assert writer.pending() == 0
+
+
+def test_flush_splits_into_batch_size_chunks(collections):
+    visitors, stats = collections
+    writer = VisitorWriter(maxsize=100, batch_size=2, flush_interval=60)
+    writer.stop()
+    for i in range(5):
+        writer._queue.put_nowait({'n': i})
+
+    assert writer.flush() == 5
+    assert visitors.insert_many.call_count == 3
+    assert stats.update_one.call_count == 3
+
+
+def test_full_queue_spools_to_event_log(collections, mocker):
+    mock_log = mocker.patch.object(oriyan_portfolio, 'event_log')
+    writer = VisitorWriter(maxsize=1, batch_size=50, flush_interval=60)
+
+    assert writer.submit({'n': 1}) is True
+    assert writer.submit({'n': 2}) is True
+    mock_log.append.assert_called_once_with('visitor', [{'n': 2}])
+
+
+def test_failed_flush_spools_batch(collections, mocker):
+    visitors, _ = collections
+    visitors.insert_many.side_effect = Exception('DB Error')
+    mock_log = mocker.patch.object(oriyan_portfolio, 'event_log')
+    writer = VisitorWriter(maxsize=10, batch_size=10, flush_interval=60)
+    writer.submit({'n': 1})
+
+    assert writer.flush() == 0
+    mock_log.append.assert_called_once_with('visitor', [{'n': 1}])
+
+
+def test_partial_bulk_failure_counts_only_inserted(collections):
+    visitors, stats = collections
+    visitors.insert_many.side_effect = BulkWriteError({'nInserted': 2, 'writeErrors': [{'index': 1, 'code': 121}]})
+    writer = VisitorWriter(maxsize=10, batch_size=10, flush_interval=60)
+    for i in range(3):
+        writer.submit({'n': i})
+
+    assert writer.flush() == 2
+    assert stats.update_one.call_args[0][1]['$inc'] == {'total_visitors': 2}
+
+
+def test_background_thread_flushes_on_size_trigger(collections):
+    visitors, _ = collections
+    writer = VisitorWriter(maxsize=10, batch_size=2, flush_interval=60)
+    writer.submit({'n': 1})
+    writer.submit({'n': 2})
+    writer.stop()
+
+    assert visitors.insert_many.called
+    assert writer.pending() == 0
+    assert _metric('portfolio_visitor_flush_seconds_count') > 0